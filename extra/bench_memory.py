@@ -0,0 +1,74 @@
+u"""
+Benchmark: memory retained by streams (substance and stream state in
+slots, reference values shared through ReferenceRecord) and by the same
+states in a StreamBatch (sparse compositions, see Composition).
+
+Each stream has 4 substances (plus H2O(l) from the water split) and its
+exergies calculated; memory is measured with tracemalloc:
+
+    python extra/bench_memory.py [number of streams]
+
+tracemalloc slows building the streams down: 100000 streams (the
+default) take about 6 minutes.
+"""
+
+import gc,os,sys,time,tracemalloc
+
+from numpy import *
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from streams import exergy
+
+NAMES = ['N2','O2','CO2','H2O']
+
+def states(nstreams):
+    '''Temperatures, pressures and compositions of nstreams flue-gas streams.'''
+
+    random.seed(1)
+    T = random.uniform(300.0,1500.0,nstreams)
+    p = random.uniform(1.0,20.0,nstreams)
+    co2 = random.uniform(0.03,0.12,nstreams)
+    x = c_[full(nstreams,0.75),0.15-co2,co2,full(nstreams,0.10)]
+
+    return T,p,x
+
+def build_streams(T,p,x):
+    out = []
+    for i in range(len(T)):
+        st = exergy.stream(i,T[i],p[i],10.0,list(zip(NAMES,x[i])),exergy_type="Ahrends")
+        st.state['e_ch']
+        out.append(st)
+    return out
+
+def build_batch(T,p,x):
+    batch = exergy.StreamBatch(arange(len(T)),T,p,full(len(T),10.0),NAMES,x)
+    batch.calc_exergy("Ahrends")
+    return batch
+
+def measure(build,*args):
+    '''Memory retained [bytes] by the result of build(*args) and the time [s] to build it.'''
+
+    gc.collect()
+    tracemalloc.start()
+    t   = time.perf_counter()
+    obj = build(*args)
+    t   = time.perf_counter() - t
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+
+    return size,t
+
+if __name__ == "__main__":
+
+    nstreams = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    T,p,x = states(nstreams)
+    build_streams(T[:10],p[:10],x[:10])    # warm up (reference records, tables)
+    build_batch(T[:10],p[:10],x[:10])
+
+    print("{:>8} {:>10} {:>12} {:>10}".format("","streams","MB","kB/stream"))
+    for label,build in [("stream",build_streams),("batch",build_batch)]:
+        size,t = measure(build,T,p,x)
+        print("{:>8} {:10d} {:12.1f} {:10.3f}   ({:.1f} s)".format(label,nstreams,size/1e6,size/1e3/nstreams,t))
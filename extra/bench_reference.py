@@ -0,0 +1,60 @@
+u"""
+Benchmark: the cost of building streams does not grow with the size of
+the reference table (substances share one process-wide table, see
+get_reference, instead of each loading the workbook).
+
+The packaged table is padded with copies of its substances to 1000 and
+5000 extra entries; for each size, flue-gas streams are built and
+their exergies calculated:
+
+    python extra/bench_reference.py [number of streams]
+"""
+
+import os,sys,time
+
+from numpy import *
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from streams import exergy
+
+def padded(refs,extra):
+    '''The table refs with extra copies of its substances (named X00000, X00001, ...).'''
+
+    n    = len(refs.names)
+    cols = arange(extra) % n
+    names = refs.names + ["X{:05d}".format(i) for i in range(extra)]
+    data  = concatenate([refs.data,refs.data[:,cols]],axis=1)
+
+    return exergy.ReferenceTable(names,data,keys=list(refs._keys.keys()))
+
+def bench(refs,nstreams):
+    '''Seconds per stream to build nstreams flue-gas streams and calculate their exergies.'''
+
+    random.seed(1)
+    T = random.uniform(300.0,1500.0,nstreams)
+    p = random.uniform(1.0,20.0,nstreams)
+
+    t = time.perf_counter()
+    for i in range(nstreams):
+        co2 = 0.05 + 0.05*i/nstreams
+        st  = exergy.stream(i,T[i],p[i],10.0,[('N2',0.75),('O2',0.15-co2),('CO2',co2),('H2O',0.10)],
+                            exergy_type="Ahrends",refs=refs)
+        st.state['e_ch']
+
+    return (time.perf_counter() - t)/nstreams
+
+if __name__ == "__main__":
+
+    nstreams = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    base = exergy.get_reference()
+
+    print("{:>12} {:>12}".format("substances","ms/stream"))
+    times = []
+    for extra in [0,1000,5000]:
+        refs = padded(base,extra) if extra > 0 else base
+        bench(refs,10)    # warm up (the tables built once per reference table)
+        times.append(bench(refs,nstreams))
+        print("{:12d} {:12.3f}".format(len(refs.names),1000*times[-1]))
+
+    print("ratio largest/packaged table: {:.2f}".format(times[-1]/times[0]))
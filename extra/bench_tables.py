@@ -0,0 +1,70 @@
+u"""
+Benchmark: substance properties of the backend "nasa9-tables" (tabulated
+NASA-9 polynomials, see TabulatedBackend) against the backend "nasa9",
+which evaluates the polynomials of each species in turn.
+
+Backend.ideal is timed on random species of a flue gas and natural gas
+(the part of the batch properties that the tables replace), then the
+exergies of a flue-gas StreamBatch are calculated with both backends:
+
+    python extra/bench_tables.py [number of entries]
+"""
+
+import os,sys,time
+
+from numpy import *
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from streams import exergy
+
+NAMES = ['N2','O2','CO2','H2O','Ar','CH4','CO','H2']
+
+def timed(f,*args):
+    '''Result of f(*args) and the best time [s] of 3 runs.'''
+
+    ts = []
+    for i in range(3):
+        t   = time.perf_counter()
+        out = f(*args)
+        ts.append(time.perf_counter()-t)
+
+    return out,min(ts)
+
+def deviation(a,b):
+    '''Largest deviation of the results b from a, relative to max(|a|,1).'''
+
+    return max([(abs(x-y) / maximum(abs(x),1.0)).max() for x,y in zip(a,b)])
+
+if __name__ == "__main__":
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    refs   = exergy.get_reference()
+    exact  = exergy.get_backend("nasa9")
+    tables = exergy.get_backend("nasa9-tables")
+
+    t = time.perf_counter()
+    tab = tables.tables(refs)
+    print("tables: {} segments, max_err = {:.1e}, built in {:.2f} s".format(tab.nseg,tab.max_err,time.perf_counter()-t))
+
+    random.seed(1)
+    k   = random.randint(0,len(NAMES),n)
+    jj  = asarray(refs.index(NAMES))[k]
+    ids = exergy.substance_id(NAMES)[k]
+    T   = random.uniform(300.0,2500.0,n)
+    p   = random.uniform(1.0,50.0,n)
+
+    a,ta = timed(exact.ideal,jj,ids,T,p,refs)
+    b,tb = timed(tables.ideal,jj,ids,T,p,refs)
+    print("ideal: nasa9 {:.3f} s, nasa9-tables {:.3f} s, speedup {:.2f}, deviation {:.1e}".format(ta,tb,ta/tb,deviation(a,b)))
+
+    m = n // 5
+    x = random.dirichlet(ones(5),m)
+    args = (arange(m),T[:m],p[:m],ones(m),NAMES[:5],x)
+    def batch(backend):
+        batch = exergy.StreamBatch(*args,backend=backend)
+        batch.calc_exergy("Ahrends")
+        return batch.state['e_ph']
+    a,ta = timed(batch,"nasa9")
+    b,tb = timed(batch,"nasa9-tables")
+    print("batch of {}: nasa9 {:.3f} s, nasa9-tables {:.3f} s, speedup {:.2f}, deviation {:.1e}".format(m,ta,tb,ta/tb,deviation([a],[b])))
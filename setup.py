@@ -15,7 +15,7 @@ setuptools.setup(
     #packages=setuptools.find_packages(),
     packages=['streams'],
     package_dir={'streams': 'streams'},
-    package_data={'streams': ['data/ReferenceTables.xlsx','gatex_pc_if97_mj.exe']},
+    package_data={'streams': ['data/ReferenceTables.xlsx','data/thermo.inp','gatex_pc_if97_mj.exe']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU General Public License v3.0",
@@ -8,6 +8,8 @@ import openpyxl as xl                 # For writing/reading excel files
 from numpy import * 
 import codecs 
 
+from streams.exergy import classify_water, gatex_files, run_gatex
+
 ## !!! THE STREAM WITH THE REFERENCE PRESSURE AND TEMPERATURE IS STREAM NUMBER 1 !!! ##
   
 #-------------------------------------------------------------------##
@@ -300,7 +302,7 @@ def load_aspen(fldr="./",file_in="simu1.rep",write_mfile=True):
 
     # Now convert the output composition values to fractions
     elements = array(["Ar","CO2","CO","COS","H2O","CH4","H2","H2S","N2","O2","SO2"])
-    inds = in1d(outh,elements)
+    inds = isin(outh,elements)
 
     for s in arange(0,nstreams):
 
@@ -338,16 +340,16 @@ def load_aspen(fldr="./",file_in="simu1.rep",write_mfile=True):
     # Return the array of stream data in ebsilon format
     return out 
 
-def calc_exergy_gatex(streams,fldr="./",gatex_exec="./gatex_pc_if97_mj.exe",sat_water=[-1.0],sat_steam=[-1.0]):
+def calc_exergy_gatex(streams,fldr=None,gatex_exec="./gatex_pc_if97_mj.exe",sat_water=[-1.0],sat_steam=[-1.0],keep=False):
     '''
     Use this subroutine to calculate exergy from a set of stream data (array)
     using GATEX.
 
     == INPUT ==
     streams : numpy array of dimensions n_streams X n_variables
-    fldr    : folder containing gatex program and 
-              where input and output data are stored
-              (for now must be the current working directory, since gatex.exe looks there)
+    fldr    : folder for the temporary directory where gatex runs
+              (default: the system temporary directory), see run_gatex
+    keep    : keep the temporary directory with the input and output data
     
     == OUTPUT ==
     E       : table of exergy calculations obtained from GATEX 
@@ -357,119 +359,49 @@ def calc_exergy_gatex(streams,fldr="./",gatex_exec="./gatex_pc_if97_mj.exe",sat_
     print('======================')
     print("Generating GATEX input files")
 
-    # Define important gatex filenames
-    gatex_f1 = os.path.join(fldr,"gate.inp")
-    gatex_f2 = os.path.join(fldr,"flows.prn")
-    gatex_f3 = os.path.join(fldr,"composition.prn")
-
-    # To help figure things out, create a header
-    # that shows the variable of each column
-    head = array(["STREAM","mdot","T","p","x","SE","Ar","CO2","CO","COS","H2O","XX","CH4","H2","H2S","N2","O2","SO2","H"])
-
-    # How many streams and variables are we working with?
+    # How many streams are we working with?
     n_streams = len(streams)
-    n_var     = len(head)
-
-    ### Create the gate.inp file with the reference values #################
-    ref = open(gatex_f1,'w') #,buffering=0)                        
-    t0 = float(streams[0,2])
-    p0 = float(streams[0,3])
-    ref.write('\n\n[system]\n\nt0 =\t')             
-    ref.write(str(t0))
-    ref.write(' ;\np0 =\t')
-    ref.write(str(p0))
-    ref.write(' ;\nnumber =\t')
-    ref.write(str(n_streams))
-    ref.write('. ;\nndiff =\t')
-    ref.write(str(n_streams))
-    ref.write('. ;\nkelvin =\t')
-    ref.write('0. ;')  
-    ref.close()
-    print(gatex_f1 + " is closed? " + str(ref.closed))
-    print("Wrote file for GATEX: " + gatex_f1)
-
-    #----------------------------------------------------------------------#
 
     #-- Separate streams depending on their type --------------------------#
-    for i in arange(0,n_streams):
 
-        ## NEW (30.10.2012): when no CH4, H2, N2 or O2 are present, then stream is H2O
-        if streams[i,12] + streams[i,13] + streams[i,15] + streams[i,16] < 0.0000001:
-            streams[i,10] = 1.0
+    ## NEW (30.10.2012): when no CH4, H2, N2 or O2 are present, then stream is H2O
+    streams[streams[:,12] + streams[:,13] + streams[:,15] + streams[:,16] < 0.0000001,10] = 1.0
+    ## END NEW ##
 
-        ## END NEW ##
-        
-        if streams[i,10] == 1.0:            # H2O stream
-
-            if streams[i,4] > 0.001 and streams[i,4] < 0.999:
-                pass  # Take original phase value
-            #elif streams[i,0] in [45.0,21.0,22.0,23.0,34.0,37.0]: # saturated_water: 45, 21,22,23,34,37 
-            elif streams[i,0] in sat_water: # saturated_water: 45, 21,22,23,34,37 
-                streams[i,4] = 0.0    
-            #elif streams[i,0] in [32.0,33.0,36.0,26.0,40.0]: # saturated_steam: 32,33,36, 26,40,
-            elif streams[i,0] in sat_steam: # saturated_steam: 32,33,36, 26,40,
-                streams[i,4] = 1.0
-            else:
-                streams[i,4] = -1.0
+    isH2O = streams[:,10] == 1.0            # H2O streams
 
-        #elif streams[i,0] in flue_gas:    # Flue gas stream
-        else:      # For now, apply this to any other stream 
-            streams[i,4] = -1.0
+    # H2O streams: saturated water (0), saturated steam (1), two-phase (0 < x < 1)
+    # or -1 from the saturation curve and the phase (T is in degC here, see classify_water),
+    # stream numbers in sat_water and sat_steam are taken as saturated anyway.
+    # All other streams: -1 (for now, apply this to any other stream, eg flue gas)
+    vfrac = streams[:,4]
+    x = classify_water(streams[:,2]+273.15,streams[:,3],c_[vfrac,1.0-vfrac,0.0*vfrac])
+    x = where(isH2O & isin(streams[:,0],sat_water),0.0,x)
+    x = where(isH2O & isin(streams[:,0],sat_steam),1.0,x)
+    streams[:,4] = where(isH2O,x,-1.0)
 
     #----------------------------------------------------------------------#
-    
-    # For gatex to read the file correctly, the
-    # stream number should appear twice. Here we duplicate
-    # the first column (which is the stream number)
-    streams2 = insert(streams,1,streams[:,0],axis=1)
-    head2    = insert(head,1,head[0])
 
-    #---------------------------------------------------------------------##
+    ## Create the gatex input files (flows.prn and composition.prn
+    ## with the stream number twice, see gatex_files)
+    t0 = float(streams[0,2])
+    p0 = float(streams[0,3])
+    files = gatex_files(streams,t0,p0,kelvin=0,fmt="%12.6f")
 
-    ## Create files for saving the different data parts ####################
-    
-    # Extract flow data from the stream array (with duplicate stream number!)
-    # Then flatten to one vector and output to the flows.prn file
-    flow_names = array(["STREAM","mdot","T","p","x"])
-    inds = in1d(head2,flow_names)
-    flows = streams2[:,inds]
-    flows = flows.flatten()
-    savetxt(gatex_f2,flows,fmt="%12.6f")
-    flows2 = loadtxt(gatex_f2)    # To ensure file is written (Windows hack!)!
-    print("Wrote file for GATEX: " + gatex_f2)
-
-    # Now extract element composition data (with duplicate stream number!)
-    # Then flatten to one vector and output to the composition.prn file
-    element_names = array(["STREAM","Ar","CO2","CO","COS","H2O","CH4","H2","H2S","N2","O2","SO2"])
-    inds = in1d(head2,element_names)
-    elements = streams2[:,inds]
-    elements = elements.flatten()
-    savetxt(gatex_f3,elements,fmt="%12.6f")
-    elements2 = loadtxt(gatex_f3)    # To ensure file is written (Windows hack!)!
-    print("Wrote file for GATEX: " + gatex_f3)
+    ### The gate.inp file with the reference values #######################
+    files["gate.inp"] = '\n\n[system]\n\nt0 =\t{} ;\np0 =\t{} ;\nnumber =\t{}. ;\nndiff =\t{}. ;\nkelvin =\t0. ;'.format(t0,p0,n_streams,n_streams)
 
     #---------------------------------------------------------------------##
     
     # Now call gatex #######################################################
     print("Calling GATEX...")
 
-    # Determine whether to use wine or not
-    # (If on linux or mac, use wine)
-    try:
-        uname = os.uname()    # Operating system info
-        call_prefix = ""
-        ###if ( uname[0] in ["Darwin"] ): call_prefix = "wine "
-        if ( uname[0] in ["Darwin"] ): call_prefix = "/opt/local/bin/wine "
-    except:
-        call_prefix = ""
-    
-    ## Now call gatex and cross fingers !!! 
-    os.system((call_prefix+gatex_exec))
-    
-    # If it worked, load the exergies
-    # E = loadtxt('exergies.m', skiprows = (37),comments = ']')    # Python2
-    with codecs.open('exergies.m', encoding = 'cp1252') as filenow:
-        E = loadtxt(filenow, skiprows = (37),comments = ']')
+    ## Now call gatex in a directory of its own and cross fingers !!!
+    ## (If on mac, use wine)
+    E = run_gatex([files],gatex_exec,workers=1,fldr=fldr,keep=keep,wine="/opt/local/bin/wine")[0]
+
+    if E is None:
+        sys.exit("Error: GATEX failed, no exergies.m written.")
     
     # Add a first column that contains the stream number
     E = insert(E,0,streams[:,0],axis=1)
@@ -1,6 +1,9 @@
 u"""
 Modules:
     exergy: exergy calculations.
+    nasa9:  NASA-9 polynomial properties of ideal gases and condensed species.
+    if97:   IAPWS-IF97 properties of water and steam.
+    aga8:   GERG-2008 and DETAIL real-gas equations of state (AGA8).
 """
 
 __version__ = '0.0.1'
@@ -11,5 +14,6 @@ from streams import exergy
 REF_FILE       = pkg_resources.resource_filename('streams', 'data/ReferenceTables.xlsx')
 GATEX_EXE_FILE = pkg_resources.resource_filename('streams', 'gatex_pc_if97_mj.exe')
 
-# Load reference substance values
-refs = exergy.load_reference(REF_FILE)
+# Load reference substance values and share them with
+# all substances, streams and simulations
+refs = exergy.set_reference(exergy.load_reference(REF_FILE))
@@ -0,0 +1,1496 @@
+u"""
+Real-gas properties of natural gas and related mixtures from the
+AGA8 equations of state, translated from the NIST reference code
+(extra/AGA8CODE):
+
+    GERG-2008: AGA8 Part 2 (Kunz and Wagner, J. Chem. Eng. Data 57, 2012)
+    DETAIL:    AGA8 Part 1 (AGA Report No. 8, 1994)
+
+Both equations cover the 21 components of NAMES. All functions accept
+arrays of states: T [K] and p [bar] are [N] and x holds the molar
+fractions of the components of each state [N,21] (see fractions):
+
+    eos = aga8.get_eos("GERG-2008")
+    x   = eos.fractions(['CH4','C2H6','N2'],[[0.90,0.06,0.04]])[0]
+    D,ierr       = eos.density(T,p,x)       # molar density [kmol/m3]
+    h_r,s_r,ierr = eos.departure(T,p,x)     # h-h_ig [kJ/kmol], s-s_ig [kJ/kmol-K]
+    props        = eos.properties(T,D,x)    # Z, H, S, Cp, W, ... as in the NIST code
+
+The density solver iterates all states in lockstep (Newton's method
+in log(v) as in the NIST code); states that do not converge get the
+ideal gas density and ierr = 1. As in the NIST code, no phase checks
+are made: a state in the two-phase region gets a metastable density.
+"""
+
+import sys
+from collections import OrderedDict
+
+from numpy import *
+
+# Components of both equations (in the order of the NIST code)
+NAMES = ['CH4','N2','CO2','C2H6','C3H8','i-C4H10','C4H10','i-C5H12','C5H12','C6H14',
+         'C7H16','C8H18','C9H20','C10H22','H2','O2','CO','H2O','H2S','He','Ar']
+NC    = len(NAMES)
+
+# Other names of the components
+ALIASES = OrderedDict([ ('n-C4H10','C4H10'),
+                        ('n-C5H12','C5H12'),
+                        ('iC4H10', 'i-C4H10'),
+                        ('iC5H12', 'i-C5H12') ])
+
+# Smallest molar fraction and density taken into account (as in the NIST code)
+EPS   = 1e-15
+
+# Tolerance of the density solver (change of log(v))
+TOL   = 1e-7
+
+# Number of states evaluated at once (limits the size of the [state,component,term] arrays)
+CHUNK = 2048
+
+### IDEAL GAS PART (GERG-2008 AND DETAIL) ###
+
+# Ideal gas parameters n_1..n_7 and theta_4..theta_7 of each component (same in GERG-2008 and DETAIL)
+N0 = array([ [ 29.83843397, -15999.69151,      4.00088,      0.76315,       0.0046,      8.74432,     -4.46921],
+             [ 17.56770785, -2801.729072,      3.50031,      0.13732,      -0.1466,      0.90066,            0],
+             [ 20.65844696, -4902.171516,      3.50002,      2.04452,     -1.06044,      2.03366,      0.01393],
+             [ 36.73005938, -23639.65301,      4.00263,      4.33939,      1.23722,      13.1974,     -6.01989],
+             [ 44.70909619, -31236.63551,      4.02939,      6.60569,        3.197,      19.1921,     -8.37267],
+             [ 34.30180349, -38525.50276,      4.06714,      8.97575,      5.25156,      25.1423,      16.1388],
+             [ 36.53237783, -38957.80933,      4.33944,      9.44893,      6.89406,      24.4618,      14.7824],
+             [ 43.17218626, -51198.30946,            4,      11.7618,      20.1101,      33.1688,            0],
+             [ 42.67837089,    -45215.83,            4,      8.95043,       21.836,      33.4032,            0],
+             [ 46.99717188, -52746.83318,            4,      11.6977,      26.8142,      38.6164,            0],
+             [ 52.07631631, -57104.81056,            4,      13.7266,      30.4707,      43.5561,            0],
+             [ 57.25830934, -60546.76385,            4,      15.6865,      33.8029,      48.1731,            0],
+             [ 62.09646901, -66600.12837,            4,      18.0241,      38.1235,      53.3415,            0],
+             [ 65.93909154, -74131.45483,            4,      21.0069,      43.4931,      58.3657,            0],
+             [ 13.07520288, -5836.943696,      2.47906,      0.95806,      0.45444,      1.56039,      -1.3756],
+             [  16.8017173,  -2318.32269,      3.50146,      1.07558,      1.01334,            0,            0],
+             [ 17.45786899, -2635.244116,      3.50055,      1.02865,      0.00493,            0,            0],
+             [ 21.57882705, -7766.733078,      4.00392,      0.01059,      0.98763,      3.06904,            0],
+             [  21.5830944, -6069.035869,            4,      3.11942,      1.00243,            0,            0],
+             [ 10.04639507,     -745.375,          2.5,            0,            0,            0,            0],
+             [ 10.04639507,     -745.375,          2.5,            0,            0,            0,            0] ])
+
+TH0 = array([ [ 820.659,   178.41,  1062.82,  1090.53],
+              [ 662.738,  680.562,  1740.06,        0],
+              [ 919.306,   865.07,  483.553,  341.109],
+              [ 559.314,  223.284,  1031.38,  1071.29],
+              [ 479.856,  200.893,  955.312,  1027.29],
+              [  438.27,  198.018,  1905.02,  893.765],
+              [  468.27,  183.636,   1914.1,  903.185],
+              [ 292.503,  910.237,  1919.37,        0],
+              [  178.67,  840.538,  1774.25,        0],
+              [ 182.326,  859.207,  1826.59,        0],
+              [ 169.789,  836.195,  1760.46,        0],
+              [ 158.922,  815.064,  1693.07,        0],
+              [ 156.854,  814.882,  1693.79,        0],
+              [ 164.947,  836.264,  1750.24,        0],
+              [ 228.734,  326.843,  1651.71,  1671.69],
+              [ 2235.71,  1116.69,        0,        0],
+              [ 1550.45,  704.525,        0,        0],
+              [ 268.795,  1141.41,  2507.37,        0],
+              [ 1833.63,  847.181,        0,        0],
+              [       0,        0,        0,        0],
+              [       0,        0,        0,        0] ])
+
+### GERG-2008 ###
+
+# Gas constant of GERG-2008 [kJ/kmol-K] and of its ideal gas part
+R_GERG  = 8.314472
+R_GERG0 = 8.31451
+
+# Molar masses [kg/kmol], critical temperatures [K] and critical densities [kmol/m3]
+MW_GERG = array([  16.04246,   28.0134,   44.0095,  30.06904,  44.09562,   58.1222,
+                    58.1222,  72.14878,  72.14878,  86.17536, 100.20194, 114.22852,
+                   128.2551, 142.28168,   2.01588,   31.9988,   28.0101,  18.01528,
+                   34.08088,  4.002602,    39.948 ])
+TC_GERG = array([  190.564,  126.192, 304.1282,  305.322,  369.825,  407.817,
+                   425.125,   460.35,    469.7,   507.82,   540.13,   569.32,
+                    594.55,    617.7,    33.19,  154.595,   132.86,  647.096,
+                     373.1,   5.1953,  150.687 ])
+DC_GERG = array([ 10.139342719,      11.1839, 10.624978698,   6.87085454,  5.000043088,   3.86014294,
+                   3.920016792,        3.271,  3.215577588,  2.705877875,  2.315324434,  2.056404127,
+                          1.81,         1.64,        14.94,        13.63,        10.85,  17.87371609,
+                         10.19,       17.399, 13.407429659 ])
+
+# Exponents (d,t,c) of the terms of the pure fluid equations: the short
+# form (12 terms) and the long form of methane, nitrogen and ethane (24 terms)
+SHORT = ( array([     1,     1,     1,     2,     3,     7,     2,     5,     1,     4,     3,     4]),
+          array([  0.25, 1.125,   1.5, 1.375,  0.25, 0.875, 0.625,  1.75, 3.625, 3.625,  14.5,    12]),
+          array([     0,     0,     0,     0,     0,     0,     1,     1,     2,     2,     3,     3]) )
+
+LONG  = ( array([     1,     1,     2,     2,     4,     4,     1,     1,     1,     2,     3,     6,
+                      2,     3,     3,     4,     4,     2,     3,     4,     5,     6,     6,     7]),
+          array([ 0.125, 1.125, 0.375, 1.125, 0.625,   1.5, 0.625, 2.625,  2.75, 2.125,     2,  1.75,
+                    4.5,  4.75,     5,     4,   4.5,   7.5,    14,  11.5,    26,    28,    30,    16]),
+          array([     0,     0,     0,     0,     0,     0,     1,     1,     1,     1,     1,     1,
+                      2,     2,     2,     2,     2,     3,     3,     3,     6,     6,     6,     6]) )
+
+# Pure fluid equations: (component, number of polynomial terms, coefficients n, exponents (d,t,c))
+PURE = [
+    ('CH4', 6, array([     0.57335704239162,      -1.676068752373,     0.23405291834916,
+                         -0.21947376343441,    0.016369201404128,     0.01500440638928,
+                         0.098990489492918,     0.58382770929055,     -0.7478686756039,
+                          0.30033302857974,     0.20985543806568,   -0.018590151133061,
+                         -0.15782558339049,     0.12716735220791,   -0.032019743894346,
+                        -0.068049729364536,    0.024291412853736,  5.1440451639444E-03,
+                        -0.019084949733532,  5.5229677241291E-03, -4.4197392976085E-03,
+                         0.040061416708429,   -0.033752085907575, -2.5127658213357E-03 ]),
+              LONG),
+    ('N2', 6, array([     0.59889711801201,     -1.6941557480731,     0.24579736191718,
+                         -0.23722456755175,    0.017954918715141,    0.014592875720215,
+                          0.10008065936206,     0.73157115385532,    -0.88372272336366,
+                          0.31887660246708,     0.20766491728799,   -0.019379315454158,
+                         -0.16936641554983,     0.13546846041701,   -0.033066712095307,
+                        -0.060690817018557,    0.012797548292871,  5.8743664107299E-03,
+                        -0.018451951971969,  4.7226622042472E-03, -5.2024079680599E-03,
+                         0.043563505956635,   -0.036251690750939, -2.8974026866543E-03 ]),
+              LONG),
+    ('CO2', 4, array([     0.52646564804653,     -1.4995725042592,     0.27329786733782,
+                          0.12949500022786,     0.15404088341841,    -0.58186950946814,
+                         -0.18022494838296,   -0.095389904072812, -8.0486819317679E-03,
+                         -0.03554775127309,    -0.28079014882405,   -0.082435890081677,
+                         0.010832427979006, -6.7073993161097E-03, -4.6827907600524E-03,
+                        -0.028359911832177,    0.019500174744098,    -0.21609137507166,
+                          0.43772794926972,    -0.22130790113593,    0.015190189957331,
+                          -0.0153809489533 ]),
+              (array([ 1,  1,  2,  3,  3,  3,  4,  5,  6,  6,  1,  4,
+                                1,  1,  3,  3,  4,  5,  5,  5,  5,  5]),
+                        array([    0,  1.25, 1.625, 0.375, 0.375, 1.375, 1.125, 1.375, 0.125, 1.625,  3.75,   3.5,
+                                 7.5,     8,     6,    16,    11,    24,    26,    28,    24,    26]),
+                        array([ 0,  0,  0,  0,  1,  1,  1,  1,  1,  1,  2,  2,
+                                3,  3,  3,  3,  3,  5,  5,  5,  6,  6]))),
+    ('C2H6', 6, array([     0.63596780450714,     -1.7377981785459,     0.28914060926272,
+                         -0.33714276845694,    0.022405964699561,    0.015715424886913,
+                          0.11450634253745,      1.0612049379745,     -1.2855224439423,
+                          0.39414630777652,     0.31390924682041,   -0.021592277117247,
+                         -0.21723666564905,    -0.28999574439489,     0.42321173025732,
+                          0.04643410025926,    -0.13138398329741,    0.011492850364368,
+                        -0.033387688429909,    0.015183171583644, -4.7610805647657E-03,
+                         0.046917166277885,   -0.039401755804649, -3.2569956247611E-03 ]),
+              LONG),
+    ('C3H8', 6, array([     1.0403973107358,    -2.8318404081403,    0.84393809606294,
+                       -0.076559591850023,    0.09469737305728, 2.4796475497006E-04,
+                          0.2774376042287,  -0.043846000648377,    -0.2699106478435,
+                        -0.06931341308986,  -0.029632145981653,    0.01404012675138 ]),
+              SHORT),
+    ('i-C4H10', 6, array([       1.04293315891,    -2.8184272548892,     0.8617623239785,
+                        -0.10613619452487,   0.098615749302134, 2.3948208682322E-04,
+                          0.3033000485695,  -0.041598156135099,   -0.29991937470058,
+                       -0.080369342764109,  -0.029761373251151,    0.01305963030314 ]),
+              SHORT),
+    ('C4H10', 6, array([     1.0626277411455,     -2.862095182835,    0.88738233403777,
+                        -0.12570581155345,    0.10286308708106, 2.5358040602654E-04,
+                         0.32325200233982,  -0.037950761057432,   -0.32534802014452,
+                       -0.079050969051011,  -0.020636720547775,   0.005705380933475 ]),
+              SHORT),
+    ('i-C5H12', 6, array([     1.0963,    -3.0402,     1.0317,
+                         -0.1541,    0.11535, 0.00029809,
+                         0.39571,  -0.045881,   -0.35804,
+                        -0.10107,  -0.035484,   0.018156 ]),
+              SHORT),
+    ('C5H12', 6, array([     1.0968643098001,    -2.9988888298061,    0.99516886799212,
+                        -0.16170708558539,    0.11334460072775, 2.6760595150748E-04,
+                         0.40979881986931,  -0.040876423083075,   -0.38169482469447,
+                        -0.10931956843993,   -0.03207322332799,   0.016877016216975 ]),
+              SHORT),
+    ('C6H14', 6, array([      1.0553238013661,     -2.6120615890629,      0.7661388296726,
+                         -0.29770320622459,     0.11879907733358,  2.7922861062617E-04,
+                          0.46347589844105,    0.011433196980297,    -0.48256968738131,
+                        -0.093750558924659, -6.7273247155994E-03, -5.1141583585428E-03 ]),
+              SHORT),
+    ('C7H16', 6, array([      1.0543747645262,     -2.6500681506144,     0.81730047827543,
+                         -0.30451391253428,       0.122538687108,  2.7266472743928E-04,
+                           0.4986582568167, -7.1432815084176E-04,     -0.5423689552545,
+                         -0.13801821610756, -6.1595287380011E-03,  4.8602510393022E-04 ]),
+              SHORT),
+    ('C8H18', 6, array([      1.0722544875633,     -2.4632951172003,     0.65386674054928,
+                         -0.36324974085628,     0.12713269626764,   3.071357277793E-04,
+                           0.5265685698754,    0.019362862857653,    -0.58939426849155,
+                         -0.14069963991934, -7.8966330500036E-03,  3.3036597968109E-03 ]),
+              SHORT),
+    ('C9H20', 6, array([     1.1151,     -2.702,    0.83416,
+                        -0.38828,     0.1376, 0.00028185,
+                         0.62037,   0.015847,   -0.61726,
+                        -0.15043,  -0.012982,  0.0044325 ]),
+              SHORT),
+    ('C10H22', 6, array([     1.0461,    -2.4807,    0.74372,
+                        -0.52579,    0.15315, 0.00032865,
+                         0.84178,   0.055424,   -0.73555,
+                        -0.18507,  -0.020775,   0.012335 ]),
+              SHORT),
+    ('H2', 5, array([      5.3579928451252,     -6.2050252530595,     0.13830241327086,
+                        -0.071397954896129,    0.015474053959733,    -0.14976806405771,
+                        -0.026368723988451,    0.056681303156066,   -0.060063958030436,
+                         -0.45043942027132,       0.424788402445,   -0.021997640827139,
+                         -0.01049952137453, -2.8955902866816E-03 ]),
+              (array([ 1,  1,  2,  2,  4,  1,  5,  5,  5,  1,  1,  2,
+                                5,  1]),
+                        array([  0.5, 0.625, 0.375, 0.625, 1.125, 2.625,     0,  0.25, 1.375,     4,  4.25,     5,
+                                   8,     8]),
+                        array([ 0,  0,  0,  0,  0,  1,  1,  1,  1,  2,  2,  3,
+                                3,  5]))),
+    ('O2', 6, array([    0.88878286369701,    -2.4879433312148,    0.59750190775886,
+                      9.6501817061881E-03,    0.07197042871277, 2.2337443000195E-04,
+                         0.18558686391474,   -0.03812936803576,   -0.15352245383006,
+                       -0.026726814910919,  -0.025675298677127, 9.5714302123668E-03 ]),
+              SHORT),
+    ('CO', 6, array([    0.90554,    -2.4515,    0.53149,
+                        0.024173,   0.072156, 0.00018818,
+                         0.19405,  -0.043268,   -0.12778,
+                       -0.027896,  -0.034154,   0.016329 ]),
+              SHORT),
+    ('H2O', 7, array([     0.82728408749586,     -1.8602220416584,     -1.1199009613744,
+                          0.15635753976056,     0.87375844859025,    -0.36674403715731,
+                         0.053987893432436,      1.0957690214499,    0.053213037828563,
+                         0.013050533930825,    -0.41079520434476,      0.1463744334412,
+                        -0.055726838623719,     -0.0112017741438, -6.6062758068099E-03,
+                       4.6918522004538E-03 ]),
+              (array([ 1,  1,  1,  2,  2,  3,  4,  1,  5,  5,  1,  2,
+                                4,  4,  1,  1]),
+                        array([  0.5,  1.25, 1.875, 0.125,   1.5,     1,  0.75,   1.5, 0.625, 2.625,     5,     4,
+                                 4.5,     3,     4,     6]),
+                        array([ 0,  0,  0,  0,  0,  0,  0,  1,  1,  1,  2,  2,
+                                2,  3,  5,  5]))),
+    ('H2S', 6, array([    0.87641,    -2.0367,    0.21634,
+                       -0.050199,   0.066994, 0.00019076,
+                         0.20227, -0.0045348,    -0.2223,
+                       -0.034714,  -0.014885,  0.0074154 ]),
+              SHORT),
+    ('He', 4, array([  -0.45579024006737,    1.2516390754925,   -1.5438231650621,
+                       0.020467489707221,  -0.34476212380781, -0.020858459512787,
+                       0.016227414711778, -0.057471818200892,  0.019462416430715,
+                       -0.03329568012302, -0.010863577372367, -0.022173365245954 ]),
+              (array([ 1,  1,  1,  4,  1,  3,  5,  5,  5,  2,  1,  2]),
+                        array([    0, 0.125,  0.75,     1,  0.75, 2.625, 0.125,  1.25,     2,     1,   4.5,     5]),
+                        array([ 0,  0,  0,  0,  1,  1,  1,  1,  1,  2,  3,  3]))),
+    ('Ar', 6, array([    0.85095714803969,     -2.400322294348,    0.54127841476466,
+                        0.016919770692538,   0.068825965019035, 2.1428032815338E-04,
+                         0.17429895321992,  -0.033654495604194,   -0.13526799857691,
+                       -0.016387350791552,  -0.024987666851475, 8.8769204815709E-03 ]),
+              SHORT) ]
+
+# Parameters of the reducing functions (i, j, beta_v, gamma_v, beta_T, gamma_T),
+# all other pairs have beta = gamma = 1
+REDUCING = [
+    (     'CH4',      'N2',  0.998721377,  1.013950311,   0.99809883,  0.979273013),
+    (     'CH4',     'CO2',  0.999518072,  1.002806594,   1.02262449,  0.975665369),
+    (     'CH4',    'C2H6',  0.997547866,  1.006617867,  0.996336508,  1.049707697),
+    (     'CH4',    'C3H8',   1.00482707,  1.038470657,  0.989680305,  1.098655531),
+    (     'CH4', 'i-C4H10',  1.011240388,  1.054319053,  0.980315756,  1.161117729),
+    (     'CH4',   'C4H10',  0.979105972,  1.045375122,   0.99417491,  1.171607691),
+    (     'CH4', 'i-C5H12',            1,  1.343685343,            1,  1.188899743),
+    (     'CH4',   'C5H12',   0.94833012,  1.124508039,  0.992127525,  1.249173968),
+    (     'CH4',   'C6H14',  0.958015294,  1.052643846,  0.981844797,  1.330570181),
+    (     'CH4',   'C7H16',  0.962050831,  1.156655935,  0.977431529,  1.379850328),
+    (     'CH4',   'C8H18',  0.994740603,  1.116549372,  0.957473785,  1.449245409),
+    (     'CH4',   'C9H20',  1.002852287,  1.141895355,  0.947716769,  1.528532478),
+    (     'CH4',  'C10H22',  1.033086292,  1.146089637,  0.937777823,  1.568231489),
+    (     'CH4',      'H2',            1,  1.018702573,            1,  1.352643115),
+    (     'CH4',      'O2',            1,            1,            1,         0.95),
+    (     'CH4',      'CO',  0.997340772,  1.006102927,  0.987411732,  0.987473033),
+    (     'CH4',     'H2O',  1.012783169,  1.585018334,  1.063333913,  0.775810513),
+    (     'CH4',     'H2S',  1.012599087,  1.040161207,  1.011090031,  0.961155729),
+    (     'CH4',      'He',            1,  0.881405683,            1,  3.159776855),
+    (     'CH4',      'Ar',  1.034630259,  1.014678542,  0.990954281,  0.989843388),
+    (      'N2',     'CO2',  0.977794634,  1.047578256,  1.005894529,  1.107654104),
+    (      'N2',    'C2H6',  0.978880168,  1.042352891,  1.007671428,  1.098650964),
+    (      'N2',    'C3H8',  0.974424681,  1.081025408,  1.002677329,  1.201264026),
+    (      'N2', 'i-C4H10',   0.98641583,  1.100576129,   0.99286813,  1.284462634),
+    (      'N2',   'C4H10',   0.99608261,  1.146949309,  0.994515234,  1.304886838),
+    (      'N2', 'i-C5H12',            1,  1.154135439,            1,   1.38177077),
+    (      'N2',   'C5H12',            1,  1.078877166,            1,  1.419029041),
+    (      'N2',   'C6H14',            1,  1.195952177,            1,  1.472607971),
+    (      'N2',   'C7H16',            1,   1.40455409,            1,  1.520975334),
+    (      'N2',   'C8H18',            1,  1.186067025,            1,  1.733280051),
+    (      'N2',   'C9H20',            1,  1.100405929,   0.95637945,  1.749119996),
+    (      'N2',  'C10H22',            1,            1,  0.957934447,  1.822157123),
+    (      'N2',      'H2',  0.972532065,  0.970115357,  0.946134337,  1.175696583),
+    (      'N2',      'O2',   0.99952177,  0.997082328,  0.997190589,  0.995157044),
+    (      'N2',      'CO',            1,  1.008690943,            1,  0.993425388),
+    (      'N2',     'H2O',            1,  1.094749685,            1,  0.968808467),
+    (      'N2',     'H2S',  0.910394249,  1.256844157,  1.004692366,    0.9601742),
+    (      'N2',      'He',  0.969501055,  0.932629867,  0.692868765,   1.47183158),
+    (      'N2',      'Ar',  1.004166412,  1.002212182,  0.999069843,  0.990034831),
+    (     'CO2',    'C2H6',  1.002525718,  1.032876701,  1.013871147,   0.90094953),
+    (     'CO2',    'C3H8',  0.996898004,  1.047596298,  1.033620538,  0.908772477),
+    (     'CO2', 'i-C4H10',  1.076551882,  1.081909003,  1.023339824,  0.929982936),
+    (     'CO2',   'C4H10',  1.174760923,  1.222437324,  1.018171004,  0.911498231),
+    (     'CO2', 'i-C5H12',  1.060793104,  1.116793198,  1.019180957,  0.961218039),
+    (     'CO2',   'C5H12',  1.024311498,  1.068406078,  1.027000795,  0.979217302),
+    (     'CO2',   'C6H14',            1,  0.851343711,            1,  1.038675574),
+    (     'CO2',   'C7H16',  1.205469976,  1.164585914,  1.011806317,  1.046169823),
+    (     'CO2',   'C8H18',  1.026169373,  1.104043935,   1.02969078,  1.074455386),
+    (     'CO2',   'C9H20',            1,  0.973386152,   1.00768862,  1.140671202),
+    (     'CO2',  'C10H22',  1.000151132,  1.183394668,   1.02002879,  1.145512213),
+    (     'CO2',      'H2',  0.904142159,   1.15279255,  0.942320195,  1.782924792),
+    (     'CO2',     'H2O',  0.949055959,  1.542328793,  0.997372205,  0.775453996),
+    (     'CO2',     'H2S',  0.906630564,  1.024085837,  1.016034583,   0.92601888),
+    (     'CO2',      'He',  0.846647561,  0.864141549,   0.76837763,  3.207456948),
+    (     'CO2',      'Ar',  1.008392428,  1.029205465,  0.996512863,  1.050971635),
+    (    'C2H6',    'C3H8',  0.997607277,   1.00303472,  0.996199694,   1.01473019),
+    (    'C2H6', 'i-C4H10',            1,  1.006616886,            1,  1.033283811),
+    (    'C2H6',   'C4H10',  0.999157205,  1.006179146,  0.999130554,  1.034832749),
+    (    'C2H6', 'i-C5H12',            1,  1.045439935,            1,  1.021150247),
+    (    'C2H6',   'C5H12',  0.993851009,  1.026085655,  0.998688946,  1.066665676),
+    (    'C2H6',   'C6H14',            1,  1.169701102,            1,  1.092177796),
+    (    'C2H6',   'C7H16',            1,  1.057666085,            1,  1.134532014),
+    (    'C2H6',   'C8H18',  1.007469726,  1.071917985,  0.984068272,  1.168636194),
+    (    'C2H6',   'C9H20',            1,   1.14353473,            1,   1.05603303),
+    (    'C2H6',  'C10H22',  0.995676258,  1.098361281,  0.970918061,  1.237191558),
+    (    'C2H6',      'H2',  0.925367171,   1.10607204,  0.932969831,  1.902008495),
+    (    'C2H6',      'CO',            1,  1.201417898,            1,  1.069224728),
+    (    'C2H6',     'H2S',  1.010817909,  1.030988277,  0.990197354,   0.90273666),
+    (    'C3H8', 'i-C4H10',  0.999243146,  1.001156119,  0.998012298,  1.005250774),
+    (    'C3H8',   'C4H10',  0.999795868,  1.003264179,  1.000310289,  1.007392782),
+    (    'C3H8', 'i-C5H12',  1.040459289,  0.999432118,  0.994364425,    1.0032695),
+    (    'C3H8',   'C5H12',  1.044919431,  1.019921513,  0.996484021,  1.008344412),
+    (    'C3H8',   'C6H14',            1,  1.057872566,            1,  1.025657518),
+    (    'C3H8',   'C7H16',            1,  1.079648053,            1,  1.050044169),
+    (    'C3H8',   'C8H18',            1,  1.102764612,            1,  1.063694129),
+    (    'C3H8',   'C9H20',            1,  1.199769134,            1,  1.109973833),
+    (    'C3H8',  'C10H22',  0.984104227,  1.053040574,  0.985331233,  1.140905252),
+    (    'C3H8',      'H2',            1,   1.07400611,            1,  2.308215191),
+    (    'C3H8',      'CO',            1,  1.108143673,            1,  1.197564208),
+    (    'C3H8',     'H2O',            1,  1.011759763,            1,  0.600340961),
+    (    'C3H8',     'H2S',  0.936811219,  1.010593999,  0.992573556,  0.905829247),
+    ( 'i-C4H10',   'C4H10',  0.999120311,   1.00041444,  0.999922459,  1.001432824),
+    ( 'i-C4H10', 'i-C5H12',            1,  1.002284353,            1,  1.001835788),
+    ( 'i-C4H10',   'C5H12',            1,  1.002779804,            1,  1.002495889),
+    ( 'i-C4H10',   'C6H14',            1,  1.010493989,            1,  1.006018054),
+    ( 'i-C4H10',   'C7H16',            1,  1.021668316,            1,   1.00988576),
+    ( 'i-C4H10',   'C8H18',            1,  1.032807063,            1,  1.013945424),
+    ( 'i-C4H10',   'C9H20',            1,  1.047298475,            1,  1.017817492),
+    ( 'i-C4H10',  'C10H22',            1,  1.060243344,            1,  1.021624748),
+    ( 'i-C4H10',      'H2',            1,  1.147595688,            1,  1.895305393),
+    ( 'i-C4H10',      'CO',            1,  1.087272232,            1,  1.161390082),
+    ( 'i-C4H10',     'H2S',  1.012994431,  0.988591117,  0.974550548,  0.937130844),
+    (   'C4H10', 'i-C5H12',            1,  1.002728434,            1,  1.000792201),
+    (   'C4H10',   'C5H12',            1,   1.01815965,            1,   1.00214364),
+    (   'C4H10',   'C6H14',            1,  1.034995284,            1,   1.00915706),
+    (   'C4H10',   'C7H16',            1,  1.019174227,            1,  1.021283378),
+    (   'C4H10',   'C8H18',            1,  1.046905515,            1,  1.033180106),
+    (   'C4H10',   'C9H20',            1,  1.049219137,            1,  1.014096448),
+    (   'C4H10',  'C10H22',  0.976951968,  1.027845529,  0.993688386,  1.076466918),
+    (   'C4H10',      'H2',            1,  1.232939523,            1,  2.509259945),
+    (   'C4H10',      'CO',            1,  1.084740904,            1,  1.173916162),
+    (   'C4H10',     'H2O',            1,  1.223638763,            1,  0.615512682),
+    (   'C4H10',     'H2S',  0.908113163,  1.033366041,  0.985962886,  0.926156602),
+    (   'C4H10',      'Ar',            1,  1.214638734,            1,  1.245039498),
+    ( 'i-C5H12',   'C5H12',            1,  1.000024335,            1,  1.000050537),
+    ( 'i-C5H12',   'C6H14',            1,  1.002995876,            1,  1.001204174),
+    ( 'i-C5H12',   'C7H16',            1,  1.009928206,            1,  1.003194615),
+    ( 'i-C5H12',   'C8H18',            1,  1.017880545,            1,   1.00564748),
+    ( 'i-C5H12',   'C9H20',            1,  1.028994325,            1,  1.008191499),
+    ( 'i-C5H12',  'C10H22',            1,  1.039372957,            1,  1.010825138),
+    ( 'i-C5H12',      'H2',            1,  1.184340443,            1,  1.996386669),
+    ( 'i-C5H12',      'CO',            1,  1.116694577,            1,  1.199326059),
+    ( 'i-C5H12',     'H2S',            1,  0.835763343,            1,  0.982651529),
+    (   'C5H12',   'C6H14',            1,  1.002480637,            1,  1.000761237),
+    (   'C5H12',   'C7H16',            1,  1.008972412,            1,  1.002441051),
+    (   'C5H12',   'C8H18',            1,  1.069223964,            1,  1.016422347),
+    (   'C5H12',   'C9H20',            1,  1.034910633,            1,  1.103421755),
+    (   'C5H12',  'C10H22',            1,  1.016370338,            1,  1.049035838),
+    (   'C5H12',      'H2',            1,  1.188334783,            1,  2.013859174),
+    (   'C5H12',      'CO',            1,  1.119954454,            1,  1.206043295),
+    (   'C5H12',     'H2O',            1,   0.95667731,            1,  0.447666011),
+    (   'C5H12',     'H2S',  0.984613203,  1.076539234,  0.962006651,  0.959065662),
+    (   'C6H14',   'C7H16',            1,  1.001508227,            1,  0.999762786),
+    (   'C6H14',   'C8H18',            1,  1.006268954,            1,  1.001633952),
+    (   'C6H14',   'C9H20',            1,   1.02076168,            1,  1.055369591),
+    (   'C6H14',  'C10H22',  1.001516371,  1.013511439,   0.99764101,  1.028939539),
+    (   'C6H14',      'H2',            1,  1.243461678,            1,  3.021197546),
+    (   'C6H14',      'CO',            1,  1.155145836,            1,  1.233272781),
+    (   'C6H14',     'H2O',            1,  1.170217596,            1,  0.569681333),
+    (   'C6H14',     'H2S',  0.754473958,  1.339283552,  0.985891113,  0.956075596),
+    (   'C7H16',   'C8H18',            1,  1.006767176,            1,  0.998793111),
+    (   'C7H16',   'C9H20',            1,  1.001370076,            1,  1.001150096),
+    (   'C7H16',  'C10H22',            1,  1.002972346,            1,  1.002229938),
+    (   'C7H16',      'H2',            1,  1.159131722,            1,  3.169143057),
+    (   'C7H16',      'CO',            1,  1.190354273,            1,  1.256123503),
+    (   'C7H16',     'H2S',  0.828967164,  1.087956749,  0.988937417,  1.013453092),
+    (   'C8H18',   'C9H20',            1,  1.001357085,            1,  1.000235044),
+    (   'C8H18',  'C10H22',            1,  1.002553544,            1,  1.007186267),
+    (   'C8H18',      'H2',            1,  1.305249405,            1,  2.191555216),
+    (   'C8H18',      'CO',            1,  1.219206702,            1,  1.276565536),
+    (   'C8H18',     'H2O',            1,  0.599484191,            1,  0.662072469),
+    (   'C9H20',  'C10H22',            1,   1.00081052,            1,  1.000182392),
+    (   'C9H20',      'H2',            1,  1.342647661,            1,   2.23435404),
+    (   'C9H20',      'CO',            1,  1.252151449,            1,  1.294070556),
+    (   'C9H20',     'H2S',            1,  1.082905109,            1,  1.086557826),
+    (  'C10H22',      'H2',  1.695358382,  1.120233729,  1.064818089,  3.786003724),
+    (  'C10H22',      'CO',            1,   0.87018496,  1.049594632,  1.803567587),
+    (  'C10H22',     'H2O',            1,  0.551405318,  0.897162268,  0.740416402),
+    (  'C10H22',     'H2S',  0.975187766,  1.171714677,  0.973091413,  1.103693489),
+    (      'H2',      'CO',            1,  1.121416201,            1,  1.377504607),
+    (      'O2',     'H2O',            1,  1.143174289,            1,  0.964767932),
+    (      'O2',      'Ar',  0.999746847,  0.993907223,  1.000023103,  0.990430423),
+    (      'CO',     'H2S',  0.795660392,  1.101731308,  1.025536736,  1.022749748),
+    (      'CO',      'Ar',            1,  1.159720623,            1,  0.954215746),
+    (     'H2O',     'H2S',            1,  1.014832832,            1,  0.940587083),
+    (     'H2O',      'Ar',            1,  1.038993495,            1,  1.070941866) ]
+
+# Departure functions: (number, number of polynomial terms, n, d, t, eta, epsilon, beta, gamma)
+DEPARTURE = [
+    (1, 2, array([ -8.0926050298746E-04, -7.5381925080059E-04,   -0.041618768891219,
+                     -0.23452173681569,     0.14003840584586,    0.063281744807738,
+                    -0.034660425848809,    -0.23918747334251,  1.9855255066891E-03,
+                       6.1777746171555,     -6.9575358271105,      1.0630185306388 ]),
+           array([  3,  4,  1,  2,  2,  2,  2,  2,  2,  3,  3,  3 ]),
+           array([  0.65,  1.55,   3.1,   5.9,  7.05,  3.35,   1.2,   5.8,   2.7,  0.45,  0.55,  1.95 ]),
+           array([     0,     0,     1,     1,     1, 0.875,  0.75,   0.5,     0,     0,     0,     0 ]),
+           array([    0,    0,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5 ]),
+           array([    0,    0,    1,    1,    1, 1.25,  1.5,    2,    3,    3,    3,    3 ]),
+           array([    0,    0,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5 ])),
+    (2, 5, array([    0.013746429958576, -7.4425012129552E-03, -4.5516600213685E-03,
+                  -5.4546603350237E-03,  2.3682016824471E-03,     0.18007763721438,
+                     -0.44773942932486,      0.0193273748882,    -0.30632197804624 ]),
+           array([  3,  3,  4,  4,  4,  1,  1,  1,  2 ]),
+           array([  1.85,  3.95,     0,  1.85,  3.85,  5.25,  3.85,   0.2,   6.5 ]),
+           array([     0,     0,     0,     0,     0,  0.25,  0.25,     0,     0 ]),
+           array([    0,    0,    0,    0,    0,  0.5,  0.5,  0.5,  0.5 ]),
+           array([    0,    0,    0,    0,    0, 0.75,    1,    2,    3 ]),
+           array([    0,    0,    0,    0,    0,  0.5,  0.5,  0.5,  0.5 ])),
+    (3, 2, array([ -9.8038985517335E-03,  4.2487270143005E-04,   -0.034800214576142,
+                     -0.13333813013896,   -0.011993694974627,    0.069243379775168,
+                     -0.31022508148249,     0.24495491753226,     0.22369816716981 ]),
+           array([  1,  4,  1,  2,  2,  2,  2,  2,  3 ]),
+           array([     0,  1.85,  7.85,   5.4,     0,  0.75,   2.8,  4.45,  4.25 ]),
+           array([     0,     0,     1,     1,  0.25,     0,     0,     0,     0 ]),
+           array([    0,    0,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5 ]),
+           array([    0,    0,    1,    1,  2.5,    3,    3,    3,    3 ]),
+           array([    0,    0,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5,  0.5 ])),
+    (4, 3, array([    -0.10859387354942,    0.080228576727389, -9.3303985115717E-03,
+                     0.040989274005848,    -0.24338019772494,     0.23855347281124 ]),
+           array([  1,  2,  3,  1,  2,  3 ]),
+           array([   2.6,  1.95,     0,  3.95,  7.95,     8 ]),
+           array([     0,     0,     0,     1,   0.5,     0 ]),
+           array([    0,    0,    0,  0.5,  0.5,  0.5 ]),
+           array([    0,    0,    0,    1,    2,    3 ]),
+           array([    0,    0,    0,  0.5,  0.5,  0.5 ])),
+    (5, 2, array([    0.28661625028399,   -0.10919833861247,     -1.137403208227,
+                     0.76580544237358, 4.2638000926819E-03,    0.17673538204534 ]),
+           array([  2,  3,  1,  1,  1,  2 ]),
+           array([  1.85,   1.4,   3.2,   2.5,     8,  3.75 ]),
+           array([     0,     0,  0.25,  0.25,     0,     0 ]),
+           array([    0,    0,  0.5,  0.5,  0.5,  0.5 ]),
+           array([    0,    0, 0.75,    1,    2,    3 ]),
+           array([    0,    0,  0.5,  0.5,  0.5,  0.5 ])),
+    (6, 3, array([    -0.47376518126608,     0.48961193461001, -5.7011062090535E-03,
+                      -0.1996682004132,    -0.69411103101723,     0.69226192739021 ]),
+           array([  2,  2,  3,  1,  2,  2 ]),
+           array([     0,  0.05,     0,  3.65,   4.9,  4.45 ]),
+           array([     0,     0,     0,     1,     1, 0.875 ]),
+           array([    0,    0,    0,  0.5,  0.5,  0.5 ]),
+           array([    0,    0,    0,    1,    1, 1.25 ]),
+           array([    0,    0,    0,  0.5,  0.5,  0.5 ])),
+    (7, 4, array([    -0.25157134971934, -6.2203841111983E-03,    0.088850315184396,
+                    -0.035592212573239 ]),
+           array([  1,  3,  3,  4 ]),
+           array([     2,    -1,  1.75,   1.4 ]),
+           array([     0,     0,     0,     0 ]),
+           array([    0,    0,    0,    0 ]),
+           array([    0,    0,    0,    0 ]),
+           array([    0,    0,    0,    0 ])),
+    (10, 10, array([     2.5574776844118,    -7.9846357136353,     4.7859131465806,
+                    -0.73265392369587,     1.3805471345312,    0.28349603476365,
+                    -0.49087385940425,   -0.10291888921447,    0.11836314681968,
+                  5.5527385721943E-05 ]),
+           array([  1,  1,  1,  2,  2,  3,  3,  4,  4,  4 ]),
+           array([     1,  1.55,   1.7,  0.25,  1.35,     0,  1.25,     0,   0.7,   5.4 ]),
+           array([     0,     0,     0,     0,     0,     0,     0,     0,     0,     0 ]),
+           array([    0,    0,    0,    0,    0,    0,    0,    0,    0,    0 ]),
+           array([    0,    0,    0,    0,    0,    0,    0,    0,    0,    0 ]),
+           array([    0,    0,    0,    0,    0,    0,    0,    0,    0,    0 ])) ]
+
+# Binary pairs with a departure function: (i, j, F_ij, number of the departure function)
+PAIRS = [
+    (     'CH4',      'N2',                1,  3),
+    (     'CH4',     'CO2',                1,  4),
+    (     'CH4',    'C2H6',                1,  1),
+    (     'CH4',    'C3H8',                1,  2),
+    (     'CH4', 'i-C4H10',   0.771035405688, 10),
+    (     'CH4',   'C4H10',                1, 10),
+    (     'CH4',      'H2',                1,  7),
+    (      'N2',     'CO2',                1,  5),
+    (      'N2',    'C2H6',                1,  6),
+    (    'C2H6',    'C3H8',    0.13042476515, 10),
+    (    'C2H6', 'i-C4H10',   0.260632376098, 10),
+    (    'C2H6',   'C4H10',   0.281570073085, 10),
+    (    'C3H8', 'i-C4H10', -0.0551609771024, 10),
+    (    'C3H8',   'C4H10',  0.0312572600489, 10),
+    ( 'i-C4H10',   'C4H10', -0.0551240293009, 10) ]
+
+### DETAIL ###
+
+# Gas constant of DETAIL [kJ/kmol-K]
+R_DETAIL = 8.31451
+
+# Molar masses [kg/kmol], coefficients a_n and exponents b_n, k_n, u_n, g_n, q_n, f_n, s_n, w_n
+# of the 58 terms, and the parameters E_i, K_i, G_i, Q_i, F_i, S_i, W_i of the components
+MW_DETAIL = array([  16.043, 28.0135,   44.01,   30.07,  44.097,  58.123,
+                     58.123,   72.15,   72.15,  86.177, 100.204, 114.231,
+                    128.258, 142.285,  2.0159, 31.9988,   28.01, 18.0153,
+                     34.082,  4.0026,  39.948 ])
+AN = array([        0.1538326,         1.341953,        -2.998583,      -0.04831228,        0.3757965,        -1.589575,
+                   -0.05358847,       0.88659463,      -0.71023704,        -1.471722,       1.32185035,      -0.78665925,
+              0.00000000229129,        0.1576724,       -0.4363864,      -0.04408159,     -0.003433888,       0.03205905,
+                    0.02487355,       0.07332279,     -0.001600573,        0.6424706,       -0.4162601,      -0.06689957,
+                     0.2791795,       -0.6966051,     -0.002860589,     -0.008098836,         3.150547,      0.007224479,
+                    -0.7057529,        0.5349792,      -0.07931491,        -1.418465,     -5.99905E-17,        0.1058402,
+                    0.03431729,     -0.007022847,       0.02495587,       0.04296818,        0.7465453,       -0.2919613,
+                      7.294616,        -9.936757,     -0.005399808,       -0.2432567,       0.04987016,      0.003733797,
+                      1.874951,      0.002168144,       -0.6587164,      0.000205518,      0.009776195,      -0.02048708,
+                    0.01557322,      0.006862415,     -0.001226752,      0.002850908 ])
+BN = array([ 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2,
+              2, 2, 2, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 4, 4, 4,
+              4, 4, 4, 4, 5, 5, 5, 5, 5, 6, 6, 7, 7, 8, 8, 8, 9, 9 ])
+KN = array([ 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 3, 2, 2, 2, 4, 4, 0, 0,
+              2, 2, 2, 4, 4, 4, 4, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4, 0, 0, 2,
+              2, 2, 4, 4, 0, 2, 2, 4, 4, 0, 2, 0, 2, 1, 2, 2, 2, 2 ])
+UN = array([    0,  0.5,    1,  3.5, -0.5,  4.5,
+               0.5,  7.5,  9.5,    6,   12, 12.5,
+                -6,    2,    3,    2,    2,   11,
+              -0.5,  0.5,    0,    4,    6,   21,
+                23,   22,   -1, -0.5,    7,   -1,
+                 6,    4,    1,    9,  -13,   21,
+                 8, -0.5,    0,    2,    7,    9,
+                22,   23,    1,    9,    3,    8,
+                23,  1.5,    5, -0.5,    4,    7,
+                 3,    0,    1,    0 ])
+GN = array([ 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0, 1, 0, 0 ])
+QN = array([ 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0,
+              0, 1, 0, 0, 0, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1 ])
+FN = array([ 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0 ])
+SN = array([ 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0 ])
+WN = array([ 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0 ])
+EI = array([   151.3183,   99.73778,   241.9606,   244.1667,   298.1183,   324.0689,
+                337.6389,   365.5999,   370.6823, 402.636293,  427.72263, 450.325022,
+              470.840891, 489.558373,   26.95794,   122.7667,   105.5348,   514.0156,
+                 296.355,   2.610111,   119.6299 ])
+KI = array([ 0.4619255, 0.4479153, 0.4557489, 0.5279209,  0.583749, 0.6406937,
+              0.6341423, 0.6738577, 0.6798307, 0.7175118, 0.7525189,  0.784955,
+              0.8152731, 0.8437826, 0.3514916, 0.4186954, 0.4533894, 0.3825868,
+              0.4618263, 0.3589888, 0.4216551 ])
+GI = array([        0, 0.027815, 0.189065,   0.0793, 0.141239, 0.256692,
+              0.281835, 0.332267, 0.366911, 0.289731, 0.337542, 0.383381,
+              0.427354, 0.469659, 0.034369,    0.021, 0.038953,   0.3325,
+                0.0885,        0,        0 ])
+QI = array([        0,        0,     0.69,        0,        0,        0,
+                     0,        0,        0,        0,        0,        0,
+                     0,        0,        0,        0,        0,  1.06775,
+              0.633276,        0,        0 ])
+FI = array([ 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0,
+              0, 0, 1, 0, 0, 0,
+              0, 0, 0 ])
+SI = array([      0,      0,      0,      0,      0,      0,
+                   0,      0,      0,      0,      0,      0,
+                   0,      0,      0,      0,      0, 1.5822,
+                0.39,      0,      0 ])
+WI = array([ 0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 0,
+              0, 0, 0, 0, 0, 1,
+              0, 0, 0 ])
+# Binary interaction parameters (i, j, E_ij, U_ij, K_ij, G_ij), all other pairs have 1
+DETAIL_BINARY = [
+    (     'CH4',      'N2',   0.97164,  0.886106,   1.00363,         1),
+    (     'CH4',     'CO2',  0.960644,  0.963827,  0.995933,  0.807653),
+    (     'CH4',    'C3H8',  0.994635,  0.990877,  1.007619,         1),
+    (     'CH4', 'i-C4H10',   1.01953,         1,         1,         1),
+    (     'CH4',   'C4H10',  0.989844,  0.992291,  0.997596,         1),
+    (     'CH4', 'i-C5H12',   1.00235,         1,         1,         1),
+    (     'CH4',   'C5H12',  0.999268,   1.00367,  1.002529,         1),
+    (     'CH4',   'C6H14',  1.107274,  1.302576,  0.982962,         1),
+    (     'CH4',   'C7H16',   0.88088,  1.191904,  0.983565,         1),
+    (     'CH4',   'C8H18',  0.880973,  1.205769,  0.982707,         1),
+    (     'CH4',   'C9H20',  0.881067,  1.219634,  0.981849,         1),
+    (     'CH4',  'C10H22',  0.881161,  1.233498,  0.980991,         1),
+    (     'CH4',      'H2',   1.17052,   1.15639,   1.02326,   1.95731),
+    (     'CH4',      'CO',  0.990126,         1,         1,         1),
+    (     'CH4',     'H2O',  0.708218,         1,         1,         1),
+    (     'CH4',     'H2S',  0.931484,  0.736833,   1.00008,         1),
+    (      'N2',     'CO2',   1.02274,  0.835058,  0.982361,  0.982746),
+    (      'N2',    'C2H6',   0.97012,  0.816431,   1.00796,         1),
+    (      'N2',    'C3H8',  0.945939,  0.915502,         1,         1),
+    (      'N2', 'i-C4H10',  0.946914,         1,         1,         1),
+    (      'N2',   'C4H10',  0.973384,  0.993556,         1,         1),
+    (      'N2', 'i-C5H12',   0.95934,         1,         1,         1),
+    (      'N2',   'C5H12',   0.94552,         1,         1,         1),
+    (      'N2',      'H2',   1.08632,  0.408838,   1.03227,         1),
+    (      'N2',      'O2',     1.021,         1,         1,         1),
+    (      'N2',      'CO',   1.00571,         1,         1,         1),
+    (      'N2',     'H2O',  0.746954,         1,         1,         1),
+    (      'N2',     'H2S',  0.902271,  0.993476,  0.942596,         1),
+    (     'CO2',    'C2H6',  0.925053,   0.96987,   1.00851,  0.370296),
+    (     'CO2',    'C3H8',  0.960237,         1,         1,         1),
+    (     'CO2', 'i-C4H10',  0.906849,         1,         1,         1),
+    (     'CO2',   'C4H10',  0.897362,         1,         1,         1),
+    (     'CO2', 'i-C5H12',  0.726255,         1,         1,         1),
+    (     'CO2',   'C5H12',  0.859764,         1,         1,         1),
+    (     'CO2',   'C6H14',  0.855134,  1.066638,  0.910183,         1),
+    (     'CO2',   'C7H16',  0.831229,  1.077634,  0.895362,         1),
+    (     'CO2',   'C8H18',   0.80831,  1.088178,  0.881152,         1),
+    (     'CO2',   'C9H20',  0.786323,  1.098291,   0.86752,         1),
+    (     'CO2',  'C10H22',  0.765171,  1.108021,  0.854406,         1),
+    (     'CO2',      'H2',   1.28179,         1,         1,         1),
+    (     'CO2',      'CO',       1.5,       0.9,         1,         1),
+    (     'CO2',     'H2O',  0.849408,         1,         1,   1.67309),
+    (     'CO2',     'H2S',  0.955052,   1.04529,   1.00779,         1),
+    (    'C2H6',    'C3H8',   1.02256,  1.065173,  0.986893,         1),
+    (    'C2H6', 'i-C4H10',         1,      1.25,         1,         1),
+    (    'C2H6',   'C4H10',   1.01306,      1.25,         1,         1),
+    (    'C2H6', 'i-C5H12',         1,      1.25,         1,         1),
+    (    'C2H6',   'C5H12',   1.00532,      1.25,         1,         1),
+    (    'C2H6',      'H2',   1.16446,   1.61666,   1.02034,         1),
+    (    'C2H6',     'H2O',  0.693168,         1,         1,         1),
+    (    'C2H6',     'H2S',  0.946871,  0.971926,  0.999969,         1),
+    (    'C3H8',   'C4H10',    1.0049,         1,         1,         1),
+    (    'C3H8',      'H2',  1.034787,         1,         1,         1),
+    ( 'i-C4H10',      'H2',       1.3,         1,         1,         1),
+    (   'C4H10',      'H2',       1.3,         1,         1,         1),
+    (   'C6H14',     'H2S',  1.008692,  1.028973,   0.96813,         1),
+    (   'C7H16',     'H2S',  1.010126,  1.033754,   0.96287,         1),
+    (   'C8H18',     'H2S',  1.011501,  1.038338,  0.957828,         1),
+    (   'C9H20',     'H2S',  1.012821,  1.042735,  0.952441,         1),
+    (  'C10H22',     'H2S',  1.014089,  1.046966,  0.948338,         1),
+    (      'H2',      'CO',       1.1,         1,         1,         1) ]
+
+### EQUATIONS OF STATE ###
+
+def _chunks(N):
+    '''Slices of at most CHUNK states.'''
+    return [slice(k,k+CHUNK) for k in range(0,N,CHUNK)]
+
+def _hyperbolic(th,n,T):
+    '''
+    Terms of the ideal gas part with the Einstein functions sinh (theta_4, theta_6)
+    and cosh (theta_5, theta_7): returns log|f|, theta/T*f'/f and (theta/T/f)**2 with
+    the sign of each term [N,21,4] (zero where theta = 0).
+    '''
+
+    with errstate(divide='ignore',invalid='ignore',over='ignore'):
+        th0T = th/T[:,newaxis,newaxis]
+        ep   = exp(th0T)
+        hsn  = (ep - 1/ep)/2
+        hcn  = (ep + 1/ep)/2
+
+        sinh_ = array([True,False,True,False])
+        on    = th > EPS
+
+        loghyp = where(sinh_,log(abs(hsn)),-log(abs(hcn)))
+        dhyp   = where(sinh_,th0T*hcn/hsn,-th0T*hsn/hcn)
+        d2hyp  = where(sinh_,(th0T/hsn)**2,(th0T/hcn)**2)
+
+        return where(on,n*loghyp,0.0), where(on,n*dhyp,0.0), where(on,n*d2hyp,0.0)
+
+class Equation:
+    '''
+    Common parts of the equations of state: compositions, the density
+    solver and the properties derived from the Helmholtz energy.
+    Derived classes define R, MW and _pressure, _alphar and _alpha0.
+    '''
+
+    name = None
+    R    = None
+    MW   = None
+
+    def fractions(self,names,x):
+        '''
+        Convert the molar fractions x [N,S] of substances names [S] to the
+        molar fractions of the components [N,21] of the gas: condensed substances
+        ('(l)','(s)') are not part of the gas and gases that are not components of
+        the equation are left out, the remaining fractions are normalized.
+
+        Returns the fractions of the components [N,21], the fraction of gas in
+        each mixture [N] and the fraction of the gas left out [N].
+        '''
+
+        x = atleast_2d(asarray(x,dtype=float64))
+
+        xc   = zeros([x.shape[0],NC])
+        xgas = zeros(x.shape[0])
+        for k,name in enumerate(names):
+            if name.endswith('(l)') or name.endswith('(s)'): continue
+            xgas = xgas + x[:,k]
+            name = ALIASES.get(name,name)
+            if name in NAMES: xc[:,NAMES.index(name)] += x[:,k]
+
+        xtot = sum(xc,axis=1)
+        with errstate(divide='ignore',invalid='ignore'):
+            xc   = where(xtot[:,newaxis] > 0,xc/xtot[:,newaxis],0.0)
+            xout = where(xgas > 0,1.0 - xtot/xgas,0.0)
+
+        return xc, xgas, xout
+
+    def _states(self,T,a,x):
+        '''Broadcast T, a second state variable and x to [N], [N] and [N,21].'''
+
+        x = atleast_2d(asarray(x,dtype=float64))
+        if not x.shape[1] == NC:
+            sys.exit("aga8:: Error: {}: molar fractions of {} components needed, not {}.".format(self.name,NC,x.shape[1]))
+
+        T = ravel(asarray(T,dtype=float64))
+        a = ravel(asarray(a,dtype=float64))
+
+        N = max([x.shape[0],len(T),len(a)])
+        T = broadcast_to(T,(N,))
+        a = broadcast_to(a,(N,))
+        x = broadcast_to(x,(N,NC))
+
+        return T, a, x
+
+    def molar_mass(self,x):
+        '''Molar mass [kg/kmol] of the mixtures x [N,21].'''
+        return dot(atleast_2d(asarray(x,dtype=float64)),self.MW)
+
+    def pressure(self,T,D,x):
+        '''Pressure [bar] and compressibility factor Z at T [K] and molar density D [kmol/m3].'''
+
+        T,D,x = self._states(T,D,x)
+
+        P = empty(len(T))
+        Z = empty(len(T))
+        for sl in _chunks(len(T)):
+            P[sl],Z[sl],dPdD = self._pressure(T[sl],D[sl],x[sl])
+
+        return P/100.0, Z
+
+    def density(self,T,p,x):
+        '''
+        Molar density D [kmol/m3] of the gas at T [K] and p [bar], and the error flag
+        ierr [N]: 1 where the solver did not converge (D is then the ideal gas density).
+        '''
+
+        T,p,x = self._states(T,p,x)
+
+        D    = empty(len(T))
+        ierr = empty(len(T),dtype=intp)
+        for sl in _chunks(len(T)):
+            D[sl],ierr[sl] = self._density(T[sl],p[sl]*100.0,x[sl])
+
+        return D, ierr
+
+    def departure(self,T,p,x):
+        '''
+        Residual (real gas minus ideal gas) enthalpy h_r [kJ/kmol] and entropy
+        s_r [kJ/kmol-K] of the gas at T [K] and p [bar], and the error flag of
+        the density (see density). h_r = s_r = 0 (ideal gas) where ierr = 1.
+        '''
+
+        T,p,x = self._states(T,p,x)
+        D,ierr = self.density(T,p,x)
+
+        h_r = zeros(len(T))
+        s_r = zeros(len(T))
+        for sl in _chunks(len(T)):
+            h_r[sl],s_r[sl],Z = self._departure(T[sl],D[sl],x[sl])
+
+        ok  = logical_and(ierr == 0,D > 0)
+        h_r = where(ok,h_r,0.0)
+        s_r = where(ok,s_r,0.0)
+
+        return h_r, s_r, ierr
+
+    def departure_derivatives(self,T,p,x,dx=(),step=1e-6):
+        '''
+        Residual enthalpy and entropy (see departure) at T [K] and p [bar] and
+        their derivatives: with respect to T at constant p [kJ/kmol-K, kJ/kmol-K2]
+        and to p at constant T [kJ/kmol/bar, kJ/kmol-K/bar],
+
+            dh/dT = Cp,   ds/dT = Cp/T,   dh/dp = v - T*dv/dT,   ds/dp = -dv/dT
+
+        minus those of the ideal gas (Cp0 = Cv at D = 0 plus R, dh/dp = 0,
+        ds/dp = -R/p), and along each direction of the molar fractions in dx
+        (a list of [N,21]) at constant T and p. These are central differences
+        (steps step) at the density D of the state, corrected for the change
+        of the density at constant p (the density is only solved once):
+
+            dh_r/dx = dh_r/dx|D - dh_r/dD|x * (dP/dx|D) / (dP/dD)
+
+        Returns an OrderedDict of h_r, s_r, h_T, s_T, h_p, s_p [N], the lists
+        h_x, s_x ([N] for each direction) and ierr. All values are 0 where
+        the density did not converge (see density).
+        '''
+
+        T,p,x = self._states(T,p,x)
+        D,ierr = self.density(T,p,x)
+
+        def residual(D,x):
+            # Residual enthalpy and entropy and the pressure [bar] at (T,D)
+            h_r = empty(len(T))
+            s_r = empty(len(T))
+            P   = empty(len(T))
+            for sl in _chunks(len(T)):
+                h_r[sl],s_r[sl],Z = self._departure(T[sl],D[sl],x[sl])
+                P[sl] = D[sl]*self.R*T[sl]*Z/100.0
+            return h_r, s_r, P
+
+        props = self.properties(T,D,x)
+        ideal = self.properties(T,zeros(len(T)),x)
+
+        out = OrderedDict()
+        out['h_r'],out['s_r'],P = residual(D,x)
+
+        with errstate(divide='ignore',invalid='ignore'):
+            Cp_r = props['Cp'] - (ideal['Cv'] + self.R)
+            dvdT = props['dPdT']/(D**2*props['dPdD'])      # m3/kmol-K
+
+            # kJ/kmol/kPa => kJ/kmol/bar
+            out['h_T'] = Cp_r
+            out['s_T'] = Cp_r/T
+            out['h_p'] = 100.0*(1.0/D - T*dvdT)
+            out['s_p'] = -100.0*dvdT + self.R/p
+
+        # Derivatives with respect to D at constant T and x
+        if len(dx) > 0:
+            hp,sp,Pp = residual(D*(1+step),x)
+            hm,sm,Pm = residual(D*(1-step),x)
+            with errstate(divide='ignore',invalid='ignore'):
+                h_D = (hp-hm)/(2*step*D)
+                s_D = (sp-sm)/(2*step*D)
+
+        out['h_x'] = []
+        out['s_x'] = []
+        for d in dx:
+            d = broadcast_to(asarray(d,dtype=float64),x.shape)
+            hp,sp,Pp = residual(D,x + step*d)
+            hm,sm,Pm = residual(D,x - step*d)
+            with errstate(divide='ignore',invalid='ignore'):
+                dDdx = -(Pp-Pm)/(2*step)/props['dPdD']
+                out['h_x'].append((hp-hm)/(2*step) + h_D*dDdx)
+                out['s_x'].append((sp-sm)/(2*step) + s_D*dDdx)
+
+        ok = logical_and(ierr == 0,D > 0)
+        for key in out:
+            if key in ['h_x','s_x']:
+                out[key] = [where(ok,val,0.0) for val in out[key]]
+            else:
+                out[key] = where(ok,out[key],0.0)
+        out['ierr'] = ierr
+
+        return out
+
+    def properties(self,T,D,x):
+        '''
+        Properties at T [K] and molar density D [kmol/m3] (see density), as calculated
+        by the NIST code, but with pressures in bar. Returns an OrderedDict of arrays [N]:
+          P [bar], Z, dPdD [bar/(kmol/m3)], d2PdD2 [bar/(kmol/m3)^2], d2PdTD [bar/(kmol/m3)/K],
+          dPdT [bar/K], U, H, G [kJ/kmol], S, Cv, Cp [kJ/kmol-K], W [m/s], JT [K/bar],
+          Kappa (isentropic exponent) and MW [kg/kmol]
+        Energies and entropies are those of the NIST code (ideal gas part included).
+        '''
+
+        T,D,x = self._states(T,D,x)
+
+        out = None
+        for sl in _chunks(len(T)):
+            props = self._properties(T[sl],D[sl],x[sl])
+            if out is None:
+                out = OrderedDict([(key,empty(len(T))) for key in props])
+            for key,val in props.items(): out[key][sl] = val
+
+        # Pressures kPa => bar
+        for key in ['P','dPdD','d2PdD2','d2PdTD','dPdT']: out[key] = out[key]/100.0
+        out['JT'] = out['JT']*100.0
+
+        return out
+
+    def _derived(self,T,D,x,Z,dPdD,dPdT,Cv,Cp):
+        '''Speed of sound, Joule-Thomson coefficient and isentropic exponent.'''
+
+        MW = self.molar_mass(x)
+        with errstate(divide='ignore',invalid='ignore'):
+            JT = where(D > EPS,(T/D*dPdT/dPdD - 1)/Cp/D,1e20)
+            W  = sqrt(maximum(1000*Cp/Cv*dPdD/MW,0.0))
+            Kappa = W**2*MW/(self.R*T*1000*Z)
+
+        return W, JT, Kappa, MW
+
+class GERG2008(Equation):
+    '''
+    GERG-2008 equation of state (AGA8 Part 2), translated from GERG2008.cpp.
+
+    The coefficients are stored as arrays over the components and terms,
+    after the transformations of SetupGERG:
+
+      n, d, t, c   : [21,24] pure fluid terms (padded with n = 0)
+      bv,gv,bt,gt  : [21,21] reducing functions (upper triangle)
+      pi, pj, F    : [pairs] binary pairs with a departure function
+      pn,pd,pt,pc,pe,pg : [pairs,12] their departure functions (padded with n = 0)
+      n0, th0      : [21,7], [21,4] ideal gas part
+    '''
+
+    name = "GERG-2008"
+    R    = R_GERG
+    MW   = MW_GERG
+
+    def __init__(self):
+
+        K = max([len(n) for name,kpol,n,exps in PURE])
+
+        self.n = zeros([NC,K])
+        self.d = zeros([NC,K])
+        self.t = zeros([NC,K])
+        self.c = zeros([NC,K])
+        for name,kpol,n,exps in PURE:
+            i = NAMES.index(name)
+            d,t,c = exps
+            self.n[i,:len(n)] = n
+            self.d[i,:len(n)] = d
+            self.t[i,:len(n)] = t
+            self.c[i,:len(n)] = c
+
+        ## Reducing functions (the diagonal is the critical point of each component)
+        bv = triu(ones([NC,NC]))
+        gv = triu(ones([NC,NC]))
+        bt = triu(ones([NC,NC]))
+        gt = triu(ones([NC,NC]))
+        for ni,nj,bv_,gv_,bt_,gt_ in REDUCING:
+            i,j = NAMES.index(ni),NAMES.index(nj)
+            bv[i,j],gv[i,j],bt[i,j],gt[i,j] = bv_,gv_,bt_,gt_
+
+        Vc3 = 1/DC_GERG**(1.0/3.0)/2
+        Tc2 = sqrt(TC_GERG)
+        gv  = gv*bv*(Vc3[:,newaxis] + Vc3[newaxis,:])**3
+        gt  = gt*bt*Tc2[:,newaxis]*Tc2[newaxis,:]
+        bv  = bv**2
+        bt  = bt**2
+
+        ii = arange(NC)
+        bv[ii,ii] = 1.0
+        bt[ii,ii] = 1.0
+        gv[ii,ii] = 1/DC_GERG
+        gt[ii,ii] = TC_GERG
+
+        self.bv,self.gv,self.bt,self.gt = bv,gv,bt,gt
+
+        # Factor of the sum over the pairs (i,j >= i): 1 on the diagonal, 2 above
+        self.F_red = triu(ones([NC,NC]),1)*2 + eye(NC)
+
+        ## Departure functions of the binary pairs, with the exponents
+        ## rearranged as in SetupGERG: exp(c*del^2 + e*del + g)
+        models = OrderedDict([(mn,(n,d,t,eta,eps,beta,gamma)) for mn,kpol,n,d,t,eta,eps,beta,gamma in DEPARTURE])
+        K  = max([len(val[0]) for val in models.values()])
+        P  = len(PAIRS)
+
+        self.pi = asarray([NAMES.index(ni) for ni,nj,F,mn in PAIRS],dtype=intp)
+        self.pj = asarray([NAMES.index(nj) for ni,nj,F,mn in PAIRS],dtype=intp)
+        self.F  = asarray([F for ni,nj,F,mn in PAIRS])
+
+        for key in ['pn','pd','pt','pc','pe','pg']: setattr(self,key,zeros([P,K]))
+        for k,(ni,nj,F,mn) in enumerate(PAIRS):
+            n,d,t,eta,eps,beta,gamma = models[mn]
+            m = len(n)
+            self.pn[k,:m] = n
+            self.pd[k,:m] = d
+            self.pt[k,:m] = t
+            self.pc[k,:m] = -eta
+            self.pe[k,:m] = 2*eta*eps - beta
+            self.pg[k,:m] = -eta*eps**2 + beta*gamma
+
+        ## Ideal gas part: constants n_1 and n_2 for the reference state
+        ## of the NIST code (T0 = 298.15 K, p0 = 101.325 kPa)
+        T0 = 298.15
+        d0 = 101.325/R_GERG/T0
+        n0 = N0.copy()
+        n0[:,2] = n0[:,2] - 1
+        n0[:,1] = n0[:,1] + T0
+        n0      = n0*R_GERG0/R_GERG
+        n0[:,1] = n0[:,1] - T0
+        n0[:,0] = n0[:,0] - log(d0)
+
+        self.n0  = n0
+        self.th0 = TH0
+
+        return
+
+    def reducing(self,x):
+        '''Reducing temperature Tr [K] and density Dr [kmol/m3] of the mixtures x [N,21].'''
+
+        x  = atleast_2d(asarray(x,dtype=float64))
+        a  = flatnonzero(any(x > EPS,axis=0))
+        xa = x[:,a]
+        xi = xa[:,:,newaxis]
+        xj = xa[:,newaxis,:]
+
+        xij = self.F_red[ix_(a,a)]*xi*xj*(xi + xj)
+
+        with errstate(divide='ignore',invalid='ignore'):
+            den = self.bv[ix_(a,a)]*xi + xj
+            Vr  = sum(where(den > 0,xij*self.gv[ix_(a,a)]/den,0.0),axis=(1,2))
+            den = self.bt[ix_(a,a)]*xi + xj
+            Tr  = sum(where(den > 0,xij*self.gt[ix_(a,a)]/den,0.0),axis=(1,2))
+            Dr  = where(Vr > EPS,1/Vr,0.0)
+
+        return Tr, Dr
+
+    def _alphar(self,T,D,x):
+        '''
+        Reduced residual Helmholtz energy and its derivatives ar[i,j] [3,4,N]
+        (tau^i*delta^j times the derivatives in tau and delta, as in AlpharGERG).
+        Only the components in the mixtures and their pairs are evaluated.
+        '''
+
+        Tr,Dr = self.reducing(x)
+        dl    = D/Dr
+        lntau = log(Tr/T)
+
+        ar = zeros([3,4,len(T)])
+
+        ## Pure fluid terms [N,component,term]
+        a  = flatnonzero(any(x > EPS,axis=0))
+        n,d,t,c = self.n[a],self.d[a],self.t[a],self.c[a]
+
+        dl_ = dl[:,newaxis,newaxis]
+        dc  = dl_**c
+        ndt = x[:,a,newaxis]*n*dl_**d*exp(t*lntau[:,newaxis,newaxis])*where(c > 0,exp(-dc),1.0)
+        ex  = c*dc
+        ex2 = d - ex
+        ex3 = ex2*(ex2 - 1)
+        ndtt = ndt*t
+
+        ar[0,0] = sum(ndt,axis=(1,2))
+        ar[0,1] = sum(ndt*ex2,axis=(1,2))
+        ar[0,2] = sum(ndt*(ex3 - c*ex),axis=(1,2))
+        ar[0,3] = sum(ndt*(ex3*(ex2 - 2) - ex*(3*ex2 - 3 + c)*c),axis=(1,2))
+        ar[1,0] = sum(ndtt,axis=(1,2))
+        ar[2,0] = sum(ndtt*(t - 1),axis=(1,2))
+        ar[1,1] = sum(ndtt*ex2,axis=(1,2))
+        ar[1,2] = sum(ndtt*(ex3 - c*ex),axis=(1,2))
+
+        ## Departure functions of the binary pairs [N,pair,term]
+        on = any(x[:,self.pi]*x[:,self.pj] > 0,axis=0)
+        if any(on):
+            pi,pj = self.pi[on],self.pj[on]
+            n,d,t = self.pn[on],self.pd[on],self.pt[on]
+            c,e,g = self.pc[on],self.pe[on],self.pg[on]
+
+            xijf = x[:,pi]*x[:,pj]*self.F[on]
+            cd2  = c*dl_**2
+            ed   = e*dl_
+            ndt  = xijf[:,:,newaxis]*n*dl_**d*exp(cd2 + ed + g + t*lntau[:,newaxis,newaxis])
+            ex   = d + 2*cd2 + ed
+            ex2  = ex*ex - d + 2*cd2
+            ndtt = ndt*t
+
+            ar[0,0] += sum(ndt,axis=(1,2))
+            ar[0,1] += sum(ndt*ex,axis=(1,2))
+            ar[0,2] += sum(ndt*ex2,axis=(1,2))
+            ar[0,3] += sum(ndt*(ex*(ex2 - 2*(d - 2*cd2)) + 2*d),axis=(1,2))
+            ar[1,0] += sum(ndtt,axis=(1,2))
+            ar[2,0] += sum(ndtt*(t - 1),axis=(1,2))
+            ar[1,1] += sum(ndtt*ex,axis=(1,2))
+            ar[1,2] += sum(ndtt*ex2,axis=(1,2))
+
+        return ar
+
+    def _alpha0(self,T,D,x):
+        '''Reduced ideal gas Helmholtz energy a0[0] and tau derivatives a0[1], a0[2] [3,N] (Alpha0GERG).'''
+
+        n0  = self.n0
+        hyp0,hyp1,hyp2 = _hyperbolic(self.th0,n0[:,3:],T)
+
+        on  = x > EPS
+        Ti  = 1/T[:,newaxis]
+        lnT = log(T)[:,newaxis]
+
+        a0 = zeros([3,len(T)])
+        with errstate(divide='ignore',invalid='ignore'):
+            logxD = log(maximum(D,EPS))[:,newaxis] + log(x)
+            a0[0] = sum(where(on,x*(logxD + n0[:,0] + n0[:,1]*Ti - n0[:,2]*lnT + sum(hyp0,axis=2)),0.0),axis=1)
+        a0[1] = sum(where(on,x*(n0[:,2] + n0[:,1]*Ti + sum(hyp1,axis=2)),0.0),axis=1)
+        a0[2] = -sum(where(on,x*(n0[:,2] + sum(hyp2,axis=2)),0.0),axis=1)
+
+        return a0
+
+    def _pressure(self,T,D,x):
+        '''Pressure [kPa], Z and dP/dD (PressureGERG).'''
+
+        ar = self._alphar(T,D,x)
+        RT = self.R*T
+        Z  = 1 + ar[0,1]
+
+        return D*RT*Z, Z, RT*(1 + 2*ar[0,1] + ar[0,2])
+
+    def _density(self,T,P,x):
+        '''
+        Density [kmol/m3] at T and P [kPa] (DensityGERG with iFlag = 0): Newton's method
+        in log(v) for all states in lockstep, restarted from liquid-like densities
+        if it fails. Converged states are removed from the iteration.
+        '''
+
+        N  = len(T)
+        D  = P/self.R/T
+        Dcx = 1/dot(x,1/DC_GERG)            # pseudo-critical density
+
+        ierr  = zeros(N,dtype=intp)
+        nfail = zeros(N,dtype=intp)
+        plog  = log(maximum(P,EPS))
+        vlog  = -log(maximum(D,EPS))
+
+        D[P < EPS] = 0.0
+        act = flatnonzero(P >= EPS)
+
+        for it in range(1,51):
+
+            if len(act) == 0: break
+
+            # Restart states that went bad or take too long from different densities
+            rs = act[logical_or.reduce([vlog[act] < -7,vlog[act] > 100,full(len(act),it in (20,30,40))])]
+            if len(rs) > 0:
+                fail = rs[nfail[rs] > 2]
+                ierr[fail] = 1
+                D[fail]    = P[fail]/self.R/T[fail]
+                nfail[rs] += 1
+                Dn = choose(minimum(nfail[rs],4)-1,[Dcx[rs]*3,Dcx[rs]*2.5,Dcx[rs]*2,D[rs]])
+                vlog[rs] = -log(Dn)
+
+            Da = exp(-vlog[act])
+            P2,Z,dPdD = self._pressure(T[act],Da,x[act])
+
+            # Two-phase states: step away from them, others: Newton step in log(v)
+            bad  = logical_or(dPdD < EPS,P2 < EPS)
+            vinc = where(Da > Dcx[act],-0.1,0.1)
+            if it > 5: vinc = vinc/2
+            if it > 10 and it < 20: vinc = vinc/5
+
+            with errstate(divide='ignore',invalid='ignore'):
+                vdiff = (log(P2) - plog[act])*P2/(-Da*dPdD)
+
+            vlog[act] = where(bad,vlog[act] + vinc,vlog[act] - vdiff)
+
+            done = logical_and(logical_not(bad),abs(vdiff) < TOL)
+            D[act[done]] = exp(-vlog[act[done]])
+            act = act[logical_not(done)]
+
+        # Not converged: ideal gas density
+        ierr[act] = 1
+        D[act]    = P[act]/self.R/T[act]
+
+        return D, ierr
+
+    def _departure(self,T,D,x):
+        '''Residual enthalpy and entropy at (T,p) and Z from the state (T,D).'''
+
+        ar = self._alphar(T,D,x)
+        Z  = 1 + ar[0,1]
+
+        with errstate(divide='ignore',invalid='ignore'):
+            h_r = self.R*T*(ar[0,1] + ar[1,0])
+            s_r = self.R*(ar[1,0] - ar[0,0] + log(Z))
+
+        return h_r, s_r, Z
+
+    def _properties(self,T,D,x):
+        '''Properties at (T,D), see properties (PropertiesGERG).'''
+
+        a0 = self._alpha0(T,D,x)
+        ar = self._alphar(T,D,x)
+
+        R  = self.R
+        RT = R*T
+
+        out = OrderedDict()
+        out['Z']      = Z = 1 + ar[0,1]
+        out['P']      = P = D*RT*Z
+        out['dPdD']   = dPdD = RT*(1 + 2*ar[0,1] + ar[0,2])
+        with errstate(divide='ignore',invalid='ignore'):
+            out['d2PdD2'] = where(D > EPS,RT*(2*ar[0,1] + 4*ar[0,2] + ar[0,3])/D,0.0)
+        out['d2PdTD'] = R*(1 + 2*ar[0,1] + ar[0,2] - 2*ar[1,1] - ar[1,2])
+        out['dPdT']   = dPdT = D*R*(1 + ar[0,1] - ar[1,1])
+        out['U']      = RT*(a0[1] + ar[1,0])
+        out['H']      = RT*(1 + ar[0,1] + a0[1] + ar[1,0])
+        out['S']      = R*(a0[1] + ar[1,0] - a0[0] - ar[0,0])
+        out['Cv']     = Cv = -R*(a0[2] + ar[2,0])
+        with errstate(divide='ignore',invalid='ignore'):
+            out['Cp'] = Cp = where(D > EPS,Cv + T*(dPdT/D)**2/dPdD,Cv + R)
+        out['G']      = RT*(1 + ar[0,1] + a0[0] + ar[0,0])
+        out['A']      = RT*(a0[0] + ar[0,0])
+        out['W'],out['JT'],out['Kappa'],out['MW'] = self._derived(T,D,x,Z,dPdD,dPdT,Cv,Cp)
+
+        return out
+
+class Detail(Equation):
+    '''
+    DETAIL equation of state (AGA8 Part 1), translated from Detail.cpp.
+
+    The coefficients are stored as arrays after the transformations of SetupDetail:
+
+      Ki25, Ei25       : [21] K_i^2.5, E_i^2.5
+      Kij5, Uij5, Gij5 : [21,21] binary parts of K^5, U^5 and G (symmetric, zero diagonal)
+      Bsnij2           : [21,21,18] terms of the second virial coefficient (symmetric)
+      n0, th0          : [21,7], [21,4] ideal gas part
+    '''
+
+    name = "DETAIL"
+    R    = R_DETAIL
+    MW   = MW_DETAIL
+
+    def __init__(self):
+
+        E = ones([NC,NC])
+        U = ones([NC,NC])
+        K = ones([NC,NC])
+        G = ones([NC,NC])
+        for ni,nj,E_,U_,K_,G_ in DETAIL_BINARY:
+            i,j = NAMES.index(ni),NAMES.index(nj)
+            E[i,j],U[i,j],K[i,j],G[i,j] = E_,U_,K_,G_
+            E[j,i],U[j,i],K[j,i],G[j,i] = E_,U_,K_,G_
+
+        self.Ki25 = KI**2.5
+        self.Ei25 = EI**2.5
+
+        off = 1 - eye(NC)
+        self.Kij5 = (K**5 - 1)*outer(self.Ki25,self.Ki25)*off
+        self.Uij5 = (U**5 - 1)*outer(self.Ei25,self.Ei25)*off
+        self.Gij5 = (G - 1)*(GI[:,newaxis] + GI[newaxis,:])/2*off
+
+        # Second virial coefficient terms (n = 1..18) of each pair
+        nb  = slice(0,18)
+        Gm  = G*(GI[:,newaxis] + GI[newaxis,:])/2
+        B   = ones([NC,NC,18])
+        B   = where(GN[nb] == 1,B*Gm[:,:,newaxis],B)
+        B   = where(QN[nb] == 1,B*outer(QI,QI)[:,:,newaxis],B)
+        B   = where(FN[nb] == 1,B*outer(FI,FI)[:,:,newaxis],B)
+        B   = where(SN[nb] == 1,B*outer(SI,SI)[:,:,newaxis],B)
+        B   = where(WN[nb] == 1,B*outer(WI,WI)[:,:,newaxis],B)
+        self.Bsnij2 = ( AN[nb]*(E*sqrt(outer(EI,EI)))[:,:,newaxis]**UN[nb]
+                        * outer(KI,KI)[:,:,newaxis]**1.5 * B )
+
+        ## Ideal gas part (reference state of the NIST code)
+        d0 = 101.325/R_DETAIL/298.15
+        n0 = N0.copy()
+        n0[:,2] = n0[:,2] - 1
+        n0[:,0] = n0[:,0] - log(d0)
+
+        self.n0  = n0
+        self.th0 = TH0
+
+        return
+
+    def _xterms(self,x):
+        '''Composition dependent parts K^3 [N] and C*_n [N,58], B*_n [N,18] (xTermsDetail).'''
+
+        K3 = dot(x,self.Ki25)**2 + einsum('ni,ij,nj->n',x,self.Kij5,x)
+        U  = dot(x,self.Ei25)**2 + einsum('ni,ij,nj->n',x,self.Uij5,x)
+        G  = dot(x,GI) + einsum('ni,ij,nj->n',x,self.Gij5,x)
+        Q  = dot(x,QI)
+        F  = dot(x**2,FI)
+        Bs = einsum('ni,ijk,nj->nk',x,self.Bsnij2,x)
+
+        K3 = K3**0.6
+        U  = U**0.2
+
+        Csn = AN*U[:,newaxis]**UN
+        Csn = where(GN == 1,Csn*G[:,newaxis],Csn)
+        Csn = where(QN == 1,Csn*Q[:,newaxis]**2,Csn)
+        Csn = where(FN == 1,Csn*F[:,newaxis],Csn)
+        Csn[:,:12] = 0.0
+
+        return K3, Csn, Bs
+
+    def _alphar(self,T,D,x):
+        '''
+        Residual Helmholtz energy [kJ/kmol] and its derivatives ar[i,j] [3,4,N]
+        (T^i*D^j times the derivatives in T and D, see AlpharDetail).
+        '''
+
+        K3,Csn,Bs = self._xterms(x)
+
+        N    = len(T)
+        RT   = self.R*T
+        Tun  = T[:,newaxis]**-UN
+        Dred = (K3*D)[:,newaxis]
+
+        Dk   = Dred**KN
+        Expn = where(KN > 0,exp(-Dk),1.0)
+
+        CoefT1 = self.R*(UN - 1)
+        CoefT2 = CoefT1*UN
+
+        # Second virial terms (n <= 18) and density terms (n >= 13)
+        SumB = zeros([N,58])
+        SumB[:,:18] = (Bs*D[:,newaxis] - Csn[:,:18]*Dred)*Tun[:,:18]
+
+        Sum0 = Csn*Dred**BN*Tun*Expn
+        bkd  = BN - KN*Dk
+        ckd  = KN**2*Dk
+        D1   = bkd
+        D2   = bkd*(bkd - 1) - ckd
+        D3   = (bkd - 2)*D2 + ckd*(1 - KN - 2*bkd)
+
+        s0 = Sum0 + SumB
+        s1 = Sum0*D1 + SumB
+        s2 = Sum0*D2
+        s3 = Sum0*D3
+
+        ar = zeros([3,4,N])
+        ar[0,0] = RT*sum(s0,axis=1)
+        ar[0,1] = RT*sum(s1,axis=1)
+        ar[0,2] = RT*sum(s2,axis=1)
+        ar[0,3] = RT*sum(s3,axis=1)
+        ar[1,0] = -sum(CoefT1*s0,axis=1)
+        ar[1,1] = -sum(CoefT1*s1,axis=1)
+        ar[2,0] = sum(CoefT2*s0,axis=1)
+
+        return ar
+
+    def _alpha0(self,T,D,x):
+        '''Ideal gas Helmholtz energy a0[0] [kJ/kmol] and T derivatives a0[1], a0[2] [3,N] (Alpha0Detail).'''
+
+        n0  = self.n0
+        hyp0,hyp1,hyp2 = _hyperbolic(self.th0,n0[:,3:],T)
+
+        # Here the first derivative includes log|f|
+        hyp1 = hyp0 - hyp1
+
+        on  = x > 0
+        lnT = log(T)[:,newaxis]
+
+        a0 = zeros([3,len(T)])
+        with errstate(divide='ignore',invalid='ignore'):
+            logxD = log(maximum(D,EPS))[:,newaxis] + log(x)
+            a0[0] = sum(where(on,x*(logxD + n0[:,0] + n0[:,1]/T[:,newaxis] - n0[:,2]*lnT + sum(hyp0,axis=2)),0.0),axis=1)
+            a0[1] = sum(where(on,x*(logxD + n0[:,0] - n0[:,2]*(1 + lnT) + sum(hyp1,axis=2)),0.0),axis=1)
+        a0[2] = -sum(where(on,x*(n0[:,2] + sum(hyp2,axis=2)),0.0),axis=1)
+
+        return a0*asarray([self.R*T,full(len(T),self.R),full(len(T),self.R)])
+
+    def _pressure(self,T,D,x):
+        '''Pressure [kPa], Z and dP/dD (PressureDetail).'''
+
+        ar = self._alphar(T,D,x)
+        RT = self.R*T
+        Z  = 1 + ar[0,1]/RT
+
+        return D*RT*Z, Z, RT + 2*ar[0,1] + ar[0,2]
+
+    def _density(self,T,P,x):
+        '''
+        Density [kmol/m3] at T and P [kPa] (DensityDetail): Newton's method in log(v)
+        for all states in lockstep, converged states are removed from the iteration.
+        '''
+
+        N    = len(T)
+        D    = P/self.R/T
+        ierr = zeros(N,dtype=intp)
+        plog = log(maximum(abs(P),EPS))
+        vlog = -log(maximum(D,EPS))
+
+        D[abs(P) < EPS] = 0.0
+        act = flatnonzero(abs(P) >= EPS)
+
+        for it in range(1,21):
+
+            if len(act) == 0: break
+
+            # States that went bad: ideal gas density
+            out = logical_or(vlog[act] < -7,vlog[act] > 100)
+            ierr[act[out]] = 1
+            D[act[out]]    = P[act[out]]/self.R/T[act[out]]
+            act = act[logical_not(out)]
+            if len(act) == 0: break
+
+            Da = exp(-vlog[act])
+            P2,Z,dPdD = self._pressure(T[act],Da,x[act])
+
+            bad = logical_or(dPdD < EPS,P2 < EPS)
+            with errstate(divide='ignore',invalid='ignore'):
+                vdiff = (log(P2) - plog[act])*P2/(-Da*dPdD)
+
+            vlog[act] = where(bad,vlog[act] + 0.1,vlog[act] - vdiff)
+
+            done = logical_and(logical_not(bad),abs(vdiff) < TOL)
+            D[act[done]] = exp(-vlog[act[done]])
+            act = act[logical_not(done)]
+
+        # Not converged: ideal gas density
+        ierr[act] = 1
+        D[act]    = P[act]/self.R/T[act]
+
+        return D, ierr
+
+    def _departure(self,T,D,x):
+        '''Residual enthalpy and entropy at (T,p) and Z from the state (T,D).'''
+
+        ar = self._alphar(T,D,x)
+        Z  = 1 + ar[0,1]/(self.R*T)
+
+        with errstate(divide='ignore',invalid='ignore'):
+            h_r = ar[0,0] - T*ar[1,0] + ar[0,1]
+            s_r = -ar[1,0] + self.R*log(Z)
+
+        return h_r, s_r, Z
+
+    def _properties(self,T,D,x):
+        '''Properties at (T,D), see properties (PropertiesDetail).'''
+
+        a0 = self._alpha0(T,D,x)
+        ar = self._alphar(T,D,x)
+
+        R  = self.R
+        RT = R*T
+        A  = a0[0] + ar[0,0]
+        S  = -a0[1] - ar[1,0]
+        U  = A + T*S
+
+        out = OrderedDict()
+        out['Z']      = Z = 1 + ar[0,1]/RT
+        out['P']      = P = D*RT*Z
+        out['dPdD']   = dPdD = RT + 2*ar[0,1] + ar[0,2]
+        with errstate(divide='ignore',invalid='ignore'):
+            PD = where(D > EPS,P/D,RT)
+            out['d2PdD2'] = where(D > EPS,(2*ar[0,1] + 4*ar[0,2] + ar[0,3])/D,0.0)
+        out['d2PdTD'] = zeros(len(T))
+        out['dPdT']   = dPdT = D*R + D*ar[1,1]
+        out['U']      = U
+        out['H']      = U + PD
+        out['S']      = S
+        out['Cv']     = Cv = -(a0[2] + ar[2,0])
+        with errstate(divide='ignore',invalid='ignore'):
+            out['Cp'] = Cp = where(D > EPS,Cv + T*(dPdT/D)**2/dPdD,Cv + R)
+        out['G']      = A + PD
+        out['A']      = A
+        out['W'],out['JT'],out['Kappa'],out['MW'] = self._derived(T,D,x,Z,dPdD,dPdT,Cv,Cp)
+
+        return out
+
+### PROCESS-WIDE EQUATIONS ###
+
+EQUATIONS = OrderedDict([ ("GERG-2008",GERG2008),
+                          ("DETAIL",   Detail) ])
+
+_eos = OrderedDict()
+
+def get_eos(name="GERG-2008"):
+    '''
+    Return the (process-wide) equation of state name: "GERG-2008" or "DETAIL"
+    (the coefficients are only set up on first use).
+    '''
+
+    if isinstance(name,Equation): return name
+
+    key = name.upper()
+    if key in ["GERG","GERG2008"]: key = "GERG-2008"
+
+    if not key in EQUATIONS:
+        err = '''
+aga8:: Error: equation of state not recognized: {}
+              Only {} are allowed.
+'''.format(name," or ".join(['"{}"'.format(nm) for nm in EQUATIONS]))
+        sys.exit(err)
+
+    if not key in _eos: _eos[key] = EQUATIONS[key]()
+
+    return _eos[key]
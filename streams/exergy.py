@@ -1,16 +1,72 @@
 
 import os,sys,subprocess,string
-from collections import OrderedDict
+import io,shutil
+from collections import OrderedDict, ChainMap
 import openpyxl as xl                 # For writing/reading excel files
 
 from copy import deepcopy
 import re
+import json
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import pkg_resources
 from numpy import *
+from numpy.linalg import lstsq, matrix_rank
 
-def load_reference(filename="ReferenceTables.xlsx",verbose=True):
+from streams import nasa9
+from streams import if97
+from streams import aga8
+
+# Names of the reference values stored for each substance (in order)
+REF_KEYS = ['T0','p0','MW','e_ch_0a','e_ch_0b','cp_0','h_0','s_0','H+','S+','a','b','c','d']
+
+# Compiled reference cache format (bump the version if the layout changes)
+REF_CACHE_MAGIC   = b'STRMREF1'
+REF_CACHE_VERSION = 1
+
+def load_reference(filename="ReferenceTables.xlsx",verbose=True,cache=True):
+    '''
+    Load the reference data from the excel tables into a ReferenceTable.
+    If cache=True, the values are read from a compiled binary cache
+    of the workbook when one exists (see reference_cache_files),
+    otherwise the workbook is parsed and the cache is written for next time.
+    '''
+
+    refs = None
+
+    if cache:
+        # Look for an existing cache of this exact workbook
+        cache_files = reference_cache_files(filename)
+        for cache_file in cache_files:
+            if os.path.isfile(cache_file):
+                refs = read_reference_cache(cache_file)
+                if not refs is None: break
+
+    if refs is None:
+        # No cache available, parse the workbook itself
+        refs = ReferenceTable.from_dict(load_reference_excel(filename))
+
+        if cache:
+            # Write the cache to the first location that works
+            for cache_file in cache_files:
+                if write_reference_cache(cache_file,refs): break
+
+    text = "=" * 80
+    text = text + "\nThe following substances are available for exergy calculations:\n"
+    for i,key in enumerate(refs.keys()):
+        text = text + key
+        if not i+1 == len(refs.keys()): text = text + ", "
+        if mod(i+1,12) == 0: text = text + "\n"
+    text = text + "\n" + "=" * 80
+
+    if verbose: print(text)
+
+    return refs
+
+def load_reference_excel(filename="ReferenceTables.xlsx"):
     '''
-    Load the reference data from the excel tables.
+    Load the reference data from the excel tables (without any caching).
     '''
 
     # Load the workbook from existing file
@@ -78,22 +134,445 @@ def load_reference(filename="ReferenceTables.xlsx",verbose=True):
     refs[nm]['c']    = None
     refs[nm]['d']    = None
 
+    return refs
 
-    text = "=" * 80
-    text = text + "\nThe following substances are available for exergy calculations:\n"
-    for i,key in enumerate(refs.keys()):
-        text = text + key
-        if not i+1 == len(refs.keys()): text = text + ", "
-        if mod(i+1,12) == 0: text = text + "\n"
-    text = text + "\n" + "=" * 80
+def reference_cache_files(filename):
+    '''
+    Return the candidate locations of the compiled cache of a
+    reference workbook: first next to the workbook itself, then
+    in the user cache directory (for read-only installations).
+    The cache name contains the hash of the workbook contents,
+    so a modified workbook never picks up a stale cache.
+    '''
 
-    if verbose: print(text)
+    # Hash the workbook contents (and the cache format version)
+    sha = hashlib.sha256()
+    sha.update(REF_CACHE_MAGIC + str(REF_CACHE_VERSION).encode())
+    with open(filename,'rb') as f:
+        sha.update(f.read())
+    key = sha.hexdigest()[:16]
 
-    return refs
+    name = "{}.{}.refcache".format(os.path.basename(filename).rsplit(".",1)[0],key)
+
+    return [os.path.join(os.path.dirname(os.path.abspath(filename)),name),
+            os.path.join(user_cache_dir(),name)]
+
+def user_cache_dir():
+    '''Return the user cache directory of streams ($XDG_CACHE_HOME/streams).'''
+
+    cache_dir = os.environ.get('XDG_CACHE_HOME',os.path.join(os.path.expanduser("~"),".cache"))
+
+    return os.path.join(cache_dir,"streams")
+
+def write_reference_cache(filename,refs):
+    '''
+    Write the reference values to a compact binary file:
+    magic, header length, json header (substance names and keys),
+    followed by a float64 array [key,substance] aligned to 64 bytes.
+    Missing values (None) are stored as NaN.
+    Returns True if the file was written.
+    '''
+
+    if not isinstance(refs,ReferenceTable): refs = ReferenceTable.from_dict(refs)
+
+    names = refs.names
+    table = ascontiguousarray(refs.data,dtype='<f8')
+
+    header = json.dumps({'version':REF_CACHE_VERSION,'names':names,'keys':refs.fields}).encode()
+
+    # Pad the header so the data block starts on a 64 byte boundary
+    nhead  = len(REF_CACHE_MAGIC) + 8 + len(header)
+    header = header + b' ' * (-nhead % 64)
+
+    try:
+        fldr = os.path.dirname(filename)
+        os.makedirs(fldr,exist_ok=True)
+
+        # Write to a temporary file first, so that other processes
+        # never see a partially written cache
+        fd,tmpname = tempfile.mkstemp(dir=fldr,suffix=".tmp")
+        with os.fdopen(fd,'wb') as f:
+            f.write(REF_CACHE_MAGIC)
+            f.write(int64(len(header)).astype('<i8').tobytes())
+            f.write(header)
+            f.write(table.tobytes())
+        os.replace(tmpname,filename)
+    except OSError:
+        return False
+
+    return True
+
+def read_reference_cache(filename):
+    '''
+    Load the reference values from a compiled cache file
+    (see write_reference_cache). The data block is memory-mapped.
+    Returns None if the file is not a valid cache.
+    '''
+
+    try:
+        with open(filename,'rb') as f:
+            if not f.read(len(REF_CACHE_MAGIC)) == REF_CACHE_MAGIC: return None
+            nhead  = int(frombuffer(f.read(8),dtype='<i8')[0])
+            header = json.loads(f.read(nhead).decode())
+
+        keys = header['keys']
+        if not (header['version'] == REF_CACHE_VERSION and keys[:len(REF_KEYS)] == REF_KEYS):
+            return None
+
+        names  = header['names']
+        offset = len(REF_CACHE_MAGIC) + 8 + nhead
+
+        # Copy-on-write mapping: the table can be modified in memory
+        # without ever touching the cache file
+        table  = memmap(filename,dtype='<f8',mode='c',offset=offset,
+                        shape=(len(keys),len(names)))
+    except (OSError,ValueError,KeyError):
+        return None
+
+    return ReferenceTable(names,table,keys=keys)
+
+class ReferenceTable:
+    '''
+    Table of reference values of all substances.
+
+    Each reference value (MW, e_ch_0a, h_0, a, ...) is stored as a contiguous
+    float64 array over all substances, so values can be gathered for many
+    substances at once, eg:
+
+        ii = refs.index(['N2','O2','CO2'])
+        MW = refs.column('MW')[ii]
+
+    Missing values (None in the workbook) are stored as NaN,
+    see refs.missing(key) for the corresponding mask.
+
+    The table still behaves like the original OrderedDict of OrderedDicts,
+    ie, refs['CH4']['MW'] returns the molecular weight of CH4 and
+    missing values are returned as None.
+    '''
+
+    def __init__(self,names,data,keys=REF_KEYS):
+        '''
+        Initialize a reference table
+          names = list of substance names
+          data  = array [key,substance] of reference values
+          keys  = names of the reference values (rows of data)
+        '''
+
+        data = asarray(data,dtype=float64)
+        if not data.shape == (len(keys),len(names)):
+            sys.exit("ReferenceTable: Error: data must have shape (nkeys,nsubstances).")
+
+        self.names = list(names)
+        self.data  = data
+
+        # Lookup tables: substance name => column, key => row
+        self._index = OrderedDict( (nm,j) for j,nm in enumerate(self.names) )
+        self._keys  = OrderedDict( (key,i) for i,key in enumerate(keys) )
+
+        # Tabulated properties built for this table (see property_tables)
+        self._tables = OrderedDict()
+
+        # Shared read-only records of single substances (see record)
+        self._records = OrderedDict()
+
+        # Tables derived for other dead states (see dead_state),
+        # shared with the derived tables themselves
+        self._dead_states = OrderedDict()
+        self.base = self
+
+        # Reference state of the table
+        self.T0 = float(data[self._keys['T0'],0]) if len(self.names) > 0 else 298.15
+        self.p0 = float(data[self._keys['p0'],0]) if len(self.names) > 0 else 1.013
+
+        return
+
+    @classmethod
+    def from_dict(cls,refs):
+        '''Generate a table from an OrderedDict of OrderedDicts of reference values.'''
+
+        names = list(refs.keys())
+        keys  = list(REF_KEYS)
+        for nm in names:
+            for key in refs[nm].keys():
+                if not key in keys: keys.append(key)
+
+        data = full([len(keys),len(names)],nan)
+        for j,nm in enumerate(names):
+            for i,key in enumerate(keys):
+                val = refs[nm].get(key)
+                if not val is None: data[i,j] = val
+
+        return cls(names,data,keys=keys)
+
+    def to_dict(self):
+        '''Return the reference values as an OrderedDict of OrderedDicts.'''
+
+        return OrderedDict( (nm,self[nm].copy()) for nm in self.names )
+
+    @property
+    def fields(self):
+        '''Names of all reference values (columns) in the table.'''
+        return list(self._keys.keys())
+
+    def column(self,key):
+        '''Return the array of reference value 'key' for all substances (a view).'''
+        return self.data[self._keys[key]]
+
+    def missing(self,key):
+        '''Return the mask of substances without a value for 'key'.'''
+        return isnan(self.column(key))
+
+    def add_column(self,key,values):
+        '''
+        Add (or replace) reference value 'key' for all substances,
+        values is an array with one value per substance (NaN if missing).
+        '''
+
+        values = asarray(values,dtype=float64)
+        if not values.shape == (len(self.names),):
+            sys.exit("ReferenceTable: Error: column {} must have one value per substance.".format(key))
+
+        if key in self._keys:
+            self.data[self._keys[key]] = values
+        else:
+            self._keys[key] = len(self._keys)
+            self.data = vstack([self.data,values[newaxis,:]])
+
+        # Records of the old values are no longer valid
+        self._records.clear()
+
+        return
+
+    def dead_state(self,T0,p0):
+        '''
+        Return the reference table for the dead state (T0,p0).
+
+        h_0, s_0 and cp_0 are recalculated at (T0,p0) from the polynomials
+        of each substance (or from the constant cp_0 if no polynomials are
+        available), and the saturation pressure of water psat0 [bar] at T0
+        is stored with the table. The chemical exergies e_ch_0a and e_ch_0b
+        are kept as given in the original table.
+
+        Derived tables are memoized per (T0,p0), so each distinct
+        dead state is only calculated once.
+        '''
+
+        T0 = float(T0)
+        p0 = float(p0)
+
+        base = self.base
+
+        if T0 == base.T0 and p0 == base.p0:
+            if not hasattr(base,'psat0'): base.psat0 = float(if97.psat(T0))
+            return base
+
+        key = (T0,p0)
+        if not key in base._dead_states:
+
+            ii = arange(len(base.names))
+            h_0,s_0,cp_0 = calc_shomate(ii,T0,p0,refs=base)
+
+            table = ReferenceTable(base.names,base.data.copy(),keys=base.fields)
+            table.add_column('T0',full(len(ii),T0))
+            table.add_column('p0',full(len(ii),p0))
+            table.add_column('h_0',h_0)
+            table.add_column('s_0',s_0)
+            table.add_column('cp_0',cp_0)
+            table.T0    = T0
+            table.p0    = p0
+            table.psat0 = float(if97.psat(T0))
+
+            # Share the memo with the original table
+            table._dead_states = base._dead_states
+            table.base         = base
+
+            base._dead_states[key] = table
+
+        return base._dead_states[key]
+
+    def index(self,names,unknown='unknown'):
+        '''
+        Return the column index of a substance name (int),
+        or an array of indices for a list of names.
+        Names not in the table are mapped to the 'unknown' substance.
+        '''
+
+        if isinstance(names,str):
+            return self._index.get(names,self._index[unknown])
+
+        return asarray([self._index.get(nm,self._index[unknown]) for nm in names],dtype=intp)
+
+    def row(self,name):
+        '''Return the reference values of one substance (see ReferenceRow).'''
+        return ReferenceRow(self,self._index[name])
+
+    def record(self,name,properties="shomate"):
+        '''
+        Return the read-only reference values of one substance (see ReferenceRecord).
+        Records are generated once and shared by all substances of all streams.
+
+        If properties="nasa9", h_0 and s_0 are replaced by the values of the
+        NASA-9 polynomials at (T0,p0) (see nasa9.py), if available.
+        '''
+
+        key = (name,properties)
+        if not key in self._records:
+
+            j      = self._index[name]
+            values = self.data[:,j].tolist()
+
+            if properties == "nasa9":
+                db = nasa9.get_database()
+                if name in db:
+                    h,s,cp = db.calc(db.index(name),self.T0,self.p0)
+                    values[self._keys['h_0']] = float(h)
+                    values[self._keys['s_0']] = float(s)
+
+            self._records[key] = ReferenceRecord(name,OrderedDict(self._keys),values)
+
+        return self._records[key]
+
+    ## Dict-style access
+
+    def __getitem__(self,name):
+        return self.row(name)
+
+    def __contains__(self,name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def keys(self):
+        return self._index.keys()
+
+    def values(self):
+        return [self.row(nm) for nm in self.names]
+
+    def items(self):
+        return [(nm,self.row(nm)) for nm in self.names]
+
+    def __repr__(self):
+        return "ReferenceTable({} substances, {} values, T0 = {}, p0 = {})".format(
+                    len(self.names),len(self._keys),self.T0,self.p0)
+
+class ReferenceRow:
+    '''
+    View of the reference values of one substance in a ReferenceTable.
+    It behaves like the original OrderedDict of reference values
+    (missing values are returned as None) and writes go back to the table.
+    '''
+
+    __slots__ = ('table','j')
+
+    def __init__(self,table,j):
+        self.table = table
+        self.j     = j
+
+    @property
+    def name(self):
+        return self.table.names[self.j]
+
+    def __getitem__(self,key):
+        val = self.table.data[self.table._keys[key],self.j]
+        return None if isnan(val) else float(val)
+
+    def __setitem__(self,key,val):
+        if not key in self.table._keys:
+            col = full(len(self.table.names),nan)
+            self.table.add_column(key,col)
+        self.table.data[self.table._keys[key],self.j] = nan if val is None else val
+        self.table._records.clear()
+
+    def get(self,key,default=None):
+        return self[key] if key in self.table._keys else default
+
+    def __contains__(self,key):
+        return key in self.table._keys
+
+    def __iter__(self):
+        return iter(self.table._keys)
+
+    def __len__(self):
+        return len(self.table._keys)
+
+    def keys(self):
+        return self.table._keys.keys()
+
+    def values(self):
+        return [self[key] for key in self.table._keys]
+
+    def items(self):
+        return [(key,self[key]) for key in self.table._keys]
+
+    def copy(self):
+        '''Return the reference values as an independent OrderedDict.'''
+        return OrderedDict(self.items())
+
+    def __repr__(self):
+        return "ReferenceRow({}: {})".format(self.name,dict(self.items()))
+
+class ReferenceRecord:
+    '''
+    Read-only reference values of one substance, shared by all substances
+    of all streams (see ReferenceTable.record). It behaves like the original
+    OrderedDict of reference values (missing values are returned as None),
+    but it cannot be modified, and copies of it are the record itself.
+    '''
+
+    __slots__ = ('name','_keys','_values')
+
+    def __init__(self,name,keys,values):
+        self.name    = name
+        self._keys   = keys
+        self._values = tuple( None if isnan(val) else float(val) for val in values )
+
+    def __getitem__(self,key):
+        return self._values[self._keys[key]]
+
+    def __setitem__(self,key,val):
+        sys.exit("ReferenceRecord: Error: reference values of {} are read-only.".format(self.name))
+
+    def get(self,key,default=None):
+        return self[key] if key in self._keys else default
+
+    def __contains__(self,key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        return self._keys.keys()
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self._keys.keys(),self._values))
+
+    def copy(self):
+        '''Return the reference values as an independent OrderedDict.'''
+        return OrderedDict(self.items())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self,memo):
+        return self
+
+    def __repr__(self):
+        return "ReferenceRecord({}: {})".format(self.name,dict(self.items()))
 
 ### THE FUNCTIONS BELOW ARE METHODS
 ### FOR THE 'ref' object,
-### which is an OrderedDict of OrderedDicts
+### which is a ReferenceTable (or an OrderedDict of OrderedDicts)
 ### Eventually these should be encapsulated nicely!!!
 
 def ref_check(refs,nm='N2'):
@@ -112,9 +591,16 @@ def ref_check(refs,nm='N2'):
     return
 
 def ref_array(refs):
+    '''
+    Return the reference values as an array [substance,key]
+    (missing values are NaN).
+    '''
+
+    if isinstance(refs,ReferenceTable):
+        return array(refs.data.T)
 
     # Get column/row headings
-    tmp1,tmp2 = refs.items()[0]
+    tmp1,tmp2 = list(refs.items())[0]
     headings = tmp2.keys()
     names = refs.keys()
 
@@ -130,7 +616,7 @@ def ref_array(refs):
         j = -1
         for key,val in refs[nm].items():
             j = j+1
-            table[i,j] = val
+            table[i,j] = nan if val is None else val
 
     return(table)
 
@@ -144,692 +630,3606 @@ def ref_print(refs):
 
     return
 
-### NOW STREAM CLASSES ###
+### PROCESS-WIDE REFERENCE REGISTRY ###
+### All substances, streams and simulations use these reference
+### values unless a table is passed to them explicitly (refs=...)
 
-class substance:
+_refs = None
+
+def get_reference():
     '''
-    This class manages calculations for a given substance.
+    Return the process-wide reference values. The reference
+    workbook packaged with streams is loaded on first use.
     '''
 
-    def __init__(self,id,name,T,p,mdot,x,T0=298.15,p0=1.013):
-
-        # Define some constants
-        R = 8.314       # kJ/kmol-K, ideal gas constant
-
-        # Make a string of the id,name for easy formatting
-        idstr = "{:4}".format(id)
-        namestr = "{:11}".format(name)
-        unknown = False
+    global _refs
 
-        # Adjust x values if they are tiny to simplify calcs.
-        #if abs(x) < 1e-7: x = 0.0
+    if _refs is None:
+        REF_FILE = pkg_resources.resource_filename('streams', 'data/ReferenceTables.xlsx')
+        _refs    = load_reference(REF_FILE,verbose=False)
 
-        # Make sure x is valid
-        if x < 0 or x > 1:
-            err = '''
-Stream {}: {}: Error: molar fraction x must be between 0 and 1!
-'''.format(idstr,namestr)
-            sys.exit(err)
+    return _refs
 
-        # Generate the initial state of this substance in the stream
-        state = OrderedDict(T=T,p=p,mdot=mdot*x,x=x)
+def set_reference(refs):
+    '''
+    Replace the process-wide reference values.
+    refs can be a ReferenceTable (as returned by load_reference),
+    an OrderedDict of OrderedDicts of reference values or the filename of a reference workbook.
+    '''
 
-        # Load reference substance values
-        REF_FILE = pkg_resources.resource_filename('streams', 'data/ReferenceTables.xlsx')
-        refs     = load_reference(REF_FILE,verbose=False)
+    global _refs
 
-        # Now check that we can actually model this substance
-        nameref = name
-        if not name in refs.keys():
-            if x > 0:
-                print("Stream {}: {}: Warning: no reference values found for substance! " \
-                      "Setting x = {:10.5g} => 0.0.".format(idstr,namestr,x))
-            x = 0.0
-            nameref = "unknown"
-            unknown = True
+    if isinstance(refs,str):
+        refs = load_reference(refs,verbose=False)
+    elif not isinstance(refs,ReferenceTable):
+        refs = ReferenceTable.from_dict(refs)
 
-        # Since we know the substance exists,
-        # load up the reference values here
-        ref = refs[nameref].copy()
-        #ref = deepcopy(refs[nameref])  # Shallow copy should be good enough since we don't modify refs!
+    _refs = refs
 
-        # Check to make sure we are using the same reference state (T0,p0)
-        if not (T0 == ref['T0'] and p0 == ref['p0']):
-            err = '''
-Stream {}: {}: Error: reference state is not the same as the reference state of the stream.
-                      Stream (T0,p0) = ({:7.3f},{:7.3f})
-                   Substance (T0,p0) = ({:7.3f},{:7.3f})
-'''.format(idstr,namestr,T0,p0,ref['T0'],ref['p0'])
-            sys.exit(err)
+    return _refs
 
-        # Get a useful factor (ajr: what is this?)
-        y = T/1e3
+### VECTORIZED PROPERTY CALCULATIONS ###
 
-        ##### Calculations of enthalpy h
-        ##### (depends only on T, because we assume ideal gases)
+def calc_shomate(ii,T,p,refs=None,clamp=True):
+    '''
+    Calculate the enthalpy h [kJ/kmol], entropy s [kJ/kmol/K] and
+    specific heat cp [kJ/kmol/K] of substances at (T,p) in one pass,
+    using the same polynomials as the substance class.
+
+    == INPUT ==
+    ii   : substance indices in the ReferenceTable (see refs.index)
+           or substance names
+    T    : temperature [K]
+    p    : pressure [bar]
+    refs : ReferenceTable (default: the process-wide table)
+
+    ii, T and p are broadcast against each other, so eg, the properties
+    of one substance over a range of temperatures are obtained with
+    calc_shomate(refs.index('CH4'),arange(270,331),1.013).
+
+    == OUTPUT ==
+    h, s, cp : arrays of the broadcast shape of (ii,T,p)
+
+    Substances without polynomial coefficients (H+, S+ or a missing)
+    use a constant cp_0, and small negative enthalpies (-5 < h < 0)
+    from the polynomials are set to zero (unless clamp=False).
+    '''
 
-        # If H+ not known for the element, then we
-        # calculate it using cp_0, h_0 and T
-        if ref['H+'] == None:
-            state['h'] = ( (ref['cp_0']) * (T-ref['T0']) ) + ref['h_0']      # NO change in cp
+    # Define some constants
+    R = 8.314       # kJ/kmol-K, ideal gas constant
 
-        else:
-            state['h'] = 1e3 * (  ref['H+'] + ref['a']*y
-                                + ref['b']/2 * y**2
-                                - ref['c']*y**(-1)
-                                + ref['d']/3 * y**3 )
+    if refs is None: refs = get_reference()
 
-            # Limit enthalpy errors
-            if state['h'] > -5.0 and state['h'] < 0.0:
-                print("Stream {}: {}: Warning: small negative enthalpy set to zero.".format(idstr,namestr))
-                state['h'] = 0.0
+    ii = asarray(ii)
+    if not issubdtype(ii.dtype,integer):
+        ii = refs.index(ii.ravel().tolist()).reshape(ii.shape)
 
-        ##### Calculations of entropy
-        ##### (depend both on T and p)
+    ii,T,p = broadcast_arrays(ii,asarray(T,dtype=float64),asarray(p,dtype=float64))
 
-        # If H+ not known for the element, then we
-        # calculate it using cp_0, h_0 and T and p
-        if ref['S+'] == None:
-            state['s'] = ( (ref['cp_0']/T)*(T-ref['T0']) - R*log(p/ref['p0']) ) + ref['s_0']
+    # Gather the reference values of each element
+    T0   = refs.column('T0')[ii]
+    p0   = refs.column('p0')[ii]
+    cp_0 = refs.column('cp_0')[ii]
+    h_0  = refs.column('h_0')[ii]
+    s_0  = refs.column('s_0')[ii]
+    Hp   = refs.column('H+')[ii]
+    Sp   = refs.column('S+')[ii]
+    a    = refs.column('a')[ii]
+    b    = refs.column('b')[ii]
+    c    = refs.column('c')[ii]
+    d    = refs.column('d')[ii]
 
-        else:
-            state['s'] = (  ref['S+'] + ref['a']*log(T) + ref['b']*y
-                          - ref['c']/2 * y**(-2)
-                          + ref['d']/2 * y**2   )     - R * log(p/ref['p0'])
+    # Get a useful factor
+    y = T/1e3
 
-        ##### Calculations of specific heat cp
-        ##### (depends on T)
-        if ref['a'] == None:
-            state['cp'] = ref['cp_0']
+    with errstate(invalid='ignore',divide='ignore'):
 
-        else:
-            state['cp'] = ( ref['a'] + ref['b']*y
-                          + ref['c'] * y**(-2)
-                          + ref['d'] * y**2 )
+        ##### Enthalpy h (depends only on T, because we assume ideal gases)
+        h_poly = 1e3 * (  Hp + a*y
+                        + b/2 * y**2
+                        - c*y**(-1)
+                        + d/3 * y**3 )
 
-        # Store the output
-        self.id      = id
-        self.idstr   = idstr
-        self.name    = name
-        self.namestr = namestr
-        self.unknown = unknown
-        self.state   = state
-        self.ref     = ref
+        # Limit enthalpy errors
+        if clamp:
+            h_poly = where(logical_and(h_poly > -5.0,h_poly < 0.0),0.0,h_poly)
 
-        return
+        h = where(isnan(Hp),( cp_0 * (T-T0) ) + h_0,h_poly)
 
-    def __str__(self):
-        '''Output the substance object to the screen in a human readable way.'''
+        ##### Entropy s (depends both on T and p)
+        s_poly = (  Sp + a*log(T) + b*y
+                  - c/2 * y**(-2)
+                  + d/2 * y**2   )     - R * log(p/p0)
 
-        text = "\nStream {}: {}".format(self.idstr,self.namestr)
-        for key,value in self.state.items():
-            text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+        s = where(isnan(Sp),( (cp_0/T)*(T-T0) - R*log(p/p0) ) + s_0,s_poly)
 
-        text = text +  "\nREFERENCE VALUES"
-        for key,value in self.ref.items():
-            text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+        ##### Specific heat cp (depends on T)
+        cp_poly = ( a + b*y
+                  + c * y**(-2)
+                  + d * y**2 )
 
-        return text
+        cp = where(isnan(a),cp_0,cp_poly)
 
+    return h, s, cp
 
-class stream:
+def calc_shomate_derivatives(ii,T,p,refs=None,clamp=True):
     '''
-    This class manages all values concerning a
-    given stream and calculation of its exergy.
+    Calculate the derivatives dh/dT [kJ/kmol/K], ds/dT [kJ/kmol/K^2] and
+    ds/dp [kJ/kmol/K/bar] of substances at (T,p), from the same polynomials
+    as calc_shomate (same arguments). dh/dT is cp, except where a small
+    negative enthalpy is set to zero (clamp=True); ds/dT is cp/T, except
+    for substances with a constant cp_0.
     '''
 
-    def __init__(self,id,T,p,mdot,composition,phase=[1.0,0.0,0.0],T0=298.15,p0=1.013,exergy_type=None):
-        '''
-        Initialize a stream
-          id = stream number/name
-          T  = stream temperature
-          p  = stream pressure
-          mdot = stream total mass flow rate kg/hr ?
-          composition = list of substances and molar fractions x
-                        ( a list of tuples: [ ('N2',0.5), ('O2',0.1) ] )
-          phase = [VFRAC,LFRAC,SFRAC], fraction of vapor, liquid and solid
-                  *** phase only needed for H2O streams ***
-          T0, p0 = reference state values for temp (K) and pressure (bar)
-        '''
+    # Define some constants
+    R = 8.314       # kJ/kmol-K, ideal gas constant
 
-        ### TO DO ###
-        # Implement optional arguments of an array row containing
-        # all stream info and an array row containing the header
-        # Then extract the info as needed for this class.
-        #############
+    if refs is None: refs = get_reference()
 
-        # Make a string of the id for easy formatting
-        idstr = "{:4}".format(id)
+    ii = asarray(ii)
+    if not issubdtype(ii.dtype,integer):
+        ii = refs.index(ii.ravel().tolist()).reshape(ii.shape)
 
-        # First store the state and the phase
-        state = OrderedDict(T=T,p=p,mdot=mdot,T0=T0,p0=p0,phase=phase)
+    ii,T,p = broadcast_arrays(ii,asarray(T,dtype=float64),asarray(p,dtype=float64))
 
-        ## Loop over the substances and initialize each
-        ## one for the current stream state
-        comp = OrderedDict()
+    h,s,cp = calc_shomate(ii,T,p,refs=refs,clamp=False)
+
+    T0   = refs.column('T0')[ii]
+    cp_0 = refs.column('cp_0')[ii]
+    Hp   = refs.column('H+')[ii]
+    Sp   = refs.column('S+')[ii]
+
+    with errstate(invalid='ignore',divide='ignore'):
+
+        ##### dh/dT (zero where the enthalpy is set to zero)
+        dhdT = where(isnan(Hp),cp_0,cp)
+        if clamp:
+            dhdT = where(logical_and(logical_not(isnan(Hp)),logical_and(h > -5.0,h < 0.0)),0.0,dhdT)
+
+        ##### ds/dT and ds/dp (all substances have the pressure term)
+        dsdT = where(isnan(Sp),cp_0*T0/T**2,cp/T)
+        dsdp = -R/p
+
+    return dhdT, dsdT, dsdp
+
+### TABULATED PROPERTIES ###
+### Batches of the backend "nasa9-tables" interpolate the NASA-9 properties of
+### all their substances at once (see TabulatedBackend), instead of
+### evaluating the polynomials of each species in turn
+
+class PropertyTables:
+    '''
+    Piecewise Chebyshev approximations of h(T), s(T,p0) and cp(T) of all
+    substances of a ReferenceTable, with a measured error bound, from the
+    properties "shomate" (calc_shomate) or "nasa9" (the NASA-9 polynomials
+    where available, otherwise calc_shomate, as in Backend.ideal).
+
+    The temperature range [Tmin,Tmax] is split into nseg equal segments,
+    each with a Chebyshev series of degree deg. After fitting, the tables
+    are compared with the exact polynomials on a dense grid
+    and the number of segments is doubled until the maximum deviation,
+    relative to max(|value|,1), is below tol (or nseg_max is reached). The
+    measured deviations are kept in err[prop,substance] (prop = h, s, cp);
+    substances that do not reach tol (eg, discontinuous at the bound of two
+    NASA-9 ranges, as H2O(l) at 373.15 K) are calculated exactly instead
+    (exact[substance]), max_err is the largest deviation of the others.
+    The (unclamped) enthalpy is tabulated and the small-negative-enthalpy
+    clamp of calc_shomate is applied after interpolation.
+
+    Temperatures outside of [Tmin,Tmax] are refused, since the
+    approximations have not been validated there.
+    '''
+
+    def __init__(self,refs=None,properties="shomate",Tmin=250.0,Tmax=3000.0,nseg=32,deg=6,tol=1e-6,build=True):
+
+        if refs is None: refs = get_reference()
+
+        if not properties in ["shomate","nasa9"]:
+            sys.exit("PropertyTables: Error: properties not recognized: {}".format(properties))
+
+        self.refs = refs
+        self.properties = properties
+        self.Tmin = float(Tmin)
+        self.Tmax = float(Tmax)
+        self.nseg = int(nseg)
+        self.deg  = int(deg)
+        self.tol  = float(tol)
+
+        self.coef    = None
+        self.err     = None
+        self.exact   = None
+        self.max_err = None
+
+        # Substances that get the enthalpy clamp (polynomials of the reference table),
+        # whose entropy depends on pressure (all but the condensed NASA-9 species)
+        # and the gas constant of their pressure term
+        self.clamp    = logical_not(isnan(refs.column('H+')))
+        self.pressure = ones(len(refs),dtype=bool)
+        self.R        = full(len(refs),8.314)
+        self._nasa9   = OrderedDict()
+        if properties == "nasa9":
+            db = nasa9.get_database()
+            for j,nm in enumerate(refs.names):
+                if nm in db:
+                    self._nasa9[j]   = db.index(nm)
+                    self.clamp[j]    = False
+                    self.pressure[j] = db.phase[db.index(nm)] == 0
+                    self.R[j]        = nasa9.R
+
+        if build: self.build()
+
+        return
+
+    def values(self,T):
+        '''Exact values [prop,substance,T] of h, s(T,p0) and cp (without the enthalpy clamp).'''
+
+        ii = arange(len(self.refs))
+        p0 = self.refs.column('p0')
+
+        h,s,cp = calc_shomate(ii[:,newaxis],T[newaxis,:],p0[:,newaxis],
+                              refs=self.refs,clamp=False)
+
+        db = nasa9.get_database()
+        for j,k in self._nasa9.items():
+            h[j],s[j],cp[j] = db.calc(k,T,p0[j])
+
+        return array([h,s,cp])
+
+    def build(self,nseg_max=256):
+        '''Fit the tables, refining the segments until the tolerance is met.'''
+
+        nseg = self.nseg
+        deg  = self.deg
+
+        # Chebyshev points on [-1,1] and the matching Vandermonde matrix
+        xk = cos(pi*(arange(deg+1)+0.5)/(deg+1))
+        V  = polynomial.chebyshev.chebvander(xk,deg)
+
+        # Dense points used to measure the error within each segment
+        xv = linspace(-1.0,1.0,16*deg+1)
+        Vv = polynomial.chebyshev.chebvander(xv,deg)
+
+        while True:
+
+            dT = (self.Tmax-self.Tmin) / nseg
+            T1 = self.Tmin + dT*arange(nseg)
+
+            # Fit all substances and segments at once
+            T    = ( T1[:,newaxis] + dT*(xk[newaxis,:]+1.0)/2.0 ).ravel()
+            vals = self.values(T).reshape(3,len(self.refs),nseg,deg+1)
+            coef = linalg.solve(V[newaxis,newaxis,newaxis,:,:],vals[...,newaxis])[...,0]
+
+            # Measure the deviation from the exact values
+            T      = ( T1[:,newaxis] + dT*(xv[newaxis,:]+1.0)/2.0 ).ravel()
+            vals   = self.values(T).reshape(3,len(self.refs),nseg,len(xv))
+            approx = einsum('vk,psnk->psnv',Vv,coef)
+            with errstate(invalid='ignore'):
+                dev = abs(approx-vals) / maximum(abs(vals),1.0)
+            err = nanmax(dev.reshape(3,len(self.refs),-1),axis=2)
+
+            if nanmax(err) <= self.tol or 2*nseg > nseg_max: break
+            nseg = 2*nseg
+
+        # Store the coefficients as [degree,substance*segment,prop]
+        # so that each evaluation step gathers one contiguous block
+        self.nseg    = nseg
+        self.coef    = ascontiguousarray(transpose(coef,(3,1,2,0)).reshape(deg+1,-1,3))
+        self.set_errors(err)
+
+        return
+
+    def set_errors(self,err):
+        '''Store the measured deviations err[prop,substance], see exact and max_err.'''
+
+        with errstate(invalid='ignore'):
+            self.err     = err
+            self.exact   = nanmax(where(isnan(err),0.0,err),axis=0) > self.tol
+            self.max_err = float(max(where(isnan(err[:,~self.exact]),0.0,err[:,~self.exact]))) \
+                           if any(~self.exact) else 0.0
+
+        return
+
+    def calc(self,ii,T,p,clamp=True):
+        '''
+        Interpolate h [kJ/kmol], s [kJ/kmol/K] and cp [kJ/kmol/K]
+        of substances ii at (T,p), see calc_shomate.
+        '''
+
+        refs = self.refs
+
+        ii = asarray(ii)
+        if not issubdtype(ii.dtype,integer):
+            ii = refs.index(ii.ravel().tolist()).reshape(ii.shape)
+
+        ii,T,p = broadcast_arrays(ii,asarray(T,dtype=float64),asarray(p,dtype=float64))
+
+        if T.size > 0 and (T.min() < self.Tmin or T.max() > self.Tmax):
+            err = '''
+PropertyTables: Error: temperature outside of the validated range of the tables.
+                T = [{:.2f},{:.2f}] K, valid range = [{:.2f},{:.2f}] K
+'''.format(T.min(),T.max(),self.Tmin,self.Tmax)
+            sys.exit(err)
+
+        # Segment of each element and position within the segment
+        dT = (self.Tmax-self.Tmin) / self.nseg
+        k  = minimum(((T-self.Tmin)/dT).astype(intp),self.nseg-1)
+        x  = ( 2.0*(T-self.Tmin-k*dT)/dT - 1.0 )[...,newaxis]
+        m  = ii*self.nseg + k
+
+        # Clenshaw recurrence for all three properties
+        c  = self.coef
+        b1 = zeros(T.shape+(3,))
+        b2 = zeros(T.shape+(3,))
+        for j in range(self.deg,0,-1):
+            b1,b2 = c[j][m] + 2.0*x*b1 - b2, b1
+        val = c[0][m] + x*b1 - b2
+
+        h  = val[...,0]
+        s  = val[...,1]
+        cp = val[...,2]
+
+        # Limit enthalpy errors (as in calc_shomate)
+        if clamp:
+            h = where(logical_and(logical_and(h > -5.0,h < 0.0),self.clamp[ii]),0.0,h)
+
+        # Pressure dependence of entropy
+        s = where(self.pressure[ii],s - self.R[ii] * log(p/refs.column('p0')[ii]),s)
+
+        # Substances that the tables do not approximate within tol
+        db = nasa9.get_database()
+        for j in flatnonzero(self.exact):
+            m = ii == j
+            if not any(m): continue
+            if j in self._nasa9:
+                h[m],s[m],cp[m] = db.calc(self._nasa9[j],T[m],p[m])
+            else:
+                h[m],s[m],cp[m] = calc_shomate(ii[m],T[m],p[m],refs=refs,clamp=clamp)
+
+        return h, s, cp
+
+    def key(self):
+        '''Hash of the reference values and table settings.'''
+
+        sha = hashlib.sha256()
+        sha.update(str((self.properties,self.Tmin,self.Tmax,self.nseg,self.deg,self.tol)).encode())
+        sha.update(json.dumps(self.refs.names).encode())
+        sha.update(ascontiguousarray(self.refs.data).tobytes())
+
+        return sha.hexdigest()[:16]
+
+def property_tables(refs=None,properties="shomate",Tmin=250.0,Tmax=3000.0,nseg=32,deg=6,tol=1e-6):
+    '''
+    Return the PropertyTables of a ReferenceTable for the given settings.
+    The tables are built only once per ReferenceTable and settings
+    and kept with the table (in memory: building them takes well below a second).
+    '''
+
+    if refs is None: refs = get_reference()
+
+    tables = PropertyTables(refs,properties=properties,Tmin=Tmin,Tmax=Tmax,nseg=nseg,deg=deg,tol=tol,build=False)
+    key    = tables.key()
+
+    # Tables already available for this ReferenceTable
+    if key in refs._tables: return refs._tables[key]
+
+    tables.build()
+    refs._tables[key] = tables
+
+    return tables
+
+### STANDARD CHEMICAL EXERGY ###
+
+# Reference environment of Szargut (1988): mole fractions of the
+# gaseous reference species in the standard atmosphere (p0 = 101.325 kPa)
+REF_ENVIRONMENT = OrderedDict([ ('N2',  75.78/101.325),
+                                ('O2',  20.39/101.325),
+                                ('CO2', 0.0335/101.325),
+                                ('H2O', 2.2/101.325),
+                                ('Ar',  0.906/101.325) ])
+
+def parse_formula(name):
+    '''
+    Return the elemental composition of a substance as an OrderedDict
+    (eg, 'C2H5OH(l)' => C:2, H:6, O:1). The phase, eg, (l) or (s),
+    is ignored. Returns None if the name is not a chemical formula.
+    '''
+
+    formula = re.sub(r"\(.*\)$","",name.strip())
+
+    if re.fullmatch(r"([A-Z][a-z]?\d*)+",formula) is None: return None
+
+    atoms = OrderedDict()
+    for el,n in re.findall(r"([A-Z][a-z]?)(\d*)",formula):
+        atoms[el] = atoms.get(el,0) + (int(n) if n else 1)
+
+    return atoms
+
+def element_matrix(names):
+    '''
+    Return the list of elements and the matrix [substance,element] of the
+    number of atoms of each element in each substance (see parse_formula).
+    Rows of substances that are not chemical formulas are NaN.
+    '''
+
+    atoms = [parse_formula(nm) for nm in names]
+
+    elements = []
+    for at in atoms:
+        if at is None: continue
+        for el in at.keys():
+            if not el in elements: elements.append(el)
+
+    A = zeros([len(names),len(elements)])
+    for j,at in enumerate(atoms):
+        if at is None:
+            A[j] = nan
+        else:
+            for el,n in at.items(): A[j,elements.index(el)] = n
+
+    return elements, A
+
+def calc_gibbs_formation(refs=None):
+    '''
+    Calculate the Gibbs energy of formation [kJ/kmol] of all substances of a
+    ReferenceTable at its dead state (T0,p0) from the tabulated formation
+    enthalpies h_0 and absolute entropies s_0:
+
+        g_f = h_0 - T0 * ( s_0 - sum_el n_el*s_el )
+
+    The entropy s_el of each element is taken from its standard state in
+    the table (the pure element with h_0 = 0, eg, N2, C(s) or S(s)).
+    Substances containing elements without a standard state are NaN.
+    '''
+
+    if refs is None: refs = get_reference()
+
+    elements, A = element_matrix(refs.names)
+
+    h_0 = refs.column('h_0')
+    s_0 = refs.column('s_0')
+
+    # Entropy per atom of each element in its standard state
+    s_el = full(len(elements),nan)
+    for j in range(len(refs.names)):
+        if isnan(A[j,0]) or not h_0[j] == 0.0: continue
+        k = nonzero(A[j])[0]
+        if len(k) == 1 and isnan(s_el[k[0]]):
+            s_el[k[0]] = s_0[j] / A[j,k[0]]
+
+    with errstate(invalid='ignore'):
+        ds = s_0 - dot(A,nan_to_num(s_el)) + where(any((A > 0) & isnan(s_el),axis=1),nan,0.0)
+
+    return h_0 - refs.T0*ds
+
+def calc_chemical_exergy(environment=REF_ENVIRONMENT,refs=None,g_f=None,elements=None,key=None):
+    '''
+    Calculate the standard chemical exergy [kJ/kmol] of all substances of
+    a ReferenceTable for a user-defined reference environment.
+
+    == INPUT ==
+    environment : mole fraction of each gaseous reference species in the
+                  environment at (T0,p0), eg, OrderedDict(N2=0.7583,...)
+    refs        : ReferenceTable (default: the process-wide table)
+    g_f         : Gibbs energies of formation [kJ/kmol], as a dict of
+                  substance values or an array over all substances
+                  (default: calc_gibbs_formation(refs))
+    elements    : chemical exergies [kJ/kmol of atoms] of elements without
+                  a gaseous reference species, eg, {'S': 609600.0}
+    key         : if given, the result is added to refs as column 'key',
+                  so that it can be used as stream.calc_exergy(key)
+
+    The chemical exergy of each reference species is -R*T0*ln(x), from which
+    the exergies of the elements are solved; then for all substances at once:
+
+        e_ch = g_f + sum_el n_el*e_el
+
+    Substances containing an element that is neither in the environment
+    nor in elements are NaN.
+
+    == OUTPUT ==
+    e_ch : array of the chemical exergy of each substance of refs
+    '''
+
+    # Define some constants
+    R = 8.314       # kJ/kmol-K, ideal gas constant
+
+    if refs is None: refs = get_reference()
+    if elements is None: elements = OrderedDict()
+
+    names = refs.names
+    els, A = element_matrix(names)
+
+    # Gibbs energies of formation of all substances
+    if g_f is None:
+        g_f = calc_gibbs_formation(refs)
+    elif isinstance(g_f,dict):
+        g_f = asarray([g_f.get(nm,nan) for nm in names],dtype=float64)
+        g_f = where(isnan(g_f),calc_gibbs_formation(refs),g_f)
+    else:
+        g_f = asarray(g_f,dtype=float64)
+
+    # Elements with given exergies
+    e_el  = full(len(els),nan)
+    fixed = zeros(len(els),dtype=bool)
+    for el,val in elements.items():
+        if el in els:
+            e_el[els.index(el)]  = val
+            fixed[els.index(el)] = True
+
+    # Reference species: e_ch = -R T0 ln(x) = g_f + A e_el
+    ref_names = list(environment.keys())
+    missing   = [nm for nm in ref_names if not nm in refs]
+    if len(missing) > 0:
+        err = '''
+calc_chemical_exergy:: Error: reference species not found in the reference table: {}
+'''.format(", ".join(missing))
+        sys.exit(err)
+
+    x  = asarray([environment[nm] for nm in ref_names],dtype=float64)
+    jj = refs.index(ref_names)
+
+    A_r = A[jj]
+    b_r = -R*refs.T0*log(x) - g_f[jj] - dot(A_r[:,fixed],e_el[fixed])
+
+    # Solve for the elements that appear in the reference species
+    free = logical_and(any(A_r > 0,axis=0),~fixed)
+    A_r  = A_r[:,free]
+
+    if matrix_rank(A_r) < A_r.shape[1] or any(isnan(b_r)):
+        err = '''
+calc_chemical_exergy:: Error: the exergies of the elements cannot be determined
+                       from the reference species: {}
+'''.format(", ".join(ref_names))
+        sys.exit(err)
+
+    e_el[free] = lstsq(A_r,b_r,rcond=None)[0]
+
+    # Chemical exergy of all substances at once
+    with errstate(invalid='ignore'):
+        e_ch = g_f + dot(A,nan_to_num(e_el))
+        e_ch = where(any((A > 0) & isnan(e_el),axis=1),nan,e_ch)
+
+    if not key is None: refs.add_column(key,e_ch)
+
+    return e_ch
+
+### REFERENCE MODELS OF CHEMICAL EXERGY ###
+### A stream can be evaluated for several models at once,
+### eg, calc_exergy(["Ahrends","Szargut"]), the results of each
+### model are stored under qualified keys: e_ch[Ahrends], e_ch[Szargut], ...
+
+# Exergy variables that depend on the model
+MODEL_KEYS = ('e_ch','e_ch_kg','E_ch','e_tot_kg','E_tot')
+
+def exergy_models(exergy_type):
+    '''Return the list of models of an exergy type (one model or a list of them).'''
+
+    if isinstance(exergy_type,str): return [exergy_type]
+
+    return list(exergy_type)
+
+def exergy_column(refs,model):
+    '''
+    Return the column of the reference table with the standard chemical
+    exergies of a model: "ahrends" (e_ch_0a), "szargut" (e_ch_0b) or any
+    column of the table (see calc_chemical_exergy). None if not available.
+    '''
+
+    if model.lower() == "ahrends":
+        return 'e_ch_0a'
+    elif model.lower() == "szargut":
+        return 'e_ch_0b'
+    elif model in refs.fields or model in refs.base.fields:
+        return model
+
+    return None
+
+def model_key(key,model):
+    '''Return the model-qualified name of an exergy variable, eg, e_ch[Szargut].'''
+    return "{}[{}]".format(key,model)
+
+def is_model_key(key):
+    '''Check if key is a model-qualified exergy variable.'''
+    return key.endswith("]") and key.split("[",1)[0] in MODEL_KEYS
+
+### MEMOIZATION OF STATES ###
+### Optional caches of substance properties and stream exergies,
+### see enable_cache (they are disabled by default)
+
+class LRUCache:
+    '''
+    Bounded cache with least-recently-used eviction.
+
+    Floats in the keys are quantized to multiples of tol (if tol is given),
+    so that states differing by less than tol share one entry. The numbers
+    of hits, misses and evictions are counted, see info().
+    '''
+
+    def __init__(self,maxsize=100000,tol=None):
+
+        self.maxsize   = maxsize
+        self.tol       = tol
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._data     = OrderedDict()
+
+        return
+
+    def quantize(self,*values):
+        '''Return a hashable key of values, with floats quantized to tol.'''
+
+        key = []
+        for val in values:
+            if isinstance(val,(list,tuple)):
+                val = self.quantize(*val)
+            elif isinstance(val,(float,floating)):
+                val = float(val)
+                if self.tol: val = int(round(val/self.tol))
+            key.append(val)
+
+        return tuple(key)
+
+    def get(self,key,default=None):
+        '''Return the value of key (and mark it as recently used), or default.'''
+
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits = self.hits + 1
+            return self._data[key]
+
+        self.misses = self.misses + 1
+
+        return default
+
+    def put(self,key,value):
+        '''Store value under key, evicting the least recently used entry if full.'''
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions = self.evictions + 1
+
+        return
+
+    def clear(self):
+        '''Remove all entries and reset the counters.'''
+
+        self._data.clear()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+        return
+
+    def info(self):
+        '''Return the cache statistics as an OrderedDict.'''
+
+        return OrderedDict(hits=self.hits,misses=self.misses,evictions=self.evictions,
+                           size=len(self._data),maxsize=self.maxsize,tol=self.tol)
+
+    def __contains__(self,key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "LRUCache(hits={hits}, misses={misses}, evictions={evictions}, " \
+               "size={size}, maxsize={maxsize}, tol={tol})".format(**self.info())
+
+_caches = OrderedDict(substance=None,stream=None)
+
+def enable_cache(maxsize=100000,tol=None,substance=True,stream=True):
+    '''
+    Enable the caches of substance properties (name,T,p) => (h,s,cp)
+    and of stream exergies (composition,T,p,phase,model) => (e_ph,e_ch).
+      maxsize = maximum number of entries of each cache
+      tol     = quantization of T, p and x in the keys (None: exact values)
+    '''
+
+    if substance: _caches['substance'] = LRUCache(maxsize,tol)
+    if stream:    _caches['stream']    = LRUCache(maxsize,tol)
+
+    return _caches
+
+def disable_cache():
+    '''Disable (and discard) the caches of substances and streams.'''
+
+    _caches['substance'] = None
+    _caches['stream']    = None
+
+    return
+
+def get_cache(name):
+    '''Return the cache 'substance' or 'stream', or None if it is disabled.'''
+
+    return _caches[name]
+
+def cache_info():
+    '''Return the statistics of the enabled caches.'''
+
+    return OrderedDict( (name,cache.info()) for name,cache in _caches.items() if not cache is None )
+
+### WATER AT THE DEAD STATE AND WATER/STEAM STREAMS ###
+
+def condense_water(x_g,x_l,xtot,p,psat0):
+    '''
+    Split the water of streams into gas (H2O) and liquid (H2O(l)) at the
+    dead state: water condenses until the partial pressure of the vapor
+    equals the saturation pressure psat0 [bar] at T0 (see if97.psat), at
+    the total pressure p [bar] of the stream,
+
+        x_g_new / (x_dry + x_g_new) = psat0 / p,   x_dry = xtot - x_g - x_l
+
+    Streams whose water vapor at the dead state stays below psat0 (their dew
+    point is below T0), or with p <= psat0, keep all water as gas.
+    The arguments can be scalars or arrays of streams (no branches per stream).
+    Returns the new molar fractions x_g,x_l (their sum is conserved).
+    '''
+
+    x_g,x_l,xtot,p = broadcast_arrays(asarray(x_g,dtype=float64),asarray(x_l,dtype=float64),
+                                      asarray(xtot,dtype=float64),asarray(p,dtype=float64))
+
+    xw   = x_g + x_l
+    xdry = xtot - xw
+
+    with errstate(divide='ignore',invalid='ignore'):
+        y       = psat0 / p                     # mol frac of water vapor at saturation
+        x_new_g = y*xdry / (1.0-y)              # mol frac
+
+    # Mask of streams with condensation
+    wet = logical_and(y < 1.0,x_new_g < xw)
+
+    x_new_g = where(wet,maximum(x_new_g,0.0),xw)
+    x_new_l = xw - x_new_g
+
+    return x_new_g, x_new_l
+
+def classify_water(T,p,phase,tol=1e-3):
+    '''
+    Classify water/steam states from the saturation curve and their phase
+    [VFRAC,LFRAC,SFRAC] (scalars, or arrays of N states with phase [N,3]).
+    Returns the vapor quality of each state, as in the 'x' column of GATEX:
+
+        0        saturated liquid    (on the saturation curve, no vapor)
+        1        saturated vapor     (on the saturation curve, only vapor)
+        0 < q < 1  two-phase         (tol < VFRAC < 1-tol)
+       -1        single phase, the state is given by T and p
+
+    A state is on the saturation curve if its saturation pressure at T is
+    within a relative tolerance tol of p (see if97.psat). VFRAC and LFRAC
+    are also compared within tol; missing VFRAC (eg, -1) is taken from LFRAC.
+    '''
+
+    T     = asarray(T,dtype=float64)
+    p     = asarray(p,dtype=float64)
+    phase = asarray(phase,dtype=float64)
+
+    vfrac = phase[...,0]
+    lfrac = phase[...,1]
+
+    # Vapor fraction, from LFRAC if VFRAC is not available
+    known = logical_and(vfrac >= 0.0,vfrac <= 1.0)
+    vfrac = where(known,vfrac,where(logical_and(lfrac > 0.0,lfrac <= 1.0),1.0-lfrac,nan))
+
+    with errstate(divide='ignore',invalid='ignore'):
+        onsat = abs(if97.psat(T)/p - 1.0) <= tol
+
+    q = full(broadcast(T,p,vfrac).shape,-1.0)
+    q = where(logical_and(onsat,vfrac <= tol),0.0,q)
+    q = where(logical_and(onsat,vfrac >= 1.0-tol),1.0,q)
+    q = where(logical_and(vfrac > tol,vfrac < 1.0-tol),vfrac,q)
+
+    return q[()]
+
+def water_quality(T,p,phase,tol=1e-3):
+    '''
+    Vapor quality of water streams for if97.calc: the quality of saturated
+    and two-phase states (see classify_water), otherwise NaN (the state
+    is given by T and p).
+    '''
+
+    q = classify_water(T,p,phase,tol)
+
+    return where(q >= 0.0,q,nan)[()]
+
+### REAL-GAS DEPARTURES OF GAS STREAMS ###
+
+def gas_departure(eos,names,x,T,p):
+    '''
+    Real-gas departures of the gas in mixtures of the substances names [S]
+    (molar fractions x [N,S]) at T [K] and p [bar], per kmol of mixture:
+
+        dh = x_gas * (h - h_ig)  [kJ/kmol],   ds = x_gas * (s - s_ig)  [kJ/kmol-K]
+
+    from the equation of state eos ("GERG-2008" or "DETAIL", see aga8).
+    Condensed substances have no departure, gases that are not components
+    of the equation get the departure of the rest of the gas.
+    Returns dh, ds, the mask of states where the density did not converge
+    (treated as ideal gas, dh = ds = 0) and the fraction of the gas that
+    is not covered by the equation.
+    '''
+
+    eos = aga8.get_eos(eos)
+
+    xc,xgas,xout = eos.fractions(names,x)
+    T  = broadcast_to(asarray(T,dtype=float64).ravel(),xgas.shape)
+    p  = broadcast_to(asarray(p,dtype=float64).ravel(),xgas.shape)
+
+    dh   = zeros(len(xgas))
+    ds   = zeros(len(xgas))
+    fail = zeros(len(xgas),dtype=bool)
+
+    # Only mixtures with gas components
+    on = logical_and(xgas > 0.0,xout < 1.0)
+    if any(on):
+        h_r,s_r,ierr = eos.departure(T[on],p[on],xc[on])
+        dh[on]   = xgas[on]*h_r
+        ds[on]   = xgas[on]*s_r
+        fail[on] = ierr > 0
+
+    return dh, ds, fail, xout
+
+def gas_departure_derivative(eos,names,x,T,p,directions):
+    '''
+    Derivatives of the departures dh and ds of gas_departure (same arguments)
+    along directions of the states, a list of (dx,dT,dp,step): changes of
+    the molar fractions dx [N,S], of T and p [N] and the steps [N] of the
+    differences of the fractions of the gas (see fractions). The departures
+    and their derivatives come from one density per state (see
+    aga8.Equation.departure_derivatives). Returns the lists ddh and dds.
+    '''
+
+    eos = aga8.get_eos(eos)
+
+    x = atleast_2d(asarray(x,dtype=float64))
+    xc,xgas,xout = eos.fractions(names,x)
+    N = len(xgas)
+    T = broadcast_to(asarray(T,dtype=float64).ravel(),(N,))
+    p = broadcast_to(asarray(p,dtype=float64).ravel(),(N,))
+
+    on = logical_and(xgas > 0.0,xout < 1.0)
+
+    # Directions of the fractions of the components and of the amount of gas
+    dxc   = []
+    dxgas = []
+    for dx,dT,dp,step in directions:
+        h = broadcast_to(asarray(step,dtype=float64).ravel(),(N,))
+        xcp,xgp,xop = eos.fractions(names,x + h[:,newaxis]*dx)
+        xcm,xgm,xom = eos.fractions(names,x - h[:,newaxis]*dx)
+        dxc.append(((xcp-xcm)/(2*h[:,newaxis]))[on])
+        dxgas.append((xgp-xgm)/(2*h))
+
+    ddh = [zeros(N) for d in directions]
+    dds = [zeros(N) for d in directions]
+    if any(on):
+        d = eos.departure_derivatives(T[on],p[on],xc[on],dxc)
+        for k,(dx,dT,dp,step) in enumerate(directions):
+            dT = broadcast_to(asarray(dT,dtype=float64).ravel(),(N,))[on]
+            dp = broadcast_to(asarray(dp,dtype=float64).ravel(),(N,))[on]
+            ddh[k][on] = xgas[on]*(d['h_T']*dT + d['h_p']*dp + d['h_x'][k]) + dxgas[k][on]*d['h_r']
+            dds[k][on] = xgas[on]*(d['s_T']*dT + d['s_p']*dp + d['s_x'][k]) + dxgas[k][on]*d['s_r']
+
+    return ddh, dds
+
+### PROPERTY BACKENDS ###
+### The properties of a stream come from a backend: the source of the
+### ideal properties of its substances plus the corrections of the mixture
+### (real-gas departures, IF97 for water). The backend of each stream is
+### selected by rules, eg "water -> IF97; p > 50 bar -> GERG-2008" (see
+### backend_rules), process-wide (set_backend_rules), per simulation or
+### per stream (backend=...). Batches evaluate each backend's streams at once.
+
+class Backend:
+    '''
+    Property backend of streams: h, s and cp of the substances from
+    properties ("shomate": polynomials of the reference table, or "nasa9")
+    and the real-gas departures of the gas from eos (None for ideal gas,
+    "GERG-2008" or "DETAIL", see gas_departure).
+
+    New backends derive from this class and override ideal, reference,
+    calc, corrects and/or applies (and the derivatives of ideal and calc,
+    see StreamBatch.jacobian); all methods work on arrays of streams.
+    (ideal and reference are only used by StreamBatch, the stream class
+    calculates its substances from properties, see substance).
+    '''
+
+    def __init__(self,name,properties="shomate",eos=None):
+
+        if not properties in ["shomate","nasa9"]:
+            err = '''
+Backend {}: Error: properties not recognized: {}
+                    Only "shomate" or "nasa9" are allowed.
+'''.format(name,properties)
+            sys.exit(err)
+
+        self.name       = name
+        self.properties = properties
+        self.eos        = eos
+
+        return
+
+    def applies(self,isH2O):
+        '''Mask of the streams [N] that the backend can calculate (all streams).'''
+
+        return ones(len(isH2O),dtype=bool)
+
+    def corrects(self):
+        '''True if calc changes the ideal mixture values (otherwise it is not called).'''
+
+        return not self.eos is None
+
+    def ideal(self,jj,ids,T,p,refs):
+        '''
+        Properties h, s and cp of substances (entries [nnz] with table rows jj
+        and substance IDs ids, see substance_id) at T and p [nnz].
+        '''
+
+        h,s,cp = calc_shomate(jj,T,p,refs=refs)
+
+        if self.properties == "nasa9":
+            db = nasa9.get_database()
+            for sid in unique(ids):
+                nm = substance_name(sid)
+                m  = ids == sid
+                if nm in refs and nm in db:
+                    h[m],s[m],cp[m] = db.calc(db.index(nm),T[m],p[m])
+
+        return h, s, cp
+
+    def ideal_derivatives(self,jj,ids,T,p,refs):
+        '''Derivatives dh/dT, ds/dT and ds/dp of the substances of ideal (same arguments).'''
+
+        dhdT,dsdT,dsdp = calc_shomate_derivatives(jj,T,p,refs=refs)
+
+        if self.properties == "nasa9":
+            db = nasa9.get_database()
+            for sid in unique(ids):
+                nm = substance_name(sid)
+                m  = ids == sid
+                if nm in refs and nm in db:
+                    dhdT[m],dsdT[m],dsdp[m] = db.derivatives(db.index(nm),T[m],p[m])
+
+        return dhdT, dsdT, dsdp
+
+    def reference(self,refs):
+        '''Standard values h_0 and s_0 of each row of the reference table (see ReferenceTable.record).'''
+
+        records = [refs.record(nm,self.properties) for nm in refs.names]
+        h0 = asarray([nan if rec['h_0'] is None else rec['h_0'] for rec in records])
+        s0 = asarray([nan if rec['s_0'] is None else rec['s_0'] for rec in records])
+
+        return h0, s0
+
+    def calc(self,x,x0,T,p,T0,p0,phase,h,s,h_0,s_0):
+        '''
+        Correct the ideal mixture values of N streams: h, s at T, p with the
+        molar fractions x and h_0, s_0 at T0, p0 with x0 (Compositions).
+        Returns h, s, h_0, s_0 [N] and a list of warnings (message,mask [N]).
+        '''
+
+        if self.eos is None: return h, s, h_0, s_0, []
+
+        # Real-gas departures of the gas at (T,p) and at (T0,p0)
+        dh,ds,fail,xout     = gas_departure(self.eos,x.names,x.dense(),T,p)
+        dh0,ds0,fail0,xout0 = gas_departure(self.eos,x0.names,x0.dense(),T0,p0)
+
+        warnings = [("{} density did not converge, the gas is treated as ideal".format(self.eos),
+                     logical_or(fail,fail0)),
+                    ("more than 1% of the gas is not covered by {}, it gets the departure "\
+                     "of the rest of the gas".format(self.eos),xout > 0.01)]
+
+        return h+dh, s+ds, h_0+dh0, s_0+ds0, warnings
+
+    def derivative(self,x,x0,T,p,T0,p0,phase,vals,directions):
+        '''
+        Derivatives of the corrected values (h,s,h_0,s_0) of calc of N streams
+        along directions of their inputs, a list of (dx,dx0,dT,dp,dvals,step):
+        changes of the molar fractions x and x0 [N,S], of T and p [N], the
+        derivatives dvals of the ideal mixture values vals = (h,s,h_0,s_0)
+        and the steps [N] of any differences. Returns a list of (dh,ds,dh_0,ds_0).
+        '''
+
+        if not self.corrects(): return [dvals for dx,dx0,dT,dp,dvals,step in directions]
+
+        # Departures at (T,p) and at (T0,p0), see gas_departure_derivative
+        ddh,dds   = gas_departure_derivative(self.eos,x.names,x.dense(),T,p,
+                                             [(dx,dT,dp,step) for dx,dx0,dT,dp,dvals,step in directions])
+        ddh0,dds0 = gas_departure_derivative(self.eos,x0.names,x0.dense(),T0,p0,
+                                             [(dx0,0.0,0.0,step) for dx,dx0,dT,dp,dvals,step in directions])
+
+        return [(dh+a,ds+b,dh_0+c,ds_0+d) for (dx,dx0,dT,dp,(dh,ds,dh_0,ds_0),step),a,b,c,d
+                in zip(directions,ddh,dds,ddh0,dds0)]
+
+    def __repr__(self):
+        return "{}({}, properties={}, eos={})".format(type(self).__name__,self.name,self.properties,self.eos)
+
+class WaterBackend(Backend):
+    '''
+    IAPWS-IF97 backend of water streams (H2O and H2O(l) only, see if97):
+    h and s are taken relative to the liquid at (T0,p0), so that they are
+    on the same basis as the reference table,
+
+        h = h_0 + MW * ( h_IF97(T,p) - h_IF97(T0,p0) )
+
+    Two-phase streams are on the saturation line at p (see water_quality).
+    '''
+
+    def applies(self,isH2O):
+        '''Mask of the streams [N] that the backend can calculate (water streams).'''
+
+        return asarray(isH2O,dtype=bool)
+
+    def corrects(self):
+        return True
+
+    def calc(self,x,x0,T,p,T0,p0,phase,h,s,h_0,s_0):
+
+        h97,s97,cp97       = if97.calc(T,p,water_quality(T,p,phase))
+        h97_0,s97_0,cp97_0 = if97.calc(T0,p0)
+        h = h_0 + (h97-h97_0)*if97.MW
+        s = s_0 + (s97-s97_0)*if97.MW
+
+        warnings = [("T,p outside of regions 1, 2 and 4 of IF97, h and s not calculated",isnan(h))]
+
+        return h, s, h_0, s_0, warnings
+
+    def derivative(self,x,x0,T,p,T0,p0,phase,vals,directions):
+
+        q   = water_quality(T,p,phase)
+        out = []
+        for dx,dx0,dT,dp,(dh,ds,dh_0,ds_0),step in directions:
+
+            # IF97 along (dT,dp) by central differences, h and s follow h_0 and s_0
+            dh97 = dh_0
+            ds97 = ds_0
+            if any(asarray(dT) != 0.0) or any(asarray(dp) != 0.0):
+                hp,sp,cpp = if97.calc(T+step*dT,p+step*dp,q)
+                hm,sm,cpm = if97.calc(T-step*dT,p-step*dp,q)
+                dh97 = dh_0 + (hp-hm)/(2*step)*if97.MW
+                ds97 = ds_0 + (sp-sm)/(2*step)*if97.MW
+
+            out.append((dh97,ds97,dh_0,ds_0))
+
+        return out
+
+class TabulatedBackend(Backend):
+    '''
+    Backend with the ideal properties of the substances interpolated from
+    PropertyTables (see property_tables), all substances at once, instead
+    of the polynomials of each species in turn (the "nasa9" backend loops
+    over the species of a batch). Temperatures outside of the range of the
+    tables [Tmin,Tmax] are calculated exactly. The standard values h_0 and
+    s_0 are shifted by the deviation of the tables at the dead state, so
+    that the tables and the standard values agree there.
+
+    The values deviate from the polynomials by up to max_err of the tables
+    (relative to max(|value|,1)). Only batches use the tables: the stream
+    class calculates its substances from the polynomials (see substance).
+    '''
+
+    def __init__(self,name,properties="nasa9",eos=None,Tmin=200.0,Tmax=3400.0,tol=1e-6):
+
+        Backend.__init__(self,name,properties=properties,eos=eos)
+
+        self.settings = OrderedDict(Tmin=Tmin,Tmax=Tmax,tol=tol)
+
+        # Standard values of each reference table (by its tables, see reference)
+        self._reference = OrderedDict()
+
+        return
+
+    def tables(self,refs):
+        '''The PropertyTables of refs (built once per table, see property_tables).'''
+
+        return property_tables(refs,self.properties,**self.settings)
+
+    def ideal(self,jj,ids,T,p,refs):
+
+        tab    = self.tables(refs)
+        inside = logical_and(T >= tab.Tmin,T <= tab.Tmax)
+
+        if all(inside): return tab.calc(jj,T,p)
+
+        h,s,cp = Backend.ideal(self,jj,ids,T,p,refs)
+        h[inside],s[inside],cp[inside] = tab.calc(jj[inside],T[inside],p[inside])
+
+        return h, s, cp
+
+    def reference(self,refs):
+
+        tab = self.tables(refs)
+        if id(tab) in self._reference: return self._reference[id(tab)]
+
+        h0,s0 = Backend.reference(self,refs)
+
+        # Deviation of the tables at the dead state of each row
+        jj  = arange(len(refs))
+        ids = substance_id(refs.names)
+        T0  = refs.column('T0')
+        p0  = refs.column('p0')
+        h,s,cp    = self.ideal(jj,ids,T0,p0,refs)
+        he,se,cpe = Backend.ideal(self,jj,ids,T0,p0,refs)
+
+        self._reference[id(tab)] = (h0 + (h-he), s0 + (s-se))
+
+        return self._reference[id(tab)]
+
+# Registered backends (by name, see register_backend)
+BACKENDS = OrderedDict()
+
+def register_backend(backend):
+    '''Register a backend under its name, so that rules can refer to it.'''
+
+    BACKENDS[backend.name] = backend
+
+    return backend
+
+register_backend(Backend("shomate"))
+register_backend(Backend("nasa9",properties="nasa9"))
+register_backend(TabulatedBackend("nasa9-tables"))
+register_backend(Backend("GERG-2008",eos="GERG-2008"))
+register_backend(Backend("DETAIL",eos="DETAIL"))
+register_backend(WaterBackend("IF97"))
+
+def get_backend(name,eos=None):
+    '''
+    Return the registered backend name, or the backend of the substance
+    properties name ("shomate" or "nasa9") with the equation of state eos
+    (registered on first use, eg as "nasa9+DETAIL").
+    '''
+
+    if isinstance(name,Backend): return name
+
+    if not eos is None:
+        properties = name
+        eos  = aga8.get_eos(eos).name
+        name = eos if properties == "shomate" else "{}+{}".format(properties,eos)
+        if not name in BACKENDS:
+            register_backend(Backend(name,properties=properties,eos=eos))
+
+    if name in BACKENDS: return BACKENDS[name]
+
+    if name in ["GERG","GERG2008"]: return BACKENDS["GERG-2008"]
+
+    err = '''
+Backend: Error: backend not recognized: {}
+                Registered backends: {}
+'''.format(name,", ".join(BACKENDS.keys()))
+    sys.exit(err)
+
+### PROCESS-WIDE BACKEND RULES ###
+### Streams without their own rules (backend=None) use these rules,
+### the streams that no rule selects use their properties and eos
+
+_backend_rules = None
+
+def get_backend_rules():
+    '''Return the process-wide backend rules (by default, water streams use IF97).'''
+
+    global _backend_rules
+
+    if _backend_rules is None:
+        _backend_rules = backend_rules("water -> IF97")
+
+    return _backend_rules
+
+def set_backend_rules(rules):
+    '''Replace the process-wide backend rules (see backend_rules).'''
+
+    global _backend_rules
+
+    _backend_rules = backend_rules(rules)
+
+    return _backend_rules
+
+# Stream variables of the conditions of the rules, with their units
+RULE_VARIABLES = OrderedDict([('T','K'),('p','bar'),('mdot','')])
+RULE_OPERATORS = OrderedDict([('<=',less_equal),('>=',greater_equal),('==',equal),
+                              ('!=',not_equal),('<',less),('>',greater)])
+
+def backend_rules(rules):
+    '''
+    Return rules as a list of (condition,backend) pairs. rules can be
+      None      the process-wide rules (see get_backend_rules)
+      a backend (or its name) for all streams
+      a list of (condition,backend) pairs
+      a string of rules "condition -> backend" separated by ";", eg
+
+        "water -> IF97; p > 50 bar -> GERG-2008; T > 1000 and p > 20 -> DETAIL"
+
+    (a rule without a condition, eg "water -> IF97; DETAIL", holds for all streams).
+    A condition is "water" (water streams), "gas" (all other streams),
+    None/"all" (all streams), comparisons of T [K], p [bar] or mdot joined
+    by "and", or a function of the state arrays (T,p,mdot,isH2O) returning
+    a mask. The first rule that holds (and whose backend applies, see
+    Backend.applies) selects the backend of a stream.
+    '''
+
+    if rules is None: return get_backend_rules()
+
+    if isinstance(rules,Backend) or (isinstance(rules,str) and not "->" in rules):
+        return [(None,get_backend(rules))]
+
+    if isinstance(rules,str):
+        rules = [rule.split("->") for rule in rules.split(";") if rule.strip()]
+        for rule in rules:
+            if len(rule) > 2:
+                sys.exit("Backend: Error: rules must be 'condition -> backend': {}".format("->".join(rule)))
+        rules = [(None,rule[0].strip()) if len(rule) == 1 else (rule[0].strip(),rule[1].strip()) for rule in rules]
+
+    return [(cond,get_backend(name)) for cond,name in rules]
+
+def rule_mask(cond,state):
+    '''Mask of the streams [N] for which the condition of a rule holds (see backend_rules).'''
+
+    N = len(state['isH2O'])
+
+    if cond is None or cond == "all": return ones(N,dtype=bool)
+    if callable(cond):                return broadcast_to(asarray(cond(state),dtype=bool),(N,))
+    if cond == "water":               return asarray(state['isH2O'],dtype=bool)
+    if cond == "gas":                 return logical_not(state['isH2O'])
+
+    mask = ones(N,dtype=bool)
+    for part in cond.split(" and "):
+        match = re.match(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*([-+.0-9eE]+)\s*(\S*)\s*$",part)
+        if match is None or not match.group(1) in RULE_VARIABLES or \
+           not match.group(4) in ["",RULE_VARIABLES[match.group(1)]]:
+            sys.exit("Backend: Error: condition not recognized: {}".format(part.strip()))
+        var,op,val,unit = match.groups()
+        mask = logical_and(mask,RULE_OPERATORS[op](asarray(state[var],dtype=float64),float(val)))
+
+    return mask
+
+def select_backends(rules,fallback,T,p,mdot,isH2O):
+    '''
+    Select the backend of N streams from rules (see backend_rules), the
+    streams that no rule selects get fallback. Returns the list of backends
+    and the index of the backend of each stream [N].
+    '''
+
+    state = OrderedDict(T=asarray(T,dtype=float64),p=asarray(p,dtype=float64),
+                        mdot=asarray(mdot,dtype=float64),isH2O=asarray(isH2O,dtype=bool))
+
+    backends = [bk for cond,bk in rules] + [fallback]
+    ib       = full(len(state['isH2O']),len(backends)-1,dtype=intp)
+    free     = ones(len(ib),dtype=bool)
+
+    for b,(cond,bk) in enumerate(rules):
+        m = logical_and(free,logical_and(rule_mask(cond,state),bk.applies(state['isH2O'])))
+        ib[m]   = b
+        free[m] = False
+
+    return backends, ib
+
+### GATEX RUNS ###
+### GATEX reads gate.inp, flows.prn and composition.prn from its working
+### directory and writes exergies.m there: each run gets a temporary
+### directory of its own, so that runs can overlap (see run_gatex)
+
+# Columns of the stream tables of GATEX ('x' is the vapor fraction, 'SE' the entropy)
+GATEX_HEADER = ["STREAM","mdot","T","p","x","SE","Ar","CO2","CO","COS","H2O","XX","CH4","H2","H2S","N2","O2","SO2","H"]
+
+# Number of GATEX runs at once (None: the number of CPUs, see set_gatex_workers)
+_gatex_workers = None
+
+def get_gatex_workers():
+    '''Return the number of GATEX runs at once (default: the number of CPUs).'''
+
+    if _gatex_workers is None: return os.cpu_count() or 1
+
+    return _gatex_workers
+
+def set_gatex_workers(workers):
+    '''Set the number of GATEX runs at once (None: the number of CPUs), see run_gatex.'''
+
+    global _gatex_workers
+
+    if not workers is None and workers < 1:
+        sys.exit("GATEX: Error: the number of workers must be at least 1: {}".format(workers))
+    _gatex_workers = workers
+
+    return
+
+def gatex_command(gatex_exec,wine="wine"):
+    '''Command line of GATEX (with wine on Mac OS, where the .exe cannot run directly).'''
+
+    # Absolute path, since GATEX runs in another directory
+    cmd = [os.path.abspath(gatex_exec)]
+
+    try:
+        if os.uname()[0] in ["Darwin"]: cmd = [wine] + cmd
+    except AttributeError:
+        pass
+
+    return cmd
+
+def gatex_files(data,t0,p0,kelvin=1,fmt="%10.4f"):
+    '''
+    Contents of the GATEX input files of a stream table data [N,19] (columns
+    GATEX_HEADER) at the dead state t0, p0 (T in K if kelvin=1, in degC
+    if kelvin=0): an OrderedDict of file name => text.
+    '''
+
+    data = atleast_2d(asarray(data,dtype=float64))
+    n_streams = len(data)
+
+    ### Create the gate.inp file with the reference values #################
+    text = '''
+
+[system]
+
+t0 = {t0:10.3f} ;
+p0 = {p0:10.3f} ;
+number = {ns:6d}. ;
+ndiff = {nd:6d}. ;
+kelvin = {K:4d}. ;
+
+'''.format(t0=t0,p0=p0,ns=n_streams,nd=n_streams,K=kelvin)
+
+    # For gatex to read the file correctly, the
+    # stream number should appear twice. Here we duplicate
+    # the first column (which is the stream number)
+    data2 = insert(data,1,data[:,0],axis=1)
+    head2 = insert(array(GATEX_HEADER),1,GATEX_HEADER[0])
+
+    def table(names):
+        # Columns names of data2 as one vector (row by row), one value per line
+        buf = io.StringIO()
+        savetxt(buf,data2[:,isin(head2,names)].flatten(),fmt=fmt)
+        return buf.getvalue()
+
+    files = OrderedDict()
+    files["gate.inp"]        = text
+    files["flows.prn"]       = table(["STREAM","mdot","T","p","x"])
+    files["composition.prn"] = table(["STREAM","Ar","CO2","CO","COS","H2O","CH4","H2","H2S","N2","O2","SO2"])
+
+    return files
+
+def read_gatex_exergies(filename):
+    '''
+    Read the exergy table of exergies.m written by GATEX, one row per stream:
+    mdot [kg/s], T [K], p [bar], H [MW], S [kW/K], EPH [MW], ECH [MW], E [MW]
+    (values that GATEX cannot print, '*************', are NaN).
+    '''
+
+    with open(filename,'rb') as f:
+        contents = f.readlines()[37:]
+
+    new = []
+    for line in contents:
+        a = line.decode("cp1252",errors="replace").strip().replace("*************","NaN").split()
+        if len(a) > 0 and not a[0] == "];": new.append(a)
+
+    return asarray(new,dtype=float).reshape(-1,8)
+
+def run_gatex(jobs,gatex_exec,workers=None,fldr=None,keep=False,wine="wine"):
+    '''
+    Run GATEX for each job (an OrderedDict of input file name => text, see
+    gatex_files), each in a temporary directory of its own (in fldr, by
+    default the system temporary directory), at most workers runs at once
+    (default: see set_gatex_workers). Returns the exergy table of each job
+    (see read_gatex_exergies), or None where GATEX wrote no exergies.m.
+    The directories are removed afterwards, unless keep=True.
+    '''
+
+    cmd = gatex_command(gatex_exec,wine)
+    if workers is None: workers = get_gatex_workers()
+
+    def run(job):
+        tmp = tempfile.mkdtemp(prefix="gatex_",dir=fldr)
+        try:
+            for name,text in job.items():
+                with open(os.path.join(tmp,name),'w') as f: f.write(text)
+
+            # The output of GATEX goes to gatex.log in the directory
+            with open(os.path.join(tmp,"gatex.log"),'wb') as log:
+                try:
+                    code = subprocess.call(cmd,cwd=tmp,stdout=log,stderr=subprocess.STDOUT)
+                except OSError as e:
+                    sys.exit("GATEX: Error: cannot run {}: {}".format(" ".join(cmd),e))
+
+            out = os.path.join(tmp,"exergies.m")
+            if not os.path.isfile(out):
+                print("GATEX: Warning: no exergies.m written (exit code {}), see gatex.log "\
+                      "(keep=True keeps {}).".format(code,tmp))
+                return None
+
+            return read_gatex_exergies(out)
+        finally:
+            if not keep: shutil.rmtree(tmp,ignore_errors=True)
+
+    jobs = list(jobs)
+    if workers == 1 or len(jobs) <= 1: return [run(job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run,jobs))
+
+def calc_exergy_gatex(objects,gatex_exec=None,workers=None,fldr=None,keep=False):
+    '''
+    Calculate the exergies of streams and/or simulations with GATEX, all
+    runs at once (at most workers, see run_gatex), one run per stream or
+    simulation. The results are stored in the streams (see
+    stream.calc_exergy_gatex and simulation.calc_exergy_gatex), the
+    exergy table of each run is returned (None where GATEX failed).
+    gatex_exec defaults to the GATEX of the package.
+    '''
+
+    if gatex_exec is None:
+        gatex_exec = pkg_resources.resource_filename('streams','gatex_pc_if97_mj.exe')
+
+    objects = list(objects)
+    tables  = run_gatex([obj.gatex_job() for obj in objects],gatex_exec,workers=workers,fldr=fldr,keep=keep)
+
+    for obj,E in zip(objects,tables):
+        if not E is None: obj.store_gatex(E)
+
+    return tables
+
+### NOW STREAM CLASSES ###
+
+class StateView:
+    '''
+    Dict-style view of the state variables of a substance or stream,
+    which are stored in the slots of the object (see _fields). Variables
+    that are not a field of the object are kept in a separate dict.
+    '''
+
+    __slots__ = ('obj',)
+
+    def __init__(self,obj):
+        self.obj = obj
+
+    def __getitem__(self,key):
+        if key in self.obj._fieldset:
+            try:
+                return getattr(self.obj,key)
+            except AttributeError:
+                raise KeyError(key)
+        extra = self.obj._extra
+        if extra is None or not key in extra:
+            # Variables that the object can calculate on access (see stream._missing)
+            missing = getattr(type(self.obj),'_missing',None)
+            if missing is None or not missing(self.obj,key): raise KeyError(key)
+            extra = self.obj._extra
+        return extra[key]
+
+    def __setitem__(self,key,val):
+        if key in self.obj._fieldset:
+            setattr(self.obj,key,val)
+        else:
+            if self.obj._extra is None: self.obj._extra = OrderedDict()
+            self.obj._extra[key] = val
+
+    def get(self,key,default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = [key for key in self.obj._fields if hasattr(self.obj,key)]
+        if not self.obj._extra is None: keys = keys + list(self.obj._extra.keys())
+        return keys
+
+    def __contains__(self,key):
+        if key in self.obj._fieldset: return hasattr(self.obj,key)
+        return not self.obj._extra is None and key in self.obj._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key,self[key]) for key in self.keys()]
+
+    def copy(self):
+        '''Return the state variables as an independent OrderedDict.'''
+        return OrderedDict(self.items())
+
+    def __repr__(self):
+        return "StateView({})".format(dict(self.items()))
+
+class substance:
+    '''
+    This class manages calculations for a given substance.
+
+    Only the state of the substance in its stream is stored (in slots,
+    see state); the reference values are a record shared by all
+    substances of the same name (see ReferenceTable.record).
+    '''
+
+    _fields   = ('T','p','mdot','x','h','s','cp')
+    _fieldset = frozenset(_fields)
+
+    __slots__ = ('id','name','unknown','ref','_extra') + _fields
+
+    def __init__(self,id,name,T,p,mdot,x,T0=298.15,p0=1.013,refs=None,properties="shomate"):
+        '''
+        Initialize a substance of a stream
+          refs = table of reference values to use
+                 (default: the process-wide table, see get_reference)
+          properties = source of h, s and cp: "shomate" (polynomials of
+                 the reference table) or "nasa9" (NASA-9 polynomials, see nasa9.py)
+        '''
+
+        # Define some constants
+        R = 8.314       # kJ/kmol-K, ideal gas constant
+
+        # Make a string of the id,name for easy formatting
+        idstr = "{:4}".format(id)
+        namestr = "{:11}".format(name)
+        unknown = False
+
+        # Adjust x values if they are tiny to simplify calcs.
+        #if abs(x) < 1e-7: x = 0.0
+
+        # Make sure x is valid
+        if x < 0 or x > 1:
+            err = '''
+Stream {}: {}: Error: molar fraction x must be between 0 and 1!
+'''.format(idstr,namestr)
+            sys.exit(err)
+
+        # Generate the initial state of this substance in the stream
+        state = OrderedDict(T=T,p=p,mdot=mdot*x,x=x)
+
+        # Get reference substance values for the dead state (T0,p0)
+        if refs is None: refs = get_reference()
+        refs = refs.dead_state(T0,p0)
+
+        # Now check that we can actually model this substance
+        nameref = name
+        if not name in refs.keys():
+            if x > 0:
+                print("Stream {}: {}: Warning: no reference values found for substance! " \
+                      "Setting x = {:10.5g} => 0.0.".format(idstr,namestr,x))
+            x = 0.0
+            nameref = "unknown"
+            unknown = True
+
+        # Since we know the substance exists,
+        # get the (shared) reference values here
+        ref = refs.record(nameref,"shomate" if unknown else properties)
+
+        # Look up the properties in the cache of substance states (if enabled)
+        cache  = get_cache('substance')
+        cached = None
+        if not cache is None:
+            cache_key = cache.quantize(refs,nameref,properties,T,p)
+            cached    = cache.get(cache_key)
+
+        if not cached is None:
+            state['h'],state['s'],state['cp'] = cached
+
+        else:
+
+            # Get a useful factor (ajr: what is this?)
+            y = T/1e3
+
+            ##### Calculations of enthalpy h
+            ##### (depends only on T, because we assume ideal gases)
+
+            # If H+ not known for the element, then we
+            # calculate it using cp_0, h_0 and T
+            if ref['H+'] == None:
+                state['h'] = ( (ref['cp_0']) * (T-ref['T0']) ) + ref['h_0']      # NO change in cp
+
+            else:
+                state['h'] = 1e3 * (  ref['H+'] + ref['a']*y
+                                    + ref['b']/2 * y**2
+                                    - ref['c']*y**(-1)
+                                    + ref['d']/3 * y**3 )
+
+                # Limit enthalpy errors
+                if state['h'] > -5.0 and state['h'] < 0.0:
+                    print("Stream {}: {}: Warning: small negative enthalpy set to zero.".format(idstr,namestr))
+                    state['h'] = 0.0
+
+            ##### Calculations of entropy
+            ##### (depend both on T and p)
+
+            # If H+ not known for the element, then we
+            # calculate it using cp_0, h_0 and T and p
+            if ref['S+'] == None:
+                state['s'] = ( (ref['cp_0']/T)*(T-ref['T0']) - R*log(p/ref['p0']) ) + ref['s_0']
+
+            else:
+                state['s'] = (  ref['S+'] + ref['a']*log(T) + ref['b']*y
+                              - ref['c']/2 * y**(-2)
+                              + ref['d']/2 * y**2   )     - R * log(p/ref['p0'])
+
+            ##### Calculations of specific heat cp
+            ##### (depends on T)
+            if ref['a'] == None:
+                state['cp'] = ref['cp_0']
+
+            else:
+                state['cp'] = ( ref['a'] + ref['b']*y
+                              + ref['c'] * y**(-2)
+                              + ref['d'] * y**2 )
+
+            ##### Alternatively, use the NASA-9 polynomials (valid over several
+            ##### temperature ranges). The reference values h_0 and s_0 are then
+            ##### also obtained from the polynomials, so that they are consistent
+            ##### (see ReferenceTable.record).
+            if properties == "nasa9" and not unknown:
+
+                db = nasa9.get_database()
+
+                if nameref in db:
+                    k = db.index(nameref)
+                    h,s,cp = db.calc(k,T,p)
+
+                    # Substances that are absent (eg, H2O(l) kept for the water split) do not count
+                    if x > 0 and not db.valid(k,T):
+                        print("Stream {}: {}: Warning: T = {:7.2f} K outside of NASA-9 temperature ranges.".format(idstr,namestr,T))
+
+                    state['h']  = float(h)
+                    state['s']  = float(s)
+                    state['cp'] = float(cp)
+
+                else:
+                    print("Stream {}: {}: Warning: no NASA-9 polynomials found, " \
+                          "using reference table values.".format(idstr,namestr))
+
+            elif not properties in ["shomate","nasa9"]:
+                err = '''
+Stream {}: {}: Error: properties not recognized: {}
+                    Only "shomate" or "nasa9" are allowed.
+'''.format(idstr,namestr,properties)
+                sys.exit(err)
+
+            if not cache is None:
+                cache.put(cache_key,(state['h'],state['s'],state['cp']))
+
+        # Store the output
+        self.id      = id
+        self.name    = name
+        self.unknown = unknown
+        self._extra  = None
+        self.state   = state
+        self.ref     = ref
+
+        return
+
+    @property
+    def idstr(self):
+        return "{:4}".format(self.id)
+
+    @property
+    def namestr(self):
+        return "{:11}".format(self.name)
+
+    @property
+    def state(self):
+        '''State variables of the substance (a dict-style view of the slots).'''
+        return StateView(self)
+
+    @state.setter
+    def state(self,state):
+        for key,val in list(state.items()): StateView(self)[key] = val
+
+    def __str__(self):
+        '''Output the substance object to the screen in a human readable way.'''
+
+        text = "\nStream {}: {}".format(self.idstr,self.namestr)
+        for key,value in self.state.items():
+            text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+
+        text = text +  "\nREFERENCE VALUES"
+        for key,value in self.ref.items():
+            text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+
+        return text
+
+
+class SubstanceOverlay:
+    '''
+    Substance of a stream with a different molar fraction x, eg, the water
+    of the stream at the standard state (T0,p0). Only x is stored, all other
+    state variables and the reference values are those of the base substance.
+    '''
+
+    __slots__ = ('base','x')
+
+    def __init__(self,base,x=None):
+        self.base = base
+        self.x    = base.x if x is None else x
+
+    def __getattr__(self,key):
+        if key == 'base': raise AttributeError(key)
+        return getattr(self.base,key)
+
+    @property
+    def state(self):
+        '''State variables of the substance (x of the overlay, the rest of the base).'''
+        return StateView(self)
+
+    def __str__(self):
+        return substance.__str__(self)
+
+class stream:
+    '''
+    This class manages all values concerning a
+    given stream and calculation of its exergy.
+
+    The state variables are stored in slots (see state),
+    other variables are kept in a separate dict.
+
+    The substances and the thermodynamic properties of the stream are only
+    calculated when they are first accessed (eg, state['h'] or comp), and
+    they are recalculated after T, p, mdot, T0, p0 or the composition change.
+    The exergies are calculated in the same way once an exergy type is known
+    (from exergy_type or the last call to calc_exergy).
+    '''
+
+    _fields   = ('T','p','mdot','T0','p0','phase','MW','h','h_0','s','s_0','H','S',
+                 'e_ph','e_ch','e_ph_kg','e_ch_kg','E_ph','E_ch','e_tot_kg','E_tot')
+    _fieldset = frozenset(_fields)
+
+    # Variables that the properties depend on
+    _inputs   = frozenset(['T','p','mdot','T0','p0','phase','eos','backend','_composition'])
+
+    # Properties calculated on access (see _evaluate and calc_exergy)
+    _lazy     = ('comp','comp0','isH2O','MW','h','h_0','s','s_0','H','S')
+    _exergies = ('e_ph','e_ch','e_ph_kg','e_ch_kg','E_ph','E_ch','e_tot_kg','E_tot')
+
+    __slots__ = ('id','isH2O','comp','comp0','refs','properties','eos','backend','_backend','_extra',
+                 '_composition','_exergy_type','_valid') + _fields
+
+    def __init__(self,id,T,p,mdot,composition,phase=[1.0,0.0,0.0],T0=298.15,p0=1.013,exergy_type=None,refs=None,
+                 properties="shomate",eos=None,backend=None):
+        '''
+        Initialize a stream
+          id = stream number/name
+          T  = stream temperature
+          p  = stream pressure
+          mdot = stream total mass flow rate kg/hr ?
+          composition = list of substances and molar fractions x
+                        ( a list of tuples: [ ('N2',0.5), ('O2',0.1) ] )
+          phase = [VFRAC,LFRAC,SFRAC], fraction of vapor, liquid and solid
+                  *** phase only needed for H2O streams ***
+          T0, p0 = reference state values for temp (K) and pressure (bar)
+          refs = table of reference values to use
+                 (default: the process-wide table, see get_reference)
+          properties = source of h, s and cp of the substances:
+                 "shomate" (reference table) or "nasa9" (NASA-9 polynomials)
+          eos  = real-gas equation of state of the gas: None (ideal gas),
+                 "GERG-2008" or "DETAIL" (see aga8 and gas_departure)
+          backend = rules that select the property backend of the stream, eg
+                 "water -> IF97; p > 50 bar -> GERG-2008" (see backend_rules),
+                 if no rule holds, properties and eos are used
+                 (default: the process-wide rules, see get_backend_rules)
+        '''
+
+        ### TO DO ###
+        # Implement optional arguments of an array row containing
+        # all stream info and an array row containing the header
+        # Then extract the info as needed for this class.
+        #############
+
+        # Get reference substance values once for all substances,
+        # derived for the dead state (T0,p0) of the stream
+        if refs is None: refs = get_reference()
+        refs = refs.dead_state(T0,p0)
+
+        # Store the inputs, the properties are calculated on first access
+        self._valid       = False
+        self._exergy_type = None
+        self._extra       = None
+        self.id           = id
+        self.refs         = refs
+        self.properties   = properties
+        object.__setattr__(self,'eos',eos)
+        object.__setattr__(self,'backend',backend)
+        object.__setattr__(self,'_composition',list(composition))
+
+        # First store the state and the phase
+        # (directly, since there is nothing to invalidate yet)
+        for key,val in [('T',T),('p',p),('mdot',mdot),('T0',T0),('p0',p0),('phase',phase)]:
+            object.__setattr__(self,key,val)
+
+        if not exergy_type is None:
+            # Finally, calculate exergy if desired
+
+            if exergy_type == "gatex":
+                GATEX_EXE_FILE = pkg_resources.resource_filename('streams', 'gatex_pc_if97_mj.exe')
+                #print(GATEX_EXE_FILE)
+                #sys.exit()
+                self.calc_exergy_gatex(gatex_exec=GATEX_EXE_FILE)
+            elif isinstance(exergy_type,(str,list,tuple)) and len(exergy_models(exergy_type)) > 0 \
+                 and all([isinstance(model,str) and not exergy_column(refs,model) is None
+                          for model in exergy_models(exergy_type)]):
+                # One model or several models (see calc_exergy), calculated on access
+                self._exergy_type = exergy_type if isinstance(exergy_type,str) else list(exergy_type)
+            else:
+                print("Stream {}: exergy_type not recognized: {}.".format(self.idstr,exergy_type))
+
+
+        return
+
+    def _evaluate(self):
+        '''Generate the substances and calculate the properties of the stream.'''
+
+        id          = self.id
+        idstr       = self.idstr
+        properties  = self.properties
+        composition = self._composition
+        T,p,mdot    = self.T,self.p,self.mdot
+        T0,p0       = self.T0,self.p0
+
+        refs = self.refs.dead_state(T0,p0)
+        self.refs = refs
+
+        state = self.state
+
+        ## Determine what kind of stream we have (H2O or not, flue gas or not),
+        ## including the water added by the rules below (see fractions)
+        xw    = self.fractions()
+        isH2O = 'H2O' in xw and xw['H2O'] + xw['H2O(l)'] == 1.0
+
+        #print("Stream {}: isH2O={}".format(idstr,isH2O))
+
+        ## Select the property backend of the stream: the first of its rules
+        ## that holds, otherwise properties and eos (see select_backends)
+        backends,ib = select_backends(backend_rules(self.backend),get_backend(properties,self.eos),
+                                      [T],[p],[mdot],[isH2O])
+        backend     = backends[ib[0]]
+        properties  = backend.properties
+
+        ## Loop over the substances and initialize each
+        ## one for the current stream state (substances with x = 0
+        ## contribute nothing and are skipped, except water, see Composition.keep)
+        comp = OrderedDict()
         for name,x in composition:
-            comp[name] = substance(id,name,T=T,p=p,mdot=mdot,x=x,T0=T0,p0=p0)
+            if x == 0.0 and not name in Composition.keep: continue
+            comp[name] = substance(id,name,T=T,p=p,mdot=mdot,x=x,T0=T0,p0=p0,refs=refs,properties=properties)
             #print(name + "\n")
 
-        ## Calculate MW of the stream and
-        ## the total molar fraction (should sum to 1 unless substances are missing)
-        state['MW'] = 0.0
-        xtot        = 0.0
-        for key,sub in comp.items():
-            state['MW'] = state['MW'] + ( sub.ref['MW']*sub.state['x'] )
-            xtot        = xtot + sub.state['x']
+        ## Calculate MW of the stream and
+        ## the total molar fraction (should sum to 1 unless substances are missing)
+        state['MW'] = 0.0
+        xtot        = 0.0
+        for key,sub in comp.items():
+            state['MW'] = state['MW'] + ( sub.ref['MW']*sub.state['x'] )
+            xtot        = xtot + sub.state['x']
+
+        # Check if xtot is 1
+        # if abs(1.0 - xtot) > 1e-5:
+        #     print("Stream {}: Warning: total x not equal to 1!").format(idstr))
+
+        ## Hack from Matlab: if a stream contains neither N2 or CH4, then set
+        ## total weight fraction to water
+        names = [name for name,x in composition]
+        if (not 'N2' in names) and (not 'CH4' in names):
+        #if comp['N2'].state['x'] + comp['CH4'].state['x'] == 0:
+            comp['H2O'] = substance(id,'H2O',T=T,p=p,mdot=mdot,x=1.0,T0=T0,p0=p0,refs=refs,properties=properties)
+
+        ## Handling water ##
+        ## Make sure that if a stream has H2O(l), it also has H2O(g) and vice-versa
+        ## (This will facilitate calculations later involving liquid and gas)
+        if 'H2O(l)' in comp.keys() and not 'H2O' in comp.keys():
+            comp['H2O'] = substance(id,'H2O',T=T,p=p,mdot=mdot,x=0.0,T0=T0,p0=p0,refs=refs,properties=properties)
+        if 'H2O' in comp.keys() and not 'H2O(l)' in comp.keys():
+            comp['H2O(l)'] = substance(id,'H2O(l)',T=T,p=p,mdot=mdot,x=0.0,T0=T0,p0=p0,refs=refs,properties=properties)
+
+        # Make a view of the stream substances that will be adjusted for
+        # calculating the standard (T0,p0) values: substances written to comp0
+        # only hide those of comp (nothing is copied, see SubstanceOverlay)
+        comp0 = ChainMap(OrderedDict(),comp)
+
+        ## If stream is flue gas, adjust water percentages
+        ## (For now, always adjust since we don't know how to tell
+        ##  if it's flue gas or not)
+        # The water vapor is limited to the saturation pressure at T0
+        # (0.0317 bar at 25C) at the stream pressure, see condense_water:
+        # x_H2O_new(g) = ( psat0 * x_dry ) / (p - psat0)                 # % mol
+        # x_H2O(l) = x_H2O(l) + (x_H2O - x_H2O_new(g))
+        if 'H2O(l)' in comp0.keys():
+            comp0['H2O(l)'] = SubstanceOverlay(comp['H2O(l)'])
+            comp0['H2O']    = SubstanceOverlay(comp['H2O'])
+            x_new_g,x_new_l = condense_water(comp['H2O'].state['x'],comp['H2O(l)'].state['x'],
+                                             xtot,p,refs.psat0)
+            comp0['H2O(l)'].state['x'] = float(x_new_l)
+            comp0['H2O'].state['x']    = float(x_new_g)
+
+        ## Calculate enthalpy (h) and entropy (s) of the ideal mixture
+        state['h']    = 0.0    # Enthalpy at T  for mixture
+        state['h_0']  = 0.0    # Enthalpy at T0 for mixture
+        state['s']    = 0.0    # Entropy  at T  for mixture
+        state['s_0']  = 0.0    # Entropy  at T0 for mixture
+
+        # Loop over elements and get stream variables
+        for key,sub in comp.items():
+            state['h']   = state['h']   + ( sub.state['h']*sub.state['x'] )
+            state['s']   = state['s']   + ( sub.state['s']*sub.state['x'] )
+
+        # Loop over standard (T0,p0) elements and get stream variables
+        for key,sub in comp0.items():
+            state['h_0'] = state['h_0'] + ( sub.ref['h_0']*sub.state['x'] )
+            state['s_0'] = state['s_0'] + ( sub.ref['s_0']*sub.state['x'] )
+
+        ## Corrections of the backend: real-gas departures of the gas,
+        ## IF97 for water streams, ... (see Backend.calc)
+        if backend.corrects():
+            x  = Composition.from_rows([[(name,sub.state['x']) for name,sub in comp.items()]])
+            x0 = Composition.from_rows([[(name,sub.state['x']) for name,sub in comp0.items()]])
+            h,s,h_0,s_0,warnings = backend.calc(x,x0,array([T],dtype=float64),array([p],dtype=float64),T0,p0,
+                                                array([self.phase],dtype=float64),
+                                                array([state['h']]),array([state['s']]),
+                                                array([state['h_0']]),array([state['s_0']]))
+
+            for msg,mask in warnings:
+                if mask[0]: print("Stream {}: Warning: {}.".format(idstr,msg))
+
+            state['h']   = float(h[0])
+            state['s']   = float(s[0])
+            state['h_0'] = float(h_0[0])
+            state['s_0'] = float(s_0[0])
+        ####
+
+        # Make an additional output of H in MW and S in MW/K
+        # H: kJ/kmol => MW; S: kJ/kmol/K => kW/K
+        # H = h * mdot / ( (MW*1e-3) *1e6 )
+        # S = s * mdot / ( (MW*1e-3) *1e3 )
+        if not state['MW'] == 0.0:
+            state['H'] = state['h']  * state['mdot'] / ((state['MW']*1e-3)*1e6)
+            state['S'] = state['s']  * state['mdot'] / ((state['MW']*1e-3)*1e3)
+
+        # Update stream information with locally defined values
+        self.isH2O  = isH2O
+        self.comp   = comp
+        self.comp0  = comp0
+        self._backend = backend
+        self._valid = True
+
+        return
+
+    def __getattr__(self,key):
+        '''Calculate the properties of the stream on first access.'''
+
+        if key.startswith('_'): raise AttributeError(key)
+
+        if key == 'MW' and not self._valid:
+            # Only the composition is needed for MW
+            MW = 0.0
+            for name,x in OrderedDict(self._composition).items():
+                if x == 0.0: continue
+                MW = MW + ( self.refs.record(name if name in self.refs else "unknown")['MW']*x )
+            self.MW = MW
+            return MW
+
+        if key == 'isH2O' and not self._valid:
+            # Only the composition is needed for isH2O
+            x = self.fractions()
+            self.isH2O = 'H2O' in x and x['H2O'] + x['H2O(l)'] == 1.0
+            return self.isH2O
+
+        if key in stream._lazy and not self._valid:
+            self._evaluate()
+            return object.__getattribute__(self,key)
+
+        if key in stream._exergies and not self._exergy_type is None:
+            self.calc_exergy(self._exergy_type)
+            return object.__getattribute__(self,key)
+
+        raise AttributeError(key)
+
+    def __setattr__(self,key,val):
+
+        if key in stream._inputs:
+            # Only a changed input invalidates the properties
+            try:
+                old = object.__getattribute__(self,key)
+                unchanged = old is val or bool(old == val)
+            except (AttributeError,ValueError):
+                unchanged = False
+
+            object.__setattr__(self,key,val)
+            if not unchanged: self.invalidate()
+
+        else:
+            object.__setattr__(self,key,val)
+
+    def invalidate(self):
+        '''Discard the calculated properties and exergies, they are recalculated on access.'''
+
+        for key in stream._lazy + stream._exergies:
+            try:
+                object.__delattr__(self,key)
+            except AttributeError:
+                pass
+
+        self._drop_models()
 
-        # Check if xtot is 1
-        # if abs(1.0 - xtot) > 1e-5:
-        #     print("Stream {}: Warning: total x not equal to 1!").format(idstr))
+        object.__setattr__(self,'_valid',False)
 
-        ## Hack from Matlab: if a stream contains neither N2 or CH4, then set
-        ## total weight fraction to water
-        if (not 'N2' in comp.keys()) and (not 'CH4' in comp.keys()):
-        #if comp['N2'].state['x'] + comp['CH4'].state['x'] == 0:
-            comp['H2O'] = substance(id,'H2O',T=T,p=p,mdot=mdot,x=1.0,T0=T0,p0=p0)
+        return
+
+    def _drop_models(self):
+        '''Discard the model-qualified exergies (eg, e_ch[Szargut]).'''
+
+        if not self._extra is None:
+            for key in [key for key in self._extra if is_model_key(key)]:
+                del self._extra[key]
+
+    def _missing(self,key):
+        '''Calculate a model-qualified exergy on access (see StateView).'''
+
+        if is_model_key(key) and isinstance(self._exergy_type,list):
+            self.calc_exergy(self._exergy_type)
+            return not self._extra is None and key in self._extra
+
+        return False
+
+    @property
+    def composition(self):
+        '''List of substances and molar fractions x of the stream.'''
+        return list(self._composition)
+
+    @composition.setter
+    def composition(self,composition):
+        self._composition = list(composition)
+
+    def fractions(self):
+        '''
+        Return the molar fractions of all substances of the stream
+        (including the water added by the stream rules, see _evaluate)
+        as an OrderedDict, without calculating any properties.
+        '''
+
+        x = OrderedDict(self._composition)
+
+        ## Hack from Matlab (see _evaluate)
+        if (not 'N2' in x) and (not 'CH4' in x): x['H2O'] = 1.0
 
-        ## Handling water ##
         ## Make sure that if a stream has H2O(l), it also has H2O(g) and vice-versa
-        ## (This will facilitate calculations later involving liquid and gas)
-        if 'H2O(l)' in comp.keys() and not 'H2O' in comp.keys():
-            comp['H2O'] = substance(id,'H2O',T=T,p=p,mdot=mdot,x=0.0,T0=T0,p0=p0)
-        if 'H2O' in comp.keys() and not 'H2O(l)' in comp.keys():
-            comp['H2O(l)'] = substance(id,'H2O(l)',T=T,p=p,mdot=mdot,x=0.0,T0=T0,p0=p0)
+        if 'H2O(l)' in x and not 'H2O' in x: x['H2O']    = 0.0
+        if 'H2O' in x and not 'H2O(l)' in x: x['H2O(l)'] = 0.0
+
+        return x
+
+    @property
+    def idstr(self):
+        return "{:4}".format(self.id)
 
-        ## Determine what kind of stream we have (H2O or not, flue gas or not)
-        if 'H2O' in comp.keys():
-            if comp['H2O'].state['x'] + comp['H2O(l)'].state['x'] == 1.0:
-                isH2O = True
+    @property
+    def state(self):
+        '''State variables of the stream (a dict-style view of the slots).'''
+        return StateView(self)
+
+    @state.setter
+    def state(self,state):
+        for key,val in list(state.items()): StateView(self)[key] = val
+
+    def calc_exergy(self,exergy_type="Ahrends"):
+        '''
+        Calculation of exergies given the state of
+        a stream.
+
+        exergy_type can also be a list of models, eg, ["Ahrends","Szargut"]:
+        the physical exergy and the liquid water correction are then calculated
+        once, the chemical exergy of all models in the same pass. The exergies
+        of each model are stored under qualified keys (e_ch[Szargut], E_tot[Szargut],
+        see MODEL_KEYS), the plain keys hold those of the first model.
+        '''
+
+        # Define some constants
+        R = 8.314       # kJ/kmol-K, ideal gas constant
+
+        # Get idstr
+        idstr = self.idstr
+
+        # Decide which chemical exergy values to use (Ahrends or Szargut,
+        # or any other column of the reference table, see calc_chemical_exergy)
+        models   = exergy_models(exergy_type)
+        names_ch = [exergy_column(self.refs,model) for model in models]
+        for model,name_ch in zip(models,names_ch):
+            if name_ch is None:
+                err = '''
+Stream {}: Error: Incorrect exergy type given: {}
+                    Only "ahrends", "szargut" or a column of the reference table are allowed.
+'''.format(idstr,model)
+                sys.exit(err)
+
+        # Chemical exergy of a substance (columns added to the reference
+        # table after the stream was generated are read from the table)
+        def e_ch_0(sub,name_ch):
+            if name_ch in sub.ref:
+                val = sub.ref[name_ch]
             else:
-                isH2O = False
+                refs = self.refs if name_ch in self.refs.fields else self.refs.base
+                val  = refs["unknown" if sub.unknown else sub.name][name_ch]
+            return nan if val is None else val
+
+
+        # Remember the exergy type (exergies are recalculated with it after changes)
+        self._exergy_type = exergy_type if isinstance(exergy_type,str) else models
+        self._drop_models()
+
+        # Open variables locally
+        state = self.state
+        comp  = self.comp
+        comp0 = self.comp0
+
+        # Look up the specific exergies in the cache of stream states (if enabled)
+        cache  = get_cache('stream')
+        cached = None
+        if not cache is None:
+            cache_key = cache.quantize(self.refs,self._backend.name,tuple(names_ch),state['T'],state['p'],
+                                       tuple(float(v) for v in state['phase']),
+                                       [(name,sub.state['x']) for name,sub in comp.items()])
+            cached    = cache.get(cache_key)
+
+        if not cached is None:
+            state['e_ph'],e_ch = cached
+
         else:
-            isH2O = False
 
-        #print("Stream {}: isH2O={}".format(idstr,isH2O))
+            ## PHYSICAL EXERGY
+            # Physical specific exergy of stream  ###
+            state['e_ph']    = ( state['h']-state['h_0']
+                               - state['T0']*(state['s']-state['s_0']) )    # kJ/kmol
 
-        # Make a duplicate list of stream substances
-        # that will be adjusted for calculating the standard (T0,p0) values
-        comp0 = deepcopy(comp)
+            # Limit e_ph to postive values and/or give warnings
+            if state['e_ph'] < -5.0:
+                print("Stream {}: Warning: negative physical exergy.".format(self.id))
+            elif state['e_ph'] < 0.0:
+                state['e_ph'] = 0.0
 
-        ## If stream is flue gas, adjust water percentages
-        ## (For now, always adjust since we don't know how to tell
-        ##  if it's flue gas or not)
-        # At 25C the pressure would be 0.0317bar, so:
-        # x_H2O_new(g) = ( 0.0317 * ( 1- x_H2O ) ) / (1 - 0.0317)         # % mol
-        # x_H2O(l) = x_H2O(l) + (x_H2O - x_H2O_new(g))
-        if 'H2O(l)' in comp0.keys():
-            x_l = comp0['H2O(l)'].state['x']
-            x_g = comp0['H2O'].state['x']
-            x       = x_l + x_g
-            if x > 0.0:
-                x_new_g = 0.0317*(xtot-x) / (xtot-0.0317)    # mol frac
-                x_new_g = max(x_new_g,0.0)
-                x_new_l = (x - x_new_g)                    # mol frac
-                x_new_l = max(x_new_l,0.0)
-                comp0['H2O(l)'].state['x'] = x_new_l
-                comp0['H2O'].state['x']    = x_new_g
-
-                text = (
-"Stream {}: Check: x of H2O(l),H2O = {:5.3f},{:5.3f} => {:5.3f},{:5.3f}".format(idstr,x_l,x_g,x_new_l,x_new_g) )
-
-                print(text)
-
-            if not (comp0['H2O(l)'].state['x'] + comp0['H2O'].state['x']
-                ==  comp['H2O(l)'].state['x'] +  comp['H2O'].state['x']):
-                text = "Stream {}: Warning: corrected H2O molar fractions "\
-                       "do not sum to original total!"\
-                       " All H2O set to gas (x of H2O(l)=0).".format(idstr)
-                print(text)
-                comp0['H2O(l)'].state['x'] = 0.0
-                comp0['H2O'].state['x']    = x
-
-        ## Calculate enthalpy (h) and entropy (s) depending on type of stream
-        if not isH2O:
-
-            # Enthalpy and entropy
-            state['h']    = 0.0    # Enthalpy at T  for mixture
-            state['h_0']  = 0.0    # Enthalpy at T0 for mixture
-            state['s']    = 0.0    # Entropy  at T  for mixture
-            state['s_0']  = 0.0    # Entropy  at T0 for mixture
-
-            # Loop over elements and get stream variables
-            for key,sub in comp.items():
-                state['h']   = state['h']   + ( sub.state['h']*sub.state['x'] )
-                state['s']   = state['s']   + ( sub.state['s']*sub.state['x'] )
-
-            # Loop over standard (T0,p0) elements and get stream variables
-            for key,sub in comp0.items():
-                state['h_0'] = state['h_0'] + ( sub.ref['h_0']*sub.state['x'] )
-                state['s_0'] = state['s_0'] + ( sub.ref['s_0']*sub.state['x'] )
-
-
-        else:   # Case 2: water stream, H2O(l) and/or H2O(g)
-
-            #!!!! CHECK IF WE HAVE SATURATED WATER OR STEAM  !!!!!
-            isSaturated = False
-            ## ADD TEST HERE
-
-            if isSaturated:
-                # Calculate enthalpy from the IAPWS IF97 steam tables for saturated streams
-                ## TO BE IMPLEMENTED !!!
-                pass
 
-            else:  # Not saturated, calculate here...
+            ## CHEMICAL EXERGY
+            # Chemical specific exergy of stream (for each model) ###
+
+            # If liquid water is present, e_ch must be calculated in two steps.
+            # 1. Adjust the molar fractions to eliminate liquid water (so only gas phase is left)
+            # 2. e_ch = e_ch_gas*x_tot_gas + e_ch_h2o(l)*x_tot_h2o(l)
+
+            # Check for liquid water (at 25 C)
+            if not self.isH2O and 'H2O(l)' in comp0.keys() \
+                       and comp0['H2O(l)'].state['x'] > 0.0:
+
+                # Adjust molar fractions for liquid and gas calcs seperately
+                # (the scaled gas fractions are only used locally)
+
+                # Get total molar fraction x_tot (should be 1, unless substances missing)
+                x_tot = 0.0
+                for key,sub in comp.items(): x_tot = x_tot + sub.state['x']
+
+                # Determine the liquid and gas content
+                x_tot_l = comp0['H2O(l)'].state['x']
+                x_tot_g = x_tot - x_tot_l
+
+                # Get the scaling factor for the gases
+                xfac = x_tot / x_tot_g
+
+                ## Scale the x value and calculate the chemical exergy for gas
+                x_tot_tmp = 0.0
+                sum1 = [0.0]*len(models)
+                sum2 = 0.0
+                for key,sub in comp0.items():
+                    if not key == "H2O(l)" and not sub.state['x'] == 0.0:
+                        x = sub.state['x']*xfac
+                        x_tot_tmp = x_tot_tmp + x
+
+                        sum1 = [s1 + ( e_ch_0(sub,name_ch)*x ) for s1,name_ch in zip(sum1,names_ch)]
+                        sum2 = sum2 + ( x*log(x) )
+
+                        #print("x {:12}: {}".format(key,x))
+
+                # print("x_tot     {}".format(x_tot))
+                # print("x_tot_g   {}".format(x_tot_g))
+                # print("x_tot_l   {}".format(x_tot_l))
+                # print("x_tot_tmp {}".format(x_tot_tmp))
+
+                # But now make sure that the temporary x_tot_tmp is the same as the original!
+                if abs(x_tot-x_tot_tmp) > 1e-3:
+                    print("Stream {}: Error: x_tot_tmp not correct: {} != {}".format(idstr,x_tot_tmp,x_tot))
+                    sys.exit()
+
+                e_ch = []
+                for s1,name_ch in zip(sum1,names_ch):
+                    e_ch_g = (s1 + R*state['T0']*sum2) *x_tot_g         # kJ/kmol
+
+                    ## Also get the chemical exergy for liquid water
+                    e_ch_l = e_ch_0(comp0['H2O(l)'],name_ch)*comp0['H2O(l)'].state['x']
+
+                    # Store total chemical exergy
+                    e_ch.append(e_ch_g + e_ch_l)
+            else:
+                # No water present, calculate chemical exergy from composition
+
+                sum1 = [0.0]*len(models)
+                sum2 = 0.0
+                for key,sub in comp.items():
+                    if not sub.state['x'] == 0.0:
+                        sum1 = [s1 + ( e_ch_0(sub,name_ch)*sub.state['x'] ) for s1,name_ch in zip(sum1,names_ch)]
+                        sum2 = sum2 + ( sub.state['x']*log(sub.state['x']) )
+
+                e_ch = [s1 + R*state['T0']*sum2 for s1 in sum1]    # [kJ/kmol]
+
+            e_ch = tuple(e_ch)
+
+            if not cache is None:
+                cache.put(cache_key,(state['e_ph'],e_ch))
+
+        state['e_ch'] = e_ch[0]
+
+        ## Convert exergy units [kJ/kmol] => [kJ/kg]
+        state['e_ph_kg'] = state['e_ph'] /state['MW']          # [kJ/kg]
+        state['e_ch_kg'] = state['e_ch'] /state['MW']          # [kJ/kg]
+
+        ## Get absolute exergies [MW]
+        state['E_ph'] = state['e_ph_kg'] *state['mdot']/1e3    # [MW]
+        state['E_ch'] = state['e_ch_kg'] *state['mdot']/1e3    # [MW]
+
+        ## TOTAL EXERGY
+
+        # Specific
+        state['e_tot_kg'] = state['e_ph_kg'] + state['e_ch_kg']   # [KJ/kg]
+
+        # Absolute
+        state['E_tot'] = state['E_ph'] + state['E_ch']            # [MW]
+
+        E_tot_check = state['e_tot_kg'] * state['mdot'] /1e3      # [MW]
+
+        ebs = 1e-5
+        if not abs(state['E_tot']-E_tot_check) < ebs:
+            err = '''
+Stream {}: Warning: total exergy calculations do not match!
+                  E_ph + E_ch != e_tot_kg * mdot
+                  {:10.3f} + {:10.3f} != {:10.3f} * {:10.3f}
+'''.format(idstr,state['E_ph'],state['E_ch'],state['e_tot_kg'],state['mdot']/1e3)
+
+            #sys.exit(err)
+            print(err)
+
+        ## Exergies of each model under qualified keys (same units as above)
+        if not isinstance(exergy_type,str):
+            for model,val in zip(models,e_ch):
+                e_ch_kg = val /state['MW']
+                E_ch    = e_ch_kg *state['mdot']/1e3
+                state[model_key('e_ch',model)]     = val
+                state[model_key('e_ch_kg',model)]  = e_ch_kg
+                state[model_key('E_ch',model)]     = E_ch
+                state[model_key('e_tot_kg',model)] = state['e_ph_kg'] + e_ch_kg
+                state[model_key('E_tot',model)]    = state['E_ph'] + E_ch
+
+        # Update the stream's state object
+        self.state = state
+
+        return
+
+    def jacobian(self,exergy_type=None):
+        '''
+        Analytic derivatives of the exergies E_ph, E_ch and E_tot [MW] with
+        respect to T, p, mdot and the molar fraction of each substance of the
+        stream, see StreamBatch.jacobian (by default for the exergy type of
+        the stream, or "Ahrends"):
+
+            jac = stream.jacobian()
+            jac['E_tot']['T']       # dE_tot/dT [MW/K]
+        '''
+
+        if exergy_type is None: exergy_type = self._exergy_type
+        if exergy_type is None: exergy_type = "Ahrends"
+        if not isinstance(exergy_type,str): exergy_type = exergy_type[0]
+
+        jac = StreamBatch.from_streams([self]).jacobian(exergy_type)
+
+        return OrderedDict((key,OrderedDict((var,float(val[0])) for var,val in out.items()))
+                           for key,out in jac.items())
+
+    def isentropic(self,p,eta=1.0):
+        '''
+        Outlet stream after an adiabatic change of pressure to p [bar] with
+        the isentropic efficiency eta, see StreamBatch.isentropic (the same
+        id, mdot, composition and dead state), eg, a turbine:
+
+            out = stream.isentropic(1.05,eta=0.88)
+        '''
+
+        out = StreamBatch.from_streams([self]).isentropic(p,eta)
+
+        return stream(self.id,float(out.state['T'][0]),float(out.state['p'][0]),self.mdot,self.composition,
+                      phase=out.state['phase'][0].tolist(),T0=self.T0,p0=self.p0,exergy_type=self._exergy_type,
+                      refs=self.refs,properties=self.properties,eos=self.eos,backend=self.backend)
+
+    def mix(self,streams,p=None,id=None):
+        '''
+        Outlet stream of an adiabatic mixer of this stream and streams
+        (a list), at p (default: the lowest inlet pressure), with the
+        id of this stream unless id is given, see StreamBatch.mix:
+
+            out = st1.mix([st2,st3])
+        '''
+
+        inlets = [self] + list(streams)
+        out    = StreamBatch.from_streams(inlets).mix(zeros(len(inlets),dtype=intp),p=p)
+
+        # All substances of the inlets (in their order), with the fractions of the outlet
+        x = out._x_in.row(0)
+        names = OrderedDict.fromkeys(name for st in inlets for name,xi in st.composition)
+
+        return stream(self.id if id is None else id,float(out.state['T'][0]),float(out.state['p'][0]),
+                      float(out.state['mdot'][0]),[(name,x.get(name,0.0)) for name in names],
+                      phase=out.state['phase'][0].tolist(),T0=self.T0,p0=self.p0,exergy_type=self._exergy_type,
+                      refs=self.refs,properties=self.properties,eos=self.eos,backend=self.backend)
+
+    def split(self,fractions,ids=None):
+        '''
+        Split the stream into streams with the fractions of its mass flow
+        rate (they must sum to 1) and its state and composition, with the
+        id of this stream unless ids are given. Returns a list of streams.
+        '''
+
+        if ids is None: ids = [self.id]*len(fractions)
+        if abs(sum(fractions)-1.0) > 1e-9 or any(asarray(fractions) < 0.0):
+            sys.exit("Stream {}: Error: split fractions must be positive and sum to 1.".format(self.idstr))
+
+        return [stream(id,self.T,self.p,self.mdot*f,self.composition,phase=self.phase,T0=self.T0,p0=self.p0,
+                       exergy_type=self._exergy_type,refs=self.refs,properties=self.properties,eos=self.eos,
+                       backend=self.backend)
+                for id,f in zip(ids,fractions)]
+
+    def calc_exergy_gatex(self,fldr=None,gatex_exec="../gatex_pc_if97_mj.exe",keep=False):
+        '''
+        Use this subroutine to calculate exergy of the stream
+        using GATEX.
+
+        == INPUT ==
+        stream  : stream object
+        fldr    : folder for the temporary directory where gatex runs
+                  (default: the system temporary directory), see run_gatex
+        keep    : keep the temporary directory with the input and output data
+
+        == OUTPUT ==
+        state variables obtained from exergy calculations using GATEX:
+        state['H','S','E_ph','E_ch','E_tot']
+
+        To run many streams at once, see calc_exergy_gatex (module function).
+        '''
+
+        state = self.state
+
+        print("Calling GATEX: stream {}, T = {:6.1f}, P = {:6.3f}".format(self.idstr,state['T'],state['p']))
+
+        # Run gatex in a directory of its own and cross fingers !!!
+        E = run_gatex([self.gatex_job()],gatex_exec,workers=1,fldr=fldr,keep=keep)[0]
+
+        if E is None:
+            print("Stream {}: Warning: GATEX failed, exergies not updated.".format(self.idstr))
+        else:
+            self.store_gatex(E)
+
+        return
+
+    def gatex_job(self):
+        '''The GATEX input files of the stream (see gatex_files).'''
+
+        state = self.state
+
+        return gatex_files(self.stream_to_gatex(),t0=state['T0']-273.15,p0=state['p0'],kelvin=0)
+
+    def store_gatex(self,E):
+        '''Store the exergy table of GATEX (see read_gatex_exergies) in the stream.'''
+
+        ## Store the output values back in our stream object
+        ## (columns mdot, T, p, H, S, EPH, ECH, E)
+        self.state['H']     = E[0,3]
+        self.state['S']     = E[0,4]
+        self.state['E_ph']  = E[0,5]
+        self.state['E_ch']  = E[0,6]
+        self.state['E_tot'] = E[0,7]
+
+        return
+
+    def stream_to_gatex(self):
+        '''Translate a stream object into an array readable by GATEX [1,19] (columns GATEX_HEADER).'''
+
+        # Get local variable for current stream
+        stream = self
+
+        # Make the output array and headings we want for each column
+        # Note: here the heading 'x' stands for vfrac:vapor fraction; 'SE' stands for entropy
+        header = array(GATEX_HEADER)
+
+        try:
+            id = float(stream.id)
+        except (TypeError,ValueError):
+            id = 1000.0
+            print("Stream {}: Warning: generated number for "\
+                  "stream number to send to GATEX: {}".format(stream.idstr,id))
+
+        data    = zeros((1,len(header)))
+        data[0,0] = id
+        data[0,1] = stream.state['mdot']
+        data[0,2] = stream.state['T'] - 273.15
+        data[0,3] = stream.state['p']
+        data[0,4] = stream.state['phase'][0]    # vfrac is called 'x' in this table!
+        data[0,5] = stream.state['s']           # Gatex doesn't actually use this apparently!
+
+        # Now loop over substances in header
+        # and insert the molar fraction into the table as necessary
+        substances = stream.comp.keys()
+        ioffset = 6
+        for i,head in enumerate(header[ioffset:]):
+            if head in substances:
+                data[0,ioffset+i] = stream.comp[head].state['x']
+
+        ## Eliminate nan's from the table, GATEX cannot read them
+        data[isnan(data)] = 0.0
+
+        return data
+
+    def stream_to_gatex_files(self,fldr="./"):
+        '''Write the GATEX input files of the stream (gate.inp,flows.prn,composition.prn) to fldr.'''
+
+        for name,text in self.gatex_job().items():
+            with open(os.path.join(fldr,name),'w') as f: f.write(text)
+
+        return
+
+    def __repr__(self):
+
+        text = "Stream: {}".format(self.id)
+
+        for key,value in self.state.items():
+            if key == "phase":
+                text = text + "\n {:<12} = {:>5.2n},{:>5.2n},{:>5.2n}".format(key,float(value[0]),float(value[1]),float(value[2]))
+            else:
+                text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+
+        return text
+
+    def __str__(self):
+        '''Output the stream object to the screen in a human readable way.'''
+
+        text = "Stream: {}".format(self.id)
+
+        for key,value in self.state.items():
+            if key == "phase":
+                text = text + "\n {:<12} = {:>5.2n},{:>5.2n},{:>5.2n}".format(key,float(value[0]),float(value[1]),float(value[2]))
+            else:
+                text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+
+        # text = text +  "\n====== reference values ======"
+        # for key,value in self.ref.items():
+        #     text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+
+        return text
+
+
+### SPARSE COMPOSITIONS ###
+### Substance names are interned into integer IDs (see substance_id),
+### the compositions of many streams are stored as sparse (CSR) rows
+
+_substance_ids   = OrderedDict()      # name => ID
+_substance_names = []                 # ID => name
+
+def substance_id(names):
+    '''Return the interned ID of a substance name (or an array of IDs for a list of names).'''
+
+    if isinstance(names,str):
+        sid = _substance_ids.get(names)
+        if sid is None:
+            sid = len(_substance_names)
+            _substance_ids[names] = sid
+            _substance_names.append(names)
+        return sid
+
+    return asarray([substance_id(nm) for nm in names],dtype=intp)
+
+def substance_name(ids):
+    '''Return the name of an interned substance ID (or a list of names for an array of IDs).'''
+
+    if isinstance(ids,(int,integer)): return _substance_names[ids]
+
+    return [_substance_names[sid] for sid in ids]
+
+class Composition:
+    '''
+    Molar fractions of N streams, stored as sparse (CSR) rows:
+
+      indptr  : [N+1] the entries of stream i are indptr[i]:indptr[i+1]
+      indices : [nnz] substance IDs of the entries (see substance_id)
+      data    : [nnz] molar fractions of the entries
+      rows    : [nnz] stream of each entry
+
+    Only the nonzero fractions are stored, except for water (see keep).
+    names are all substances of the streams, in the order of the
+    columns of a simulation file (also those with x = 0 in all streams).
+    '''
+
+    # Substances that are always stored (also with x = 0), since the
+    # water of a stream is split into gas and liquid (see condense_water)
+    keep = ('H2O','H2O(l)')
+
+    def __init__(self,indptr,indices,data,names):
+
+        self.indptr  = asarray(indptr,dtype=intp)
+        self.indices = asarray(indices,dtype=intp)
+        self.data    = asarray(data,dtype=float64)
+        self.names   = list(names)
+        self.rows    = repeat(arange(len(self.indptr)-1),diff(self.indptr))
+
+        return
+
+    @classmethod
+    def from_dense(cls,x,names):
+        '''Generate the sparse rows of a dense array of molar fractions x [N,S].'''
+
+        names = list(names)
+        x     = asarray(x,dtype=float64).reshape(-1,len(names))
+
+        stored = logical_or(x != 0.0,asarray([nm in cls.keep for nm in names],dtype=bool)[newaxis,:])
+        i,k    = nonzero(stored)
+
+        indptr = concatenate([[0],cumsum(count_nonzero(stored,axis=1))])
+
+        return cls(indptr,substance_id(names)[k],x[i,k],names)
+
+    @classmethod
+    def from_rows(cls,rows,names=None):
+        '''
+        Generate the sparse rows of the compositions of N streams,
+        each a list of (name,x) as for stream. By default, names are
+        all substances of the compositions.
+        '''
+
+        if names is None:
+            names = list(OrderedDict.fromkeys(name for comp in rows for name,x in comp))
 
-                # Copy enthalpy and entropy from the IAPWS IF97 steam tables for non-saturated streams
-                # h_T_str  = ( (cp_T_el - cp_T0_el) * (T_str-T0) ) + h_T0_el        # here el: H2O
-                # s_Tp_str = ( (cp_T_el - cp_T0_el) * ln(T_str/T0) + s_Tp0_el
-                pass
+        indptr  = [0]
+        indices = []
+        data    = []
+        for comp in rows:
+            for name,x in comp:
+                if not x == 0.0 or name in cls.keep:
+                    indices.append(name)
+                    data.append(x)
+            indptr.append(len(data))
 
-            # For now, set values to zero, since we can't calculate anything
-            state['h']   = 0.0
-            state['s']   = 0.0
-            state['h_0'] = 0.0
-            state['s_0'] = 0.0
-        ####
+        return cls(indptr,substance_id(indices),data,names)
 
-        # Make an additional output of H in MW and S in MW/K
-        # H: kJ/kmol => MW; S: kJ/kmol/K => kW/K
-        # H = h * mdot / ( (MW*1e-3) *1e6 )
-        # S = s * mdot / ( (MW*1e-3) *1e3 )
-        if not state['MW'] == 0.0:
-            state['H'] = state['h']  * state['mdot'] / ((state['MW']*1e-3)*1e6)
-            state['S'] = state['s']  * state['mdot'] / ((state['MW']*1e-3)*1e3)
+    def __len__(self):
+        return len(self.indptr)-1
 
-        # Update stream information with locally defined values
-        self.id    = id
-        self.idstr = idstr
-        self.isH2O = isH2O
-        self.state = state
-        self.comp  = comp
-        self.comp0 = comp0
+    @property
+    def nnz(self):
+        return len(self.data)
 
-        if not exergy_type is None:
-            # Finally, calculate exergy if desired
+    def copy(self):
+        return Composition(self.indptr,self.indices.copy(),self.data.copy(),self.names)
 
-            if exergy_type == "gatex":
-                GATEX_EXE_FILE = pkg_resources.resource_filename('streams', 'gatex_pc_if97_mj.exe')
-                #print(GATEX_EXE_FILE)
-                #sys.exit()
-                self.calc_exergy_gatex(gatex_exec=GATEX_EXE_FILE)
-            elif exergy_type in ["Ahrends","Sahrgut"]:
-                self.calc_exergy(exergy_type)
-            else:
-                print("Stream {}: exergy_type not recognized: {}.".format(self.idstr,exergy_type))
+    def rowsum(self,values,mask=None):
+        '''Return the sum of values [nnz] of the entries of each stream (optionally only for mask [nnz]).'''
 
+        if mask is None: return bincount(self.rows,weights=values,minlength=len(self))
 
-        return
+        return bincount(self.rows[mask],weights=values[mask],minlength=len(self))
 
-    def calc_exergy(self,exergy_type="Ahrends"):
+    def column(self,name):
+        '''Return the molar fraction of a substance in each stream [N] (0 if not stored).'''
+
+        x   = zeros(len(self))
+        pos = self.indices == substance_id(name)
+        x[self.rows[pos]] = self.data[pos]
+
+        return x
+
+    def with_column(self,name,x,overwrite=False):
         '''
-        Calculation of exergies given the state of
-        a stream.
+        Return a composition with an entry for the substance name in every stream:
+        streams without one get x at the end of their row (as stream does),
+        if overwrite=True the existing entries are also set to x.
         '''
 
-        # Define some constants
-        R = 8.314       # kJ/kmol-K, ideal gas constant
+        sid = substance_id(name)
+        pos = self.indices == sid
 
-        # Get idstr
-        idstr = self.idstr
+        has = zeros(len(self),dtype=bool)
+        has[self.rows[pos]] = True
 
-        # Decide which chemical exergy value to use (Ahrends or Szargut)
-        if exergy_type.lower() == "ahrends":
-            name_ch = 'e_ch_0a'
-        elif exergy_type.lower() == "szargut":
-            name_ch = 'e_ch_0b'
-        else:
-            err = '''
-Stream {}: Error: Incorrect exergy type given: {}
-                    Only "ahrends" or "szargut" are allowed.
-'''.format(idstr,exergy_type)
-            sys.exit(err)
+        data = self.data.copy()
+        if overwrite: data[pos] = x
 
+        names = self.names if name in self.names else self.names + [name]
 
-        # Open variables locally
-        state = self.state
-        comp  = self.comp
-        comp0 = self.comp0
+        if all(has): return Composition(self.indptr,self.indices.copy(),data,names)
 
-        ## PHYSICAL EXERGY
-        # Physical specific exergy of stream  ###
-        state['e_ph']    = ( state['h']-state['h_0']
-                           - state['T0']*(state['s']-state['s_0']) )    # kJ/kmol
+        # Shift the entries of each row to make space at the end of the rows
+        add    = logical_not(has)
+        indptr = concatenate([[0],cumsum(diff(self.indptr) + add)])
+        newpos = arange(self.nnz) + (indptr[:-1] - self.indptr[:-1])[self.rows]
+        endpos = indptr[1:][add] - 1
 
-        # Limit e_ph to postive values and/or give warnings
-        if state['e_ph'] < -5.0:
-            print("Stream {}: Warning: negative physical exergy.".format(self.id))
-        elif state['e_ph'] < 0.0:
-            state['e_ph'] = 0.0
+        indices = empty(indptr[-1],dtype=intp)
+        values  = empty(indptr[-1])
+        indices[newpos] = self.indices
+        values[newpos]  = data
+        indices[endpos] = sid
+        values[endpos]  = x
 
+        return Composition(indptr,indices,values,names)
 
-        ## CHEMICAL EXERGY
-        # Chemical specific exergy of stream ###
+    def row(self,i):
+        '''Return the stored molar fractions of stream i as an OrderedDict.'''
 
-        # If liquid water is present, e_ch must be calculated in two steps.
-        # 1. Adjust the molar fractions to eliminate liquid water (so only gas phase is left)
-        # 2. e_ch = e_ch_gas*x_tot_gas + e_ch_h2o(l)*x_tot_h2o(l)
+        k0,k1 = self.indptr[i],self.indptr[i+1]
 
-        # Check for liquid water (at 25 C)
-        if not self.isH2O and 'H2O(l)' in comp0.keys() \
-                   and comp0['H2O(l)'].state['x'] > 0.0:
+        return OrderedDict(zip(substance_name(self.indices[k0:k1]),self.data[k0:k1].tolist()))
 
-            # Make a temporary copy of the composition at 25 C
-            comptmp = deepcopy(comp0)
+    def take(self,rows):
+        '''Return the composition of the streams rows (indices or a mask [N]).'''
 
-            # Adjust molar fractions for liquid and gas calcs seperately
+        rows = arange(len(self))[rows]
+        n    = self.indptr[rows+1] - self.indptr[rows]
 
-            # Get total molar fraction x_tot (should be 1, unless substances missing)
-            x_tot = 0.0
-            for key,sub in comp.items(): x_tot = x_tot + sub.state['x']
+        indptr = concatenate([[0],cumsum(n)])
+        pos    = repeat(self.indptr[rows] - indptr[:-1],n) + arange(indptr[-1])
 
-            # Determine the liquid and gas content
-            x_tot_l = comptmp['H2O(l)'].state['x']
-            x_tot_g = x_tot - x_tot_l
+        return Composition(indptr,self.indices[pos],self.data[pos],self.names)
 
-            # Get the scaling factor for the gases
-            xfac = x_tot / x_tot_g
+    @classmethod
+    def concat(cls,compositions):
+        '''Generate the composition of the streams of several compositions (all their names).'''
 
-            ## Scale the x value and calculate the chemical exergy for gas
-            x_tot_tmp = 0.0
-            sum1 = 0.0
-            sum2 = 0.0
-            for key,sub in comptmp.items():
-                if not key == "H2O(l)" and not sub.state['x'] == 0.0:
-                    sub.state['x'] = sub.state['x']*xfac
-                    x_tot_tmp = x_tot_tmp + sub.state['x']
+        names  = list(OrderedDict.fromkeys(name for x in compositions for name in x.names))
+        offset = cumsum([0] + [x.nnz for x in compositions])
+        indptr = concatenate([[0]] + [x.indptr[1:] + k for x,k in zip(compositions,offset)])
 
-                    sum1 = sum1 + ( sub.ref[name_ch]*sub.state['x'] )
-                    sum2 = sum2 + ( sub.state['x']*log(sub.state['x']) )
+        return cls(indptr,concatenate([x.indices for x in compositions]),
+                   concatenate([x.data for x in compositions]),names)
 
-                    #print("x {:12}: {}".format(key,sub.state['x']))
+    def dense(self,names=None):
+        '''Return the molar fractions as a dense array [N,S] (by default of all names).'''
 
-            e_ch_g = (sum1 + R*state['T0']*sum2) *x_tot_g           # kJ/kmol
+        if names is None: names = self.names
 
-            # print("x_tot     {}".format(x_tot))
-            # print("x_tot_g   {}".format(x_tot_g))
-            # print("x_tot_l   {}".format(x_tot_l))
-            # print("x_tot_tmp {}".format(x_tot_tmp))
+        col = full(len(_substance_names)+1,-1,dtype=intp)
+        col[substance_id(names)] = arange(len(names))
+        k   = col[self.indices]
 
-            # But now make sure that the temporary x_tot_tmp is the same as the original!
-            if abs(x_tot-x_tot_tmp) > 1e-3:
-                print("Stream {}: Error: x_tot_tmp not correct: {} != {}".format(idstr,x_tot_tmp,x_tot))
-                sys.exit()
+        x = zeros([len(self),len(names)])
+        x[self.rows[k >= 0],k[k >= 0]] = self.data[k >= 0]
 
-            ## Also get the chemical exergy for liquid water
-            e_ch_l = comptmp['H2O(l)'].ref[name_ch]*comptmp['H2O(l)'].state['x']
+        return x
 
-            # Store total chemical exergy
-            state['e_ch'] = e_ch_g + e_ch_l
-        else:
-            # No water present, calculate chemical exergy from composition
+    def __repr__(self):
+        return "Composition({} streams, {} substances, {} entries)".format(len(self),len(self.names),self.nnz)
 
-            sum1 = 0.0
-            sum2 = 0.0
-            for key,sub in comp.items():
-                if not sub.state['x'] == 0.0:
-                    sum1 = sum1 + ( sub.ref[name_ch]*sub.state['x'] )
-                    sum2 = sum2 + ( sub.state['x']*log(sub.state['x']) )
+### STREAM BATCHES ###
 
-            state['e_ch']    = sum1 + R*state['T0']*sum2           # [kJ/kmol]
+def batch_properties(x,x0,jj,T,p,T0,p0,phase,backends,ib,refs):
+    '''
+    Properties of n streams with the molar fractions x and x0 (Compositions
+    with the same entries, the rows of the reference table of the entries
+    are jj [nnz]) at T, p [n] and at the dead state (T0,p0), from the
+    backends[ib] of the streams (see select_backends). Returns h, s and cp
+    of the entries [nnz], h, s, cp (of the ideal mixture), h_0 and s_0 of
+    the streams [n] and the warnings of the backends (message,mask [n],backend).
+    '''
 
+    n    = len(x)
+    used = unique(ib)
+
+    ## Properties of the substances of each entry [nnz]
+    ## and their standard values (of the backend of the stream)
+    h_k  = empty(x.nnz)
+    s_k  = empty(x.nnz)
+    cp_k = empty(x.nnz)
+    h0_k = empty(x.nnz)
+    s0_k = empty(x.nnz)
+    for b in used:
+        e = (ib == b)[x.rows]
+        h_k[e],s_k[e],cp_k[e] = backends[b].ideal(jj[e],x.indices[e],T[x.rows[e]],p[x.rows[e]],refs)
+        h0,s0 = backends[b].reference(refs)
+        h0_k[e] = h0[jj[e]]
+        s0_k[e] = s0[jj[e]]
+
+    ## Enthalpy and entropy of the ideal mixtures
+    h   = x.rowsum( h_k*x.data )
+    s   = x.rowsum( s_k*x.data )
+    cp  = x.rowsum( cp_k*x.data )
+    h_0 = x0.rowsum( h0_k*x0.data )
+    s_0 = x0.rowsum( s0_k*x0.data )
+
+    ## Corrections of each backend: real-gas departures of the gas,
+    ## IF97 for water streams, ... (see Backend.calc)
+    warnings = []
+    for b in used:
+        if not backends[b].corrects(): continue
+        g = flatnonzero(ib == b)
+        h[g],s[g],h_0[g],s_0[g],warn = backends[b].calc(x.take(g),x0.take(g),T[g],p[g],T0,p0,phase[g],
+                                                        h[g],s[g],h_0[g],s_0[g])
+        for msg,mask in warn:
+            full_mask = zeros(n,dtype=bool)
+            full_mask[g] = mask
+            warnings.append((msg,full_mask,backends[b]))
+
+    return h_k, s_k, cp_k, h, s, cp, h_0, s_0, warnings
+
+def unique_states(T,p,phase,x,*columns):
+    '''
+    Find the streams with the same intensive state: bit-identical T, p,
+    phase [N,3], entries of the composition x (the same substances in the
+    same order, with the same fractions) and values of any other columns
+    [N] (eg, the backend of each stream). Returns the first stream of each
+    unique state [U] and the unique state of each stream [N].
+    '''
 
-        ## Convert exergy units [kJ/kmol] => [kJ/kg]
-        state['e_ph_kg'] = state['e_ph'] /state['MW']          # [kJ/kg]
-        state['e_ch_kg'] = state['e_ch'] /state['MW']          # [kJ/kg]
+    N = len(x)
 
-        ## Get absolute exergies [MW]
-        state['E_ph'] = state['e_ph_kg'] *state['mdot']/1e3    # [MW]
-        state['E_ch'] = state['e_ch_kg'] *state['mdot']/1e3    # [MW]
+    # Each stream as one row of bytes: its state and its entries (padded)
+    n     = diff(x.indptr)
+    width = int(n.max()) if N > 0 else 0
+    slot  = arange(x.nnz) - x.indptr[x.rows]
+    ids   = full([N,width],-1,dtype=int64)
+    xs    = zeros([N,width])
+    ids[x.rows,slot] = x.indices
+    xs[x.rows,slot]  = x.data
 
-        ## TOTAL EXERGY
+    key = column_stack([asarray(T,dtype=float64).view(int64),asarray(p,dtype=float64).view(int64),
+                        ascontiguousarray(phase,dtype=float64).view(int64)]
+                       + [asarray(col,dtype=float64).view(int64) for col in columns]
+                       + [ids,xs.view(int64)])
+    key = ascontiguousarray(key).view(dtype((void,key.dtype.itemsize*key.shape[1]))).ravel()
 
-        # Specific
-        state['e_tot_kg'] = state['e_ph_kg'] + state['e_ch_kg']   # [KJ/kg]
+    keys,first,inv = unique(key,return_index=True,return_inverse=True)
 
-        # Absolute
-        state['E_tot'] = state['E_ph'] + state['E_ch']            # [MW]
+    return first, inv.ravel()
 
-        E_tot_check = state['e_tot_kg'] * state['mdot'] /1e3      # [MW]
+class StreamBatch:
+    '''
+    Columnar version of the stream class: the states of N streams with
+    the same substances are stored as arrays and all quantities of
+    stream.state are calculated with array operations, eg:
+
+        batch = StreamBatch(ids,T,p,mdot,names=['N2','O2','CO2','H2O'],x=x)
+        batch.calc_exergy("Ahrends")
+        batch.state['E_tot']        # [N] total exergy of each stream [MW]
+
+    The results are the same as those of the stream class, stream by stream
+    (the same rules are applied to the substances and the water split).
+    A batch can also be loaded directly from a simulation file, see
+    simulation.load_excel(...,batch=True) and simulation.load_aspen(...,batch=True).
+    '''
 
-        ebs = 1e-5
-        if not abs(state['E_tot']-E_tot_check) < ebs:
+    def __init__(self,ids,T,p,mdot,names,x,phase=None,T0=298.15,p0=1.013,refs=None,
+                 properties="shomate",eos=None,backend=None,hack=None,dedup=False):
+        '''
+        Initialize a batch of streams
+          ids   = list of stream numbers/names [N]
+          T, p, mdot = stream temperature, pressure and mass flow rate [N]
+          names = substance names [S] (can be None if x is a Composition)
+          x     = molar fractions of the substances in each stream [N,S],
+                  or a Composition (sparse rows, see Composition)
+          phase = [VFRAC,LFRAC,SFRAC] of each stream [N,3]
+          T0, p0, refs, properties, eos, backend: as for stream (the same for all
+                  streams, the rules of backend select the backend of each stream)
+          hack  = mask of the streams [N] whose H2O is set to 1 (streams without
+                  N2 and CH4, see stream), by default all streams if names
+                  contain neither N2 nor CH4
+          dedup = if True, the properties of streams with the same intensive state
+                  (T, p, phase, composition) are calculated only once, the
+                  number of unique states is kept in n_unique (see dedup_ratio)
+
+        The compositions are stored as sparse rows (self.x, self.x0), and the
+        properties of the substances only for the stored entries (self.sub).
+        '''
+
+        # Define some constants
+        R = 8.314       # kJ/kmol-K, ideal gas constant
+
+        ids   = list(ids)
+        N     = len(ids)
+        if not isinstance(x,Composition): x = Composition.from_dense(x,names)
+        names = list(x.names)
+
+        T    = broadcast_to(asarray(T,dtype=float64),(N,)).copy()
+        p    = broadcast_to(asarray(p,dtype=float64),(N,)).copy()
+        mdot = broadcast_to(asarray(mdot,dtype=float64),(N,)).copy()
+        if phase is None: phase = [1.0,0.0,0.0]
+        phase = broadcast_to(asarray(phase,dtype=float64),(N,3)).copy()
+
+        # Make sure x is valid
+        bad = logical_or(x.data < 0,x.data > 1)
+        if any(bad):
+            k = flatnonzero(bad)[0]
             err = '''
-Stream {}: Warning: total exergy calculations do not match!
-                  E_ph + E_ch != e_tot_kg * mdot
-                  {:10.3f} + {:10.3f} != {:10.3f} * {:10.3f}
-'''.format(idstr,state['E_ph'],state['E_ch'],state['e_tot_kg'],state['mdot']/1e3)
+Stream {:4}: {:11}: Error: molar fraction x must be between 0 and 1!
+'''.format(ids[x.rows[k]],substance_name(x.indices[k]))
+            sys.exit(err)
 
-            #sys.exit(err)
-            print(err)
+        # Get reference substance values for the dead state (T0,p0)
+        if refs is None: refs = get_reference()
+        refs = refs.dead_state(T0,p0)
+
+        # Substances without reference values are treated as 'unknown'
+        for nm in names:
+            n = count_nonzero(logical_and(x.indices == substance_id(nm),x.data > 0))
+            if not nm in refs and n > 0:
+                print("StreamBatch: Warning: no reference values found for substance {}, " \
+                      "treated as unknown in {} streams.".format(nm,n))
+
+        # Row of the reference table of each substance ID
+        def table_rows(x):
+            jj = zeros(len(_substance_names),dtype=intp)
+            jj[substance_id(x.names)] = refs.index(x.names)
+            return jj[x.indices]
+
+        ## MW of the streams and the total molar fraction
+        ## (sums over the stored entries only)
+        x_in = x
+        MW   = x.rowsum( refs.column('MW')[table_rows(x)]*x.data )
+        xtot = x.rowsum( x.data )
+
+        ## Hack from Matlab: if the streams contain neither N2 or CH4, then set
+        ## total weight fraction to water (only in the streams of hack, if given)
+        if hack is None: hack = (not 'N2' in names) and (not 'CH4' in names)
+        hack = broadcast_to(asarray(hack,dtype=bool),(N,)).copy()
+        if all(hack):
+            x = x.with_column('H2O',1.0,overwrite=True)
+        elif any(hack):
+            x = x.with_column('H2O',0.0)
+            x.data[logical_and(x.indices == substance_id('H2O'),hack[x.rows])] = 1.0
 
-        # Update the stream's state object
+        ## Handling water ##
+        ## Make sure that if there is H2O(l), there is also H2O(g) and vice-versa
+        if 'H2O' in x.names or 'H2O(l)' in x.names:
+            x = x.with_column('H2O',0.0).with_column('H2O(l)',0.0)
+
+        names = x.names
+        jj    = table_rows(x)
+
+        ## Determine which streams are H2O streams
+        if 'H2O' in names:
+            x_g   = x.column('H2O')
+            x_l   = x.column('H2O(l)')
+            isH2O = (x_g + x_l == 1.0)
+        else:
+            isH2O = zeros(N,dtype=bool)
+
+        ## Molar fractions at the standard state (T0,p0),
+        ## with the water split into gas and liquid as in stream
+        x0 = x.copy()
+        if 'H2O(l)' in names:
+            x_new_g,x_new_l = condense_water(x_g,x_l,xtot,p,refs.psat0)
+            kg = x.indices == substance_id('H2O')
+            kl = x.indices == substance_id('H2O(l)')
+            x0.data[kg] = x_new_g[x.rows[kg]]
+            x0.data[kl] = x_new_l[x.rows[kl]]
+
+        ## Select the property backend of each stream (see select_backends),
+        ## the streams of each backend are calculated at once
+        backends,ib = select_backends(backend_rules(backend),get_backend(properties,eos),T,p,mdot,isH2O)
+
+        ## Properties of the substances of each entry [nnz] and of the mixtures,
+        ## with dedup=True only once for each intensive state (see unique_states)
+        ## and then copied to the streams with that state
+        u,inv = unique_states(T,p,phase,x,ib,xtot) if dedup else (None,None)
+        if dedup and len(u) < N:
+            xu  = x.take(u)
+            # Entries of the unique states in x, and of each entry of x in xu
+            # (the streams of a state have the same entries, see unique_states)
+            n_u  = diff(xu.indptr)
+            pos  = repeat(x.indptr[u] - xu.indptr[:-1],n_u) + arange(xu.nnz)
+            back = xu.indptr[inv][x.rows] + arange(x.nnz) - x.indptr[x.rows]
+            h_k,s_k,cp_k,h,s,cp,h_0,s_0,warnings = batch_properties(xu,x0.take(u),jj[pos],T[u],p[u],T0,p0,
+                                                                    phase[u],backends,ib[u],refs)
+            h_k,s_k,cp_k = h_k[back],s_k[back],cp_k[back]
+            h,s,h_0,s_0  = h[inv],s[inv],h_0[inv],s_0[inv]
+            warnings     = [(msg,mask[inv],bk) for msg,mask,bk in warnings]
+        else:
+            h_k,s_k,cp_k,h,s,cp,h_0,s_0,warnings = batch_properties(x,x0,jj,T,p,T0,p0,phase,backends,ib,refs)
+
+        for msg,mask,bk in warnings:
+            n = count_nonzero(mask)
+            if n > 0:
+                print("StreamBatch: Warning: {} ({} streams, backend {}).".format(msg,n,bk.name))
+
+        state = OrderedDict(T=T,p=p,mdot=mdot,T0=full(N,float(T0)),p0=full(N,float(p0)),phase=phase)
+        state['MW']  = MW
+        state['h']   = h
+        state['h_0'] = h_0
+        state['s']   = s
+        state['s_0'] = s_0
+
+        # Additional output of H in MW and S in MW/K (NaN if MW = 0)
+        with errstate(divide='ignore',invalid='ignore'):
+            state['H'] = where(MW == 0.0,nan,h * mdot / ((MW*1e-3)*1e6))
+            state['S'] = where(MW == 0.0,nan,s * mdot / ((MW*1e-3)*1e3))
+
+        self.ids   = ids
+        self.names = names
+        self.x     = x
+        self.x0    = x0
+        self._x_in = x_in
+        self._hack = hack
+        self.xtot  = xtot
+        self.isH2O = isH2O
         self.state = state
+        self.sub   = OrderedDict(h=h_k,s=s_k,cp=cp_k)
+        self.refs  = refs
+        self.properties = properties
+        self.eos   = eos
+        self.backend  = backend
+        self.backends = backends
+        self._ib   = ib
+        self._jj   = jj
+        self.n_unique = len(u) if dedup else None
 
         return
 
-    def calc_exergy_gatex(self,fldr="./",gatex_exec="../gatex_pc_if97_mj.exe"):
+    @classmethod
+    def from_streams(cls,streams,dedup=False):
         '''
-        Use this subroutine to calculate exergy of the stream
-        using GATEX.
+        Generate a batch from stream objects (with the same dead state),
+        the substances of the batch are all substances of the streams,
+        eg, of several simulations (see dedup of __init__):
 
-        == INPUT ==
-        stream  : stream object
-        fldr    : folder containing gatex program and
-                  where input and output data are stored
-                  (for now must be the current working directory, since gatex.exe looks there)
+            batch = StreamBatch.from_streams(list(sim1.streams.values()) + list(sim2.streams.values()),dedup=True)
+        '''
 
-        == OUTPUT ==
-        state variables obtained from exergy calculations using GATEX:
-        state['H','S','E_ph','E_ch','E_tot']
+        streams = list(streams)
+
+        # The compositions as given, the batch adds water as each stream does
+        x    = Composition.from_rows([st.composition for st in streams])
+        hack = [all([not name in ['N2','CH4'] for name,xi in st.composition]) for st in streams]
+
+        T0 = streams[0].state['T0']
+        p0 = streams[0].state['p0']
+        if any([not (st.state['T0'] == T0 and st.state['p0'] == p0) for st in streams]):
+            sys.exit("StreamBatch: Error: all streams must have the same dead state (T0,p0).")
+        if any([not st.eos == streams[0].eos for st in streams]):
+            sys.exit("StreamBatch: Error: all streams must have the same equation of state (eos).")
+        if any([not st.backend == streams[0].backend for st in streams]):
+            sys.exit("StreamBatch: Error: all streams must have the same backend rules (backend).")
+
+        return cls([st.id for st in streams],
+                   [st.state['T'] for st in streams],
+                   [st.state['p'] for st in streams],
+                   [st.state['mdot'] for st in streams],
+                   None,x,phase=[st.state['phase'] for st in streams],
+                   T0=T0,p0=p0,refs=streams[0].refs,properties=streams[0].properties,eos=streams[0].eos,
+                   backend=streams[0].backend,hack=hack,dedup=dedup)
+
+    @classmethod
+    def concat(cls,batches,dedup=False):
+        '''
+        Generate one batch of the streams of several batches (with the same
+        dead state, properties, eos and backend rules), eg, of a series of
+        cases loaded with simulation.load_excel(...,batch=True) (see dedup of __init__).
         '''
 
-        # Define stream state variables locally
-        state = self.state
+        batches = list(batches)
+        first   = batches[0]
+        for b in batches:
+            if not (b.state['T0'][0] == first.state['T0'][0] and b.state['p0'][0] == first.state['p0'][0]):
+                sys.exit("StreamBatch: Error: all batches must have the same dead state (T0,p0).")
+            if not (b.properties == first.properties and b.eos == first.eos and b.backend == first.backend):
+                sys.exit("StreamBatch: Error: all batches must have the same properties, eos and backend rules.")
+
+        return cls([i for b in batches for i in b.ids],
+                   concatenate([b.state['T'] for b in batches]),
+                   concatenate([b.state['p'] for b in batches]),
+                   concatenate([b.state['mdot'] for b in batches]),
+                   None,Composition.concat([b._x_in for b in batches]),
+                   phase=concatenate([b.state['phase'] for b in batches]),
+                   T0=first.state['T0'][0],p0=first.state['p0'][0],refs=first.refs,properties=first.properties,
+                   eos=first.eos,backend=first.backend,hack=concatenate([b._hack for b in batches]),dedup=dedup)
 
-        # Save stream information to gatex input files (gate.inp,flows.prn,composition.prn)
-        self.stream_to_gatex_files()
+    def calc_exergy(self,exergy_type="Ahrends"):
+        '''
+        Calculation of exergies of all streams,
+        see stream.calc_exergy (same exergy types,
+        including lists of models).
+        '''
 
-        # Now call gatex #######################################################
-        print("Calling GATEX: stream {:d}, T = {:6.1f}, P = {:6.3f}".format(self.id,state['T'],state['p']))
+        # Define some constants
+        R = 8.314       # kJ/kmol-K, ideal gas constant
 
-        # Determine whether to use wine or not
-        # (If on linux or mac, use wine)
-        try:
-            uname = os.uname()    # Operating system info
-            call_prefix = ""
-            if ( uname[0] in ["Darwin"] ): call_prefix = "wine "
-        except:
-            call_prefix = ""
-
-        ## Now call gatex and cross fingers !!!
-        os.system((call_prefix+gatex_exec))
-        #os.system((call_prefix+GATEX_EXE_FILE)
-
-        # If it worked, load the exergies
-        with open('exergies.m', 'rb') as f:
-            contents = f.readlines()[37:]
-
-            new = []
-            for line in contents:
-                a = unicode(line,"utf-8").strip().replace("\n","").replace("\r","").replace("*************","NaN").split()
-                if not a[0] == "];": new.append(a)
-                #print(a)
-            E = asarray(new,dtype=float)
+        # Decide which chemical exergy values to use
+        models   = exergy_models(exergy_type)
+        names_ch = [exergy_column(self.refs,model) for model in models]
+        for model,name_ch in zip(models,names_ch):
+            if name_ch is None:
+                err = '''
+StreamBatch: Error: Incorrect exergy type given: {}
+                    Only "ahrends", "szargut" or a column of the reference table are allowed.
+'''.format(model)
+                sys.exit(err)
+
+        # Standard chemical exergies of the entries [model,nnz]
+        e_k = []
+        for name_ch in names_ch:
+            refs = self.refs if name_ch in self.refs.fields else self.refs.base
+            e_k.append(refs.column(name_ch)[refs.index(self.refs.names)][self._jj])
 
-        # Add a first column that contains the stream number
-        E = insert(E,0,self.id,axis=1)
+        state = self.state
+        x     = self.x
+        x0    = self.x0
+        T0    = state['T0']
 
-        # # Also add an empty first row, so that the indices
-        # # match fontina's old code!
-        # E = insert(E,0,E[0,:]*0.0,axis=0)
+        ## PHYSICAL EXERGY
+        e_ph = ( state['h']-state['h_0']
+               - T0*(state['s']-state['s_0']) )                 # kJ/kmol
 
-        # print('Checking GATEX output:')
-        # set_printoptions(precision=3,linewidth=150)
-        # print("Exergy table =")
-        # print("Columns: stream num., mdot [kg/s], T [K], p[bar], H [MW], S [kW/K], EPH [MW], ECH [MW], E [MW]")
-        # print(E)
-        #---------------------------------------------------------------------##
+        # Limit e_ph to postive values and/or give warnings
+        neg = count_nonzero(e_ph < -5.0)
+        if neg > 0:
+            print("StreamBatch: Warning: negative physical exergy in {} streams.".format(neg))
+        e_ph = where(logical_and(e_ph >= -5.0,e_ph < 0.0),0.0,e_ph)
+
+        ## CHEMICAL EXERGY (for each model, sums over the nonzero entries only)
+        with errstate(divide='ignore',invalid='ignore'):
+
+            # Streams without liquid water at the standard state
+            nz   = x.data != 0.0
+            e_ch = [x.rowsum(e*x.data,nz) + R*T0*x.rowsum(x.data*log(x.data),nz) for e in e_k]  # [kJ/kmol]
+
+            # Streams with liquid water at the standard state:
+            # e_ch = e_ch_gas*x_tot_gas + e_ch_h2o(l)*x_tot_h2o(l)
+            if 'H2O(l)' in self.names:
+                kl  = x0.indices == substance_id('H2O(l)')
+                wet = logical_and(logical_not(self.isH2O),x0.column('H2O(l)') > 0.0)
+
+                x_tot   = x.rowsum(x.data)
+                x_tot_l = x0.column('H2O(l)')
+                x_tot_g = x_tot - x_tot_l
+                xfac    = x_tot / x_tot_g
+
+                nz   = logical_and(x0.data != 0.0,logical_not(kl))
+                xk   = x0.data*xfac[x0.rows]
+                x_tot_tmp = x0.rowsum(xk,nz)
+                sum2 = x0.rowsum(xk*log(xk),nz)
+
+                if any(abs(x_tot-x_tot_tmp)[wet] > 1e-3):
+                    sys.exit("StreamBatch: Error: x_tot_tmp not correct.")
+
+                for m,e in enumerate(e_k):
+                    e_l     = e[kl][0] if any(kl) else nan
+                    e_ch_g  = (x0.rowsum(e*xk,nz) + R*T0*sum2) *x_tot_g  # kJ/kmol
+                    e_ch_l  = e_l*x_tot_l
+                    e_ch[m] = where(wet,e_ch_g + e_ch_l,e_ch[m])
+
+        state['e_ph'] = e_ph
+        state['e_ch'] = e_ch[0]
 
-        ## Store the output values back in our stream object
-        self.state['H']     = E[0,4]
-        self.state['S']     = E[0,5]
-        self.state['E_ph']  = E[0,6]
-        self.state['E_ch']  = E[0,7]
-        self.state['E_tot'] = E[0,8]
+        ## Convert exergy units [kJ/kmol] => [kJ/kg]
+        with errstate(divide='ignore',invalid='ignore'):
+            state['e_ph_kg'] = state['e_ph'] /state['MW']          # [kJ/kg]
+            state['e_ch_kg'] = state['e_ch'] /state['MW']          # [kJ/kg]
 
-        # Done
+        ## Get absolute exergies [MW]
+        state['E_ph'] = state['e_ph_kg'] *state['mdot']/1e3    # [MW]
+        state['E_ch'] = state['e_ch_kg'] *state['mdot']/1e3    # [MW]
+
+        ## TOTAL EXERGY
+        state['e_tot_kg'] = state['e_ph_kg'] + state['e_ch_kg']   # [KJ/kg]
+        state['E_tot']    = state['E_ph'] + state['E_ch']         # [MW]
+
+        ## Exergies of each model under qualified keys (see MODEL_KEYS)
+        for key in [key for key in state if is_model_key(key)]: del state[key]
+
+        if not isinstance(exergy_type,str):
+            for model,val in zip(models,e_ch):
+                with errstate(divide='ignore',invalid='ignore'):
+                    e_ch_kg = val /state['MW']
+                E_ch = e_ch_kg *state['mdot']/1e3
+                state[model_key('e_ch',model)]     = val
+                state[model_key('e_ch_kg',model)]  = e_ch_kg
+                state[model_key('E_ch',model)]     = E_ch
+                state[model_key('e_tot_kg',model)] = state['e_ph_kg'] + e_ch_kg
+                state[model_key('E_tot',model)]    = state['E_ph'] + E_ch
 
         return
 
-    def stream_to_gatex_files(self):
-        '''Translate a stream object into an array readable by GATEX.'''
+    def jacobian(self,exergy_type="Ahrends"):
+        '''
+        Analytic derivatives of the exergies E_ph, E_ch and E_tot [MW] of all
+        streams with respect to T [K], p [bar], mdot and the molar fraction
+        of each substance of the batch (the other fractions are kept, they
+        are not normalized), eg:
+
+            jac = batch.jacobian("Ahrends")
+            jac['E_tot']['T']       # [N] dE_tot/dT [MW/K]
+            jac['E_ch']['CO2']      # [N] dE_ch/dx_CO2 [MW]
+
+        The derivatives of the ideal mixtures (see Backend.ideal_derivatives),
+        of the water split at the dead state and of the mixing terms x*log(x)
+        are exact, so are the real-gas departures along T and p; along the
+        fractions the departures are central differences at a fixed density
+        and IF97 values are central differences along T and p (see
+        Backend.derivative). The backend and the kind of each stream (water
+        stream or not, condensing at the dead state or not) are kept fixed.
+        x*log(x) has no derivative at x = 0: dE_ch/dx of absent substances is -inf.
+        The exergies are also calculated (see calc_exergy).
+        '''
 
-        ## CODE below to output in format for GATEX!!
-        ## ajr: need to modify this so that we generate it from the streams object, not the data table.
+        # Define some constants
+        R = 8.314       # kJ/kmol-K, ideal gas constant
 
-        # Get local variable for current stream
-        stream = self
-        state  = stream.state
+        # Relative steps of the central differences of the corrections
+        step = 1e-5
 
-        # Make the output array and headings we want for each column
-        # Note: here the heading 'x' stands for vfrac:vapor fraction; 'SE' stands for entropy
-        header = array(["STREAM","mdot","T","p","x","SE","Ar","CO2","CO","COS","H2O","XX","CH4","H2","H2S","N2","O2","SO2","H"])
+        self.calc_exergy(exergy_type)
+        model   = exergy_models(exergy_type)[0]
+        name_ch = exergy_column(self.refs,model)
 
-        try:
-            id = float(stream.id)
-        except:
-            id = 1000+randint(1)
-            print("Stream {}: Warning: generated random number for "\
-                  "stream number to send to GATEX: {}".format(key,id))
-
-        data    = zeros(len(header))
-        data[0] = id
-        data[1] = stream.state['mdot']
-        data[2] = stream.state['T'] - 273.15
-        data[3] = stream.state['p']
-        data[4] = stream.state['phase'][0]    # vfrac is called 'x' in this table!
-        data[5] = stream.state['s']           # Gatex doesn't actually use this apparently!
+        state = self.state
+        refs  = self.refs
+        names = self.names
+        N,S   = len(self),len(names)
+        T,p,mdot,T0,p0,MW = [state[key] for key in ['T','p','mdot','T0','p0','MW']]
+
+        X  = self.x.dense()
+        X0 = self.x0.dense()
+
+        # Reference values of the substances [S]
+        jj   = refs.index(names)
+        MW_j = refs.column('MW')[jj]
+        rch  = refs if name_ch in refs.fields else refs.base
+        e_j  = rch.column(name_ch)[rch.index(refs.names)][jj]
+
+        ## Properties of all substances in all streams [N,S] (from the backend of each stream)
+        h_j,s_j,dhdT,dsdT,dsdp,h0_j,s0_j = [zeros([N,S]) for k in range(7)]
+        for b in unique(self._ib):
+            bk = self.backends[b]
+            g  = self._ib == b
+            n  = count_nonzero(g)
+            jg = tile(jj,n)
+            ig = tile(substance_id(names),n)
+            Tg = repeat(T[g],S)
+            pg = repeat(p[g],S)
+            h,s,cp = bk.ideal(jg,ig,Tg,pg,refs)
+            dh,ds,dsp = bk.ideal_derivatives(jg,ig,Tg,pg,refs)
+            h0,s0 = bk.reference(refs)
+            h_j[g],s_j[g]   = h.reshape(n,S),s.reshape(n,S)
+            dhdT[g],dsdT[g],dsdp[g] = dh.reshape(n,S),ds.reshape(n,S),dsp.reshape(n,S)
+            h0_j[g],s0_j[g] = h0[jj],s0[jj]
+
+        ## Derivatives of the fractions of the batch with respect to the inputs [N,S]:
+        ## H2O is fixed to 1 in streams without N2 and CH4 (see __init__)
+        dX = ones([N,S])
+        if 'H2O' in names:
+            dX[self._hack,names.index('H2O')] = 0.0
+
+        water = asarray([nm in ['H2O','H2O(l)'] for nm in names],dtype=bool)[newaxis,:]
+        dXw   = where(water,dX,0.0)             # d(x_H2O + x_H2O(l))/dx
+        dX0   = where(water,0.0,dX)             # dx0/dx of the other substances
+
+        ## Water split at the dead state (see condense_water): derivatives
+        ## of x0_H2O and x0_H2O(l) with respect to the fractions [N,S] and p [N]
+        dg   = zeros([N,S])
+        dl   = zeros([N,S])
+        dgdp = zeros(N)
+        if 'H2O(l)' in names:
+            ig,il = names.index('H2O'),names.index('H2O(l)')
+            xw    = X[:,ig] + X[:,il]
+            xdry  = self.xtot - xw
+            with errstate(divide='ignore',invalid='ignore'):
+                y    = refs.psat0 / p
+                c    = y / (1.0-y)
+                wet  = logical_and(y < 1.0,y*xdry/(1.0-y) < xw)
+                dg   = where(wet[:,newaxis],c[:,newaxis]*(1.0-dXw),dXw)
+                dl   = dXw - dg
+                dgdp = where(wet,-xdry*y/p/(1.0-y)**2,0.0)
+
+        def water_terms(v_j,d_g,d_l):
+            # Derivatives of the water of x0 times the values v_j [N,S]
+            if not 'H2O(l)' in names: return zeros(d_g.shape)
+            if d_g.ndim == 2: return v_j[:,ig][:,newaxis]*d_g + v_j[:,il][:,newaxis]*d_l
+            return v_j[:,ig]*d_g + v_j[:,il]*d_l
+
+        def rowsum(v_j,x):
+            # Sum over the substances of each stream (only those with x != 0, as the batch)
+            return sum(where(x == 0.0,0.0,v_j*x),axis=1)
+
+        ## Ideal mixtures: derivatives of h, s, h_0 and s_0 for each variable
+        ## T, p [N] and the fractions [N,S]
+        dvals = OrderedDict()
+        dvals['T'] = [rowsum(dhdT,X),rowsum(dsdT,X),zeros(N),zeros(N)]
+        dvals['p'] = [zeros(N),rowsum(dsdp,X),water_terms(h0_j,dgdp,-dgdp),water_terms(s0_j,dgdp,-dgdp)]
+        with errstate(invalid='ignore'):
+            dvals['x'] = [h_j*dX,s_j*dX,
+                          where(dX0 == 0.0,0.0,h0_j*dX0) + water_terms(h0_j,dg,dl),
+                          where(dX0 == 0.0,0.0,s0_j*dX0) + water_terms(s0_j,dg,dl)]
+
+        ## Corrections of the backends, along all variables at once (see Backend.derivative)
+        vals = [state['h'],state['s'],state['h_0'],state['s_0']]
+        for b in unique(self._ib):
+            bk = self.backends[b]
+            if not bk.corrects(): continue
+            g  = flatnonzero(self._ib == b)
+            n  = len(g)
+
+            directions = []
+            for var in ['T','p']:
+                dx0 = zeros([n,S])
+                if var == 'p' and 'H2O(l)' in names:
+                    dx0[:,ig],dx0[:,il] = dgdp[g],-dgdp[g]
+                directions.append((zeros([n,S]),dx0,float(var == 'T'),float(var == 'p'),
+                                   [dval[g] for dval in dvals[var]],step*state[var][g]))
+            for j in range(S):
+                dx  = zeros([n,S])
+                dx0 = zeros([n,S])
+                dx[:,j]  = dX[g,j]
+                dx0[:,j] = dX0[g,j]
+                if 'H2O(l)' in names:
+                    dx0[:,ig],dx0[:,il] = dg[g,j],dl[g,j]
+                directions.append((dx,dx0,0.0,0.0,[dval[g,j] for dval in dvals['x']],full(n,step)))
+
+            res = bk.derivative(self.x.take(g),self.x0.take(g),T[g],p[g],T0[0],p0[0],state['phase'][g],
+                                [val[g] for val in vals],directions)
+
+            for var,dv in zip(['T','p'],res[:2]):
+                for dval,d in zip(dvals[var],dv): dval[g] = d
+            for j,dv in enumerate(res[2:]):
+                for dval,d in zip(dvals['x'],dv): dval[g,j] = d
+
+        ## Physical exergy (zero where e_ph is limited to zero, see calc_exergy)
+        e_ph  = state['h']-state['h_0'] - T0*(state['s']-state['s_0'])
+        fixed = logical_and(e_ph >= -5.0,e_ph < 0.0)
+        de_ph = OrderedDict()
+        for var in ['T','p','x']:
+            dh,ds,dh0,ds0 = dvals[var]
+            T0v = T0 if var in ['T','p'] else T0[:,newaxis]
+            de  = dh - dh0 - T0v*(ds - ds0)
+            de_ph[var] = where(fixed if var in ['T','p'] else fixed[:,newaxis],0.0,de)
+
+        ## Chemical exergy: e_ch = sum(e_j*x) + R*T0*sum(x*log(x)) over the nonzero
+        ## fractions, or for streams with liquid water at the dead state
+        ## e_ch = X*A + R*T0*X*(L + S0*log(X/G)) + e_l*x0_l, with the sums over the gas
+        ## A = sum(e_j*x0), L = sum(x0*log(x0)), S0 = sum(x0), X = sum(x), G = X - x0_l
+        de_ch = OrderedDict(T=zeros(N),p=zeros(N))
+        with errstate(divide='ignore',invalid='ignore'):
+            RT0 = R*T0[:,newaxis]
+            de_ch['x'] = where(dX == 0.0,0.0,(e_j + RT0*(log(X) + 1.0))*dX)
+
+            if 'H2O(l)' in names:
+                wet = logical_and(logical_not(self.isH2O),X0[:,il] > 0.0)
+
+                gas  = logical_and(X0 != 0.0,logical_not(arange(S) == il)[newaxis,:])
+                Xt   = sum(X,axis=1)
+                G    = Xt - X0[:,il]
+                A    = sum(where(gas,e_j*X0,0.0),axis=1)
+                L    = sum(where(gas,X0*log(X0),0.0),axis=1)
+                S0   = sum(where(gas,X0,0.0),axis=1)
+                lXG  = log(Xt/G)
+                lg   = log(X0[:,ig]) + 1.0
+                e_l  = e_j[il]
+                e_g  = e_j[ig]
+
+                def dwet(dXt,dx0,dgv,dlv,lx0,e0):
+                    # Derivative of e_ch of the wet streams (see above)
+                    dA  = where(dx0 == 0.0,0.0,e0*dx0) + where(dgv == 0.0,0.0,e_g*dgv)
+                    dL  = where(dx0 == 0.0,0.0,lx0*dx0) + where(dgv == 0.0,0.0,lg*dgv)
+                    dS0 = dx0 + dgv
+                    dG  = dXt - dlv
+                    return ( dXt*(A + R*T0*(L + S0*lXG))
+                           + Xt*(dA + R*T0*(dL + dS0*lXG + S0*(dXt/Xt - dG/G))) + e_l*dlv )
+
+                de_ch['p'] = where(wet,dwet(0.0,0.0,dgdp,-dgdp,0.0,0.0),0.0)
+
+                cols = [dwet(dX[:,j],dX0[:,j],dg[:,j],dl[:,j],log(X0[:,j]) + 1.0,e_j[j]) for j in range(S)]
+                de_ch['x'] = where(wet[:,newaxis],array(cols).T,de_ch['x'])
+
+        ## Absolute exergies [MW]: E = e * mdot / (MW*1e3)
+        jac = OrderedDict()
+        for key,e,de in [('E_ph',state['e_ph'],de_ph),('E_ch',state['e_ch'],de_ch)]:
+            with errstate(divide='ignore',invalid='ignore'):
+                f   = mdot / (MW*1e3)
+                out = OrderedDict()
+                out['T']    = f*de['T']
+                out['p']    = f*de['p']
+                out['mdot'] = e / (MW*1e3)
+                dx = f[:,newaxis]*(de['x'] - (e/MW)[:,newaxis]*MW_j[newaxis,:])
+            for j,nm in enumerate(names): out[nm] = dx[:,j]
+            jac[key] = out
+
+        jac['E_tot'] = OrderedDict((var,jac['E_ph'][var] + jac['E_ch'][var]) for var in jac['E_ph'])
+
+        return jac
+
+    def _mixture(self,T,p,phase,rows):
+        '''
+        Molar enthalpy h [kJ/kmol], entropy s [kJ/kmol-K] and heat capacity cp
+        [kJ/kmol-K] of the streams rows [n] with their compositions at T, p [n]
+        and phase [n,3]: the ideal mixture with the corrections of the backends
+        that the rules select at (T,p). cp is that of the ideal mixture, the
+        mask of streams without corrections (where cp = dh/dT) is also returned.
+        '''
 
-        # Now loop over substances in header
-        # and insert the molar fraction into the table as necessary
-        substances = stream.comp.keys()
-        ioffset = 6
-        for i,head in enumerate(header[ioffset:]):
-            if head in substances:
-                data[ioffset+i] = stream.comp[head].state['x']
+        x = self.x.take(rows)
 
-        ## Eliminate nan's from the table, GATEX cannot read them
-        data[isnan(data)] = 0.0
+        jt = zeros(len(_substance_names),dtype=intp)
+        jt[substance_id(x.names)] = self.refs.index(x.names)
 
-        # print('======================')
-        # print("Generating GATEX input files")
+        backends,ib = select_backends(backend_rules(self.backend),get_backend(self.properties,self.eos),
+                                      T,p,self.state['mdot'][rows],self.isH2O[rows])
 
-        # Folder to save gatex files, hard coded to be the current directory,
-        # since gatex will be called from here.
-        fldr = "./"
+        h_k,s_k,cp_k,h,s,cp,h_0,s_0,warnings = batch_properties(x,self.x0.take(rows),jt[x.indices],T,p,
+                                                                self.state['T0'][0],self.state['p0'][0],
+                                                                phase,backends,ib,self.refs)
 
-        # Define important gatex filenames
-        gatex_f1 = os.path.join(fldr,"gate.inp")
-        gatex_f2 = os.path.join(fldr,"flows.prn")
-        gatex_f3 = os.path.join(fldr,"composition.prn")
+        exact = logical_not(asarray([bk.corrects() for bk in backends],dtype=bool)[ib])
 
-        # To help figure things out, create a header
-        # that shows the variable of each column
-        head = array(["STREAM","mdot","T","p","x","SE","Ar","CO2","CO","COS","H2O","XX","CH4","H2","H2S","N2","O2","SO2","H"])
+        return h, s, cp, exact
 
-        # How many streams and variables are we working with?
-        n_streams = 1
-        n_var     = len(head)
+    def solve_T(self,h=None,s=None,p=None,T=None,tol=1e-9,maxiter=50):
+        '''
+        Temperatures [K] at which the streams reach the molar enthalpy h
+        [kJ/kmol] or the molar entropy s [kJ/kmol-K] (give one of them, [N])
+        at the pressures p [bar] (default: the pressures of the streams),
+        with their compositions, eg, the isentropic end states at p_out:
+
+            T_s,phase,ok = batch.solve_T(s=batch.state['s'],p=p_out)
+
+        Newton's method on all streams in lockstep, starting at T (default:
+        the temperatures of the streams), with the heat capacity of the ideal
+        mixture as derivative (dh/dT = cp, ds/dT = cp/T). Streams with backend
+        corrections (real gas, IF97) use secants after the first step. Each
+        stream drops out of the iterations once |dT| <= tol*T; steps that
+        leave the bracket of the solution known so far (h and s increase
+        with T) are replaced by bisection. (The real-gas equations make no
+        phase checks, see aga8: in the two-phase region of a mixture h and
+        s need not increase with T, and the solution need not be unique.)
+
+        Water streams with IF97 whose h or s lies between saturated liquid
+        and vapor at p get T = Tsat(p) and the phase [q,1-q,0] of the
+        two-phase mixture, other water streams get the phase of liquid or
+        vapor, all other streams keep their phase.
+        Returns T [N], phase [N,3] and the mask of converged streams [N].
+        '''
 
-        ### Create the gate.inp file with the reference values #################
-        text = '''
+        if (h is None) == (s is None):
+            sys.exit("StreamBatch: Error: give either h or s to solve for T.")
+
+        N = len(self.ids)
+        target = broadcast_to(asarray(h if s is None else s,dtype=float64),(N,)).copy()
+        p = self.state['p'] if p is None else broadcast_to(asarray(p,dtype=float64),(N,)).copy()
+        T = self.state['T'].copy() if T is None else broadcast_to(asarray(T,dtype=float64),(N,)).copy()
+        k = 0 if s is None else 1
+
+        phase = self.state['phase'].copy()
+        done  = zeros(N,dtype=bool)
+        lo    = zeros(N)
+        hi    = full(N,inf)
+
+        ## Water streams: single phase states during the iterations,
+        ## the solution is on the saturation line if the target lies
+        ## between saturated liquid and vapor (see if97.calc)
+        w = flatnonzero(self.isH2O)
+        if len(w) > 0:
+            phase[w] = [-1.0,-1.0,0.0]
+            Ts = if97.Tsat(p[w])
+            v  = flatnonzero(isfinite(Ts))
+            if len(v) > 0:
+                wv  = w[v]
+                v_l = self._mixture(Ts[v],p[wv],tile([0.0,1.0,0.0],(len(v),1)),wv)[k]
+                v_v = self._mixture(Ts[v],p[wv],tile([1.0,0.0,0.0],(len(v),1)),wv)[k]
+                with errstate(invalid='ignore'):
+                    gap = v_v > v_l
+                    sat = logical_and(gap,logical_and(target[wv] >= v_l,target[wv] <= v_v))
+                    q   = (target[wv]-v_l)/(v_v-v_l)
+                T[wv[sat]]     = Ts[v][sat]
+                phase[wv[sat]] = column_stack([q[sat],1.0-q[sat],zeros(count_nonzero(sat))])
+                done[wv[sat]]  = True
+                up = logical_and(gap,target[wv] > v_v)
+                dn = logical_and(gap,target[wv] < v_l)
+                lo[wv[up]] = Ts[v][up]
+                hi[wv[dn]] = Ts[v][dn]
+                T[wv] = where(logical_and(up,T[wv] <= Ts[v]),Ts[v]+1.0,where(logical_and(dn,T[wv] >= Ts[v]),Ts[v]-1.0,T[wv]))
+
+        ## Newton iterations of the streams that are not done
+        fail  = zeros(N,dtype=bool)
+        Tprev = full(N,nan)
+        rprev = full(N,nan)
+        act   = flatnonzero(logical_not(done))
+        for it in range(maxiter):
+            if len(act) == 0: break
+
+            Ta = T[act]
+            vals = self._mixture(Ta,p[act],phase[act],act)
+            r     = vals[k] - target[act]
+            slope = vals[2] if s is None else vals[2]/Ta
+
+            # Secants of the streams with corrections
+            with errstate(divide='ignore',invalid='ignore'):
+                sec = (r-rprev[act])/(Ta-Tprev[act])
+            use = logical_and(logical_not(vals[3]),logical_and(isfinite(sec),sec > 0.0))
+            slope = where(use,sec,slope)
+
+            # Bracket of the solution
+            lo[act] = where(r < 0.0,maximum(lo[act],Ta),lo[act])
+            hi[act] = where(r > 0.0,minimum(hi[act],Ta),hi[act])
+
+            with errstate(divide='ignore',invalid='ignore'):
+                Tn = Ta - r/slope
+            out = logical_not(logical_and(Tn > lo[act],Tn < hi[act]))
+            Tn  = where(out,where(isfinite(hi[act]),0.5*(lo[act]+hi[act]),2.0*Ta),Tn)
+
+            bad  = logical_not(isfinite(r))
+            conv = logical_or(r == 0.0,abs(Tn-Ta) <= tol*Ta)
+
+            Tprev[act] = Ta
+            rprev[act] = r
+            T[act]     = where(bad,Ta,where(r == 0.0,Ta,Tn))
+            fail[act[bad]] = True
+            act = act[logical_not(logical_or(conv,bad))]
+
+        ok = logical_not(fail)
+        ok[act] = False
+        if count_nonzero(logical_not(ok)) > 0:
+            print("StreamBatch: Warning: T did not converge in {} streams.".format(count_nonzero(logical_not(ok))))
+
+        ## Phase of the water streams that are not on the saturation line
+        if len(w) > 0:
+            single = w[logical_not(done[w])]
+            Ts     = if97.Tsat(p[single])
+            vap    = T[single] > where(isnan(Ts),if97.TC,Ts)
+            phase[single] = where(vap[:,newaxis],[1.0,0.0,0.0],[0.0,1.0,0.0])
+
+        return T, phase, ok
+
+    def isentropic(self,p,eta=1.0,tol=1e-9,maxiter=50):
+        '''
+        Outlet states of the streams after an adiabatic change of pressure
+        to p [bar] with the isentropic efficiency eta [N] (from the isentropic
+        end states h_s, see solve_T):
 
-    [system]
+            expansion   (p < inlet p):  h_out = h - eta*(h - h_s)
+            compression (p > inlet p):  h_out = h + (h_s - h)/eta
 
-    t0 = {t0:10.3f} ;
-    p0 = {p0:10.3f} ;
-    number = {ns:6d}. ;
-    ndiff = {nd:6d}. ;
-    kelvin = {K:4d}. ;
+        Returns a StreamBatch of the outlet streams (the same ids, mass
+        flow rates, compositions and backend rules, at T_out and p).
+        '''
 
-    '''.format(t0=state['T0']-273.15,p0=state['p0'],ns=n_streams,nd=n_streams,K=0)
-        # print(text)
+        N   = len(self.ids)
+        p   = broadcast_to(asarray(p,dtype=float64),(N,)).copy()
+        eta = broadcast_to(asarray(eta,dtype=float64),(N,))
 
-        #ref = open(gatex_f1,'w',buffering=0)
-        ref = open(gatex_f1,'w')
-        ref.write(text)
-        ref.close()
-        #print(gatex_f1 + " is closed? " + str(ref.closed))
-        #print("Wrote file for GATEX: " + gatex_f1)
+        h = self.state['h']
+        T_s,phase_s,ok = self.solve_T(s=self.state['s'],p=p,tol=tol,maxiter=maxiter)
+        h_s = self._mixture(T_s,p,phase_s,arange(N))[0]
 
-        #----------------------------------------------------------------------#
+        h_out = where(p < self.state['p'],h - eta*(h-h_s),h + (h_s-h)/eta)
+        T_out,phase_out,ok = self.solve_T(h=h_out,p=p,T=T_s,tol=tol,maxiter=maxiter)
 
-        # For gatex to read the file correctly, the
-        # stream number should appear twice. Here we duplicate
-        # the first column (which is the stream number)
-        data2 = insert(data,1,data[0])
-        head2 = insert(head,1,head[0])
+        return StreamBatch(self.ids,T_out,p,self.state['mdot'],None,self._x_in,phase=phase_out,
+                           T0=self.state['T0'][0],p0=self.state['p0'][0],refs=self.refs,
+                           properties=self.properties,eos=self.eos,backend=self.backend,hack=self._hack,
+                           dedup=not self.n_unique is None)
 
-        #---------------------------------------------------------------------##
+    def mix(self,mixer,p=None,ids=None,tol=1e-9,maxiter=50):
+        '''
+        Adiabatic mixers: stream i flows into mixer[i] (0 ... M-1), each
+        mixer has one outlet stream with the balances
 
-        ## Create files for saving the different data parts ####################
-
-        # Extract flow data from the stream array (with duplicate stream number!)
-        # Then flatten to one vector and output to the flows.prn file
-        flow_names = array(["STREAM","mdot","T","p","x"])
-        inds = in1d(head2,flow_names)
-        flows = data2[inds]
-        flows = flows.flatten()
-        savetxt(gatex_f2,flows,fmt="%10.4f")
-        flows2 = loadtxt(gatex_f2)    # To ensure file is written (Windows hack!)!
-        #print("Wrote file for GATEX: " + gatex_f2)
-
-        # Now extract element composition data (with duplicate stream number!)
-        # Then flatten to one vector and output to the composition.prn file
-        element_names = array(["STREAM","Ar","CO2","CO","COS","H2O","CH4","H2","H2S","N2","O2","SO2"])
-        inds = in1d(head2,element_names)
-        elements = data2[inds]
-        elements = elements.flatten()
-        savetxt(gatex_f3,elements,fmt="%10.4f")
-        elements2 = loadtxt(gatex_f3)    # To ensure file is written (Windows hack!)!
-        #print("Wrote file for GATEX: " + gatex_f3)
+            mdot_out = sum(mdot)                        mass
+            n_out*x_out = sum(n*x),   n = mdot/MW       substances
+            n_out*h_out = sum(n*h)                      energy
 
-        #---------------------------------------------------------------------##
+        at the pressure p [M] (default: the lowest inlet pressure of each
+        mixer). T_out is solved from h_out (see solve_T). Many mixers are
+        solved at once, eg, the same mixer in all cases of a study:
 
-        # Done! All three gatex input files have been written with stream information
+            out = inlets.mix(case)          # out.state['T'] [M]
 
-        return
+        Returns a StreamBatch of the outlets (ids [M], default 0 ... M-1).
+        '''
 
-    def __repr__(self):
+        mixer = asarray(mixer,dtype=intp)
+        M     = int(mixer.max())+1 if len(mixer) > 0 else 0
+        if ids is None: ids = list(range(M))
 
-        text = "Stream: {}".format(self.id)
+        empty = flatnonzero(bincount(mixer,minlength=M) == 0)
+        if len(empty) > 0:
+            sys.exit("StreamBatch: Error: mixers without inlets: {}".format(empty.tolist()))
 
-        for key,value in self.state.items():
-            if key == "phase":
-                text = text + "\n {:<12} = {:>5.2n},{:>5.2n},{:>5.2n}".format(key,float(value[0]),float(value[1]),float(value[2]))
-            else:
-                text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+        state = self.state
+        x     = self._x_in
+        with errstate(divide='ignore',invalid='ignore'):
+            n = where(state['MW'] > 0.0,state['mdot']/state['MW'],0.0)
+            n_out    = bincount(mixer,weights=n,minlength=M)
+            mdot_out = bincount(mixer,weights=state['mdot'],minlength=M)
+            h_out    = bincount(mixer,weights=n*state['h'],minlength=M) / n_out
+            T_guess  = bincount(mixer,weights=n*state['T'],minlength=M) / n_out
+            phase    = column_stack([bincount(mixer,weights=n*state['phase'][:,k],minlength=M)
+                                     for k in range(3)]) / n_out[:,newaxis]
+
+        if p is None:
+            p = full(M,inf)
+            minimum.at(p,mixer,state['p'])
+        p = broadcast_to(asarray(p,dtype=float64),(M,)).copy()
+
+        ## Molar flows of the substances of each mixer (the entries of
+        ## the outlets, sorted by substance ID)
+        L        = len(_substance_names)
+        key      = mixer[x.rows]*L + x.indices
+        uk,inv   = unique(key,return_inverse=True)
+        flows    = bincount(inv,weights=n[x.rows]*x.data)
+        og,sid   = uk // L, uk % L
+        stored   = logical_or(flows != 0.0,isin(sid,substance_id(list(Composition.keep))))
+        indptr   = concatenate([[0],cumsum(bincount(og[stored],minlength=M))])
+        with errstate(divide='ignore',invalid='ignore'):
+            x_out = Composition(indptr,sid[stored],flows[stored]/n_out[og[stored]],x.names)
+
+        # The outlets of inlets without N2 and CH4 only are treated as those (see __init__)
+        hack = bincount(mixer,weights=logical_not(self._hack),minlength=M) == 0
+
+        args = dict(T0=state['T0'][0],p0=state['p0'][0],refs=self.refs,properties=self.properties,
+                    eos=self.eos,backend=self.backend,hack=hack,dedup=not self.n_unique is None)
+
+        out = StreamBatch(ids,T_guess,p,mdot_out,None,x_out,phase=phase,**args)
+        T,phase,ok = out.solve_T(h=h_out,T=T_guess,tol=tol,maxiter=maxiter)
+
+        return StreamBatch(ids,T,p,mdot_out,None,x_out,phase=phase,**args)
+
+    def split(self,fractions,ids=None):
+        '''
+        Splitters: each stream is split into K outlet streams with the
+        fractions [N,K] (or [K], the same for all streams) of its mass flow
+        rate, which must sum to 1. The outlets have the state and the
+        composition of their inlet. Returns a list of K StreamBatches
+        (outlet k of each stream), with the ids of the streams or ids [K][N].
+        '''
 
-        return text
+        N = len(self.ids)
+        fractions = asarray(fractions,dtype=float64)
+        fractions = broadcast_to(fractions,(N,fractions.shape[-1]))
+        if any(abs(sum(fractions,axis=1)-1.0) > 1e-9) or any(fractions < 0.0):
+            sys.exit("StreamBatch: Error: split fractions must be positive and sum to 1.")
+        K = fractions.shape[1]
+        if ids is None: ids = [self.ids]*K
 
-    def __str__(self):
-        '''Output the stream object to the screen in a human readable way.'''
+        state = self.state
+        return [StreamBatch(ids[k],state['T'],state['p'],state['mdot']*fractions[:,k],None,self._x_in,
+                            phase=state['phase'],T0=state['T0'][0],p0=state['p0'][0],refs=self.refs,
+                            properties=self.properties,eos=self.eos,backend=self.backend,hack=self._hack,
+                            dedup=not self.n_unique is None)
+                for k in range(K)]
+
+    def row(self,i):
+        '''Return the state of stream i as an OrderedDict (as in stream.state).'''
+
+        out = OrderedDict()
+        for key,val in self.state.items():
+            if key == 'phase':
+                out[key] = val[i].tolist()
+            elif not key in ['H','S'] or not self.state['MW'][i] == 0.0:
+                out[key] = float(val[i])
 
-        text = "Stream: {}".format(self.id)
+        return out
 
-        for key,value in self.state.items():
-            if key == "phase":
-                text = text + "\n {:<12} = {:>5.2n},{:>5.2n},{:>5.2n}".format(key,float(value[0]),float(value[1]),float(value[2]))
-            else:
-                text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+    @property
+    def dedup_ratio(self):
+        '''Number of streams per unique intensive state (None without dedup, see __init__).'''
 
-        # text = text +  "\n====== reference values ======"
-        # for key,value in self.ref.items():
-        #     text = text + "\n {:<12} = {:>12.7n}".format(key,float(value))
+        if self.n_unique is None: return None
 
-        return text
+        return len(self.ids) / max([self.n_unique,1])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        if self.n_unique is None:
+            return "StreamBatch({} streams, {} substances)".format(len(self.ids),len(self.names))
 
+        return "StreamBatch({} streams, {} substances, {} unique states, dedup ratio {:.2f})".format(
+                len(self.ids),len(self.names),self.n_unique,self.dedup_ratio)
 
 ### SIMULATION CLASS ###
 class simulation:
@@ -841,8 +4241,31 @@ class simulation:
 
     def __init__(self,stream=None,filename="ExampleSimulation.xlsx",sheetname="ExampleStreams1",
                  exergy_method=None,exergy_type="Ahrends",
-                 saturated_water=['-9999'],saturated_steam=['-9999'],flue_gas=['-9999']):
-        '''Initialize the simulation'''
+                 saturated_water=['-9999'],saturated_steam=['-9999'],flue_gas=['-9999'],refs=None,
+                 properties="shomate",eos=None,backend=None,T0=298.15,p0=1.013):
+        '''
+        Initialize the simulation
+          refs = table of reference values shared by all streams
+                 (default: the process-wide table, see get_reference)
+          properties = source of h, s and cp of all streams: "shomate" or "nasa9"
+          eos  = real-gas equation of state of all gas streams: None (ideal gas),
+                 "GERG-2008" or "DETAIL" (see aga8)
+          backend = rules that select the property backend of each stream,
+                 eg "water -> IF97; p > 50 bar -> GERG-2008" (see backend_rules)
+          T0, p0 = dead state temp (K) and pressure (bar) of all streams
+          saturated_water, saturated_steam = stream numbers that are saturated
+                 regardless of their state (only needed to override classify_streams)
+        '''
+
+        # Get reference substance values once for all streams
+        if refs is None: refs = get_reference()
+        self.refs = refs.dead_state(T0,p0)
+        self.properties = properties
+        self.eos = eos
+        self.backend = backend
+        self.T0 = T0
+        self.p0 = p0
+        self.exergy_type = exergy_type
 
         if stream == None:
             ## Check file extension to see which type of data to load
@@ -863,39 +4286,11 @@ class simulation:
         ## Now we have the streams object
 
 
-        # Adjust those streams that are 'saturated'
-        # AJR: NOT READY YET!
-        # saturated_water = [ '1', '2', '3' ]      # Stream numbers of saturated water
-        # saturated_steam = [ '4', '5', '6' ]      # Stream numbers of saturated steam
-        # flue_gas        = [ '7', '8' ]           # Stream numbers of flue gas
-
-        ## NOTE: This should be inside of stream class!!!
-        for key,stream in self.streams.items():
-
-            # Total molar fraction of H2O in stream
-            x_H2O_tot = stream.comp['H2O'].state['x'] + stream.comp['H2O(l)'].state['x']
-
-            # Get the the current stream phase [g,l,s]
-            phase = stream.state['phase']
-
-
-
-            if x_H2O_tot == 1.0:            # H2O stream
-
-                if phase[0] > 0.001 and phase[0] < 0.999:
-                    pass  # Take original phase value
-                elif stream.id in saturated_water:
-                    phase = [0,1,0]
-                elif stream.id in saturated_steam:
-                    phase = [1,0,0]
-                else:
-                    phase = [-1,0,0]
-
-            #elif stream.id in flue_gas:    # Flue gas stream
-            else:      # For now, apply this to any other stream
-                phase = [-1,0,0]
-
-            stream.state['phase'] = phase
+        # Classify the water/steam streams from the saturation curve and their
+        # phase, all at once: vapor quality 0 (saturated water), 1 (saturated steam),
+        # 0 < x < 1 (two-phase) or -1 (any other stream, see classify_water).
+        # Stream numbers in saturated_water and saturated_steam are taken as such anyway.
+        self.classify_streams(saturated_water=saturated_water,saturated_steam=saturated_steam)
 
         # Output some summary information about the streams
         # (ie print all warnings, etc here)
@@ -915,8 +4310,43 @@ class simulation:
 
         return
 
-    def load_excel(self,filename="ExampleSimulation.xlsx",sheetname="ExampleStreams1"):
-        '''Load the simulation data from an excel sheet.'''
+    def classify_streams(self,saturated_water=[],saturated_steam=[],tol=1e-3):
+        '''
+        Set the phase of all streams to [x,1-x,0], with the vapor quality x of
+        water/steam streams from classify_water (with tolerance tol) and x = -1
+        for other streams. Stream numbers in saturated_water or saturated_steam
+        are set to saturated water (x = 0) or steam (x = 1) regardless.
+        Returns the vapor quality of the streams.
+        '''
+
+        streams = list(self.streams.values())
+        if len(streams) == 0: return zeros(0)
+
+        T     = asarray([stream.state['T'] for stream in streams],dtype=float64)
+        p     = asarray([stream.state['p'] for stream in streams],dtype=float64)
+        phase = asarray([stream.state['phase'] for stream in streams],dtype=float64)
+        isH2O = asarray([stream.isH2O for stream in streams],dtype=bool)
+        ids   = [str(stream.id) for stream in streams]
+
+        q = where(isH2O,classify_water(T,p,phase,tol),-1.0)
+        q = where(logical_and(isH2O,isin(ids,[str(id) for id in saturated_water])),0.0,q)
+        q = where(logical_and(isH2O,isin(ids,[str(id) for id in saturated_steam])),1.0,q)
+
+        for stream,x in zip(streams,q):
+            stream.state['phase'] = [x,1.0-x,0.0] if x >= 0.0 else [-1.0,0.0,0.0]
+
+        nsat = count_nonzero(logical_or(q == 0.0,q == 1.0))
+        ntwo = count_nonzero(logical_and(q > 0.0,q < 1.0))
+        if nsat + ntwo > 0:
+            print("simulation: {} saturated and {} two-phase water/steam streams.".format(nsat,ntwo))
+
+        return q
+
+    def load_excel(self,filename="ExampleSimulation.xlsx",sheetname="ExampleStreams1",batch=False):
+        '''
+        Load the simulation data from an excel sheet.
+        If batch=True, the streams are returned as a StreamBatch.
+        '''
 
         # Load the workbook from existing file
         book = xl.load_workbook(filename)
@@ -938,6 +4368,7 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
         #### Begin loading simulation data
 
         streams = OrderedDict()
+        rows    = []
 
         for j in arange(2,1000):    # Max 1000 streams!
 
@@ -975,25 +4406,42 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
                     else:
                         break
 
+                # Collect the rows for a batch of streams
+                if batch:
+                    rows.append( (streamid,T,p,mdot,[vfrac,lfrac,sfrac],comp) )
+                    continue
+
                 print("Loading stream {}".format(streamid))
 
                 # Now we have loaded the state variables and
                 # the composition, so generate a stream object
                 streamidstr = "{}".format(streamid)
                 streams[streamidstr] = stream(id=streamid,T=T,p=p,mdot=mdot,
-                                              phase=[vfrac,lfrac,sfrac],composition=comp)
+                                              phase=[vfrac,lfrac,sfrac],composition=comp,
+                                              T0=self.T0,p0=self.p0,refs=self.refs,properties=self.properties,eos=self.eos,
+                                              backend=self.backend)
 
             else:
                 break
 
+        if batch: return self.make_batch(rows)
+
         return streams
 
-    def write_excel(self,filename,sheetname,writeSim=True,writeResults=True,writeSubs=True):
-        '''Write simulation results to an excel file.'''
+    def write_excel(self,filename,sheetname,writeSim=True,writeResults=True,writeSubs=True,models=None):
+        '''
+        Write simulation results to an excel file.
+          models = list of exergy models to write side by side
+                   (eg, ["Ahrends","Szargut"], see stream.calc_exergy).
+                   Default: the models of the simulation, if it has several.
+        '''
 
         # Load streams locally
         streams = self.streams
 
+        if models is None and not isinstance(self.exergy_type,str):
+            models = self.exergy_type
+
         # Generate a sheetname for the results
         sheetname_results    = sheetname + "_exergy"
         sheetname_substances = sheetname + "_sub"
@@ -1047,7 +4495,7 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
             book = xl.Workbook()
 
             # Get the first sheet and rename it with the right name.
-            sheet1 = book.get_active_sheet()    # Active sheet in new book is always the first one
+            sheet1 = book.active                # Active sheet in new book is always the first one
             sheet1.title = sheetname            # Make sure the first sheet has the right name
 
             # Make a second sheet for the results
@@ -1068,7 +4516,7 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
         units1  = ["kg/s","K","bar","kg/mol","",     "",     ""     ]
 
         key = list(streams)[0]
-        header2 = list(streams[key].comp)
+        header2 = list(streams[key].fractions())
         units2 = [""] * len(header2)
 
         header = header1 + header2
@@ -1101,10 +4549,11 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
 
               # Loop over each variable and
               # Write the variable to the sheet
+              # (only the composition is needed here, see stream.fractions)
+              x = streams[key].fractions()
               for j,vnm in enumerate(header2):
-                  if vnm in streams[key].comp.keys():
-                      val = streams[key].comp[vnm]
-                      sheet1.cell(row=i+3,column=offset2+j).value = val.state['x']
+                  if vnm in x.keys():
+                      sheet1.cell(row=i+3,column=offset2+j).value = x[vnm]
 
         ## Now write the results to sheet2
 
@@ -1112,6 +4561,15 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
         #header = ["mdot","T","p","h","s","h_0","s_0","e_ph","e_ch","e_ph_kg","e_ch_kg","e_tot_kg","E_ph","E_ch","E_tot"]
         header = ["mdot","T","p","H","S","E_ph","E_ch","E_tot","h_0","s_0","h","s","e_ph","e_ch","e_ph_kg","e_ch_kg","e_tot_kg"]
         units  = ["kg/s","K","bar","MW","kW/K","MW","MW","MW","kJ/kmol","kJ/kmol/K","kJ/kmol","kJ/kmol/K","","","","",""]
+
+        # Add the exergies of each model side by side
+        if not models is None:
+            units_model = dict(zip(header,units))
+            for key in ["E_ch","E_tot","e_ch","e_ch_kg","e_tot_kg"]:
+                for model in models:
+                    header.append(model_key(key,model))
+                    units.append(units_model[key])
+
         # Define the column offset for the header
         offset = 2
 
@@ -1128,9 +4586,10 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
 
               # Loop over each variable and
               # Write the variable to the sheet
+              state = streams[key].state
               for j,vnm in enumerate(header):
-                  if vnm in streams[key].state.keys():
-                      val = streams[key].state[vnm]
+                  val = state.get(vnm)
+                  if not val is None:
                       sheet2.cell(row=i+3,column=offset+j).value = val
 
         ## Now write the individual substance information in sheet3
@@ -1207,10 +4666,11 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
 
         return
 
-    def load_aspen(self,filename="simu1.rep"):
+    def load_aspen(self,filename="simu1.rep",batch=False):
         '''
         Given the aspen output file located at fldr/file_in,
         convert the format to the stream format
+        (or to a StreamBatch, if batch=True)
         '''
 
         print("Read input from Aspen file: {}".format(filename))
@@ -1435,12 +4895,12 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
         # Indices of substances
         inds = [ not e in ['KMOL/HR','mdot','CUM/HR','TEMP','PRES','VFRAC','LFRAC','SFRAC']
                     for e in headings ]
-        ii1 = find(inds)
+        ii1 = flatnonzero(inds)
 
         # Indices of other information
         inds = [ e in ['KMOL/HR','mdot','CUM/HR','TEMP','PRES','VFRAC','LFRAC','SFRAC']
                     for e in headings ]
-        ii2 = find(inds)
+        ii2 = flatnonzero(inds)
 
         # Set all nan values to zero
         #data[isnan(data)] = 0
@@ -1450,6 +4910,22 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
         if units_T == "C": conv_T = 273.15
         conv_mdot = 1/3600.0
 
+        # Intern the substance names (after the aliases above), the
+        # compositions of a batch are stored as sparse rows of their IDs
+        substance_id(headings[ii1[1:]].tolist())
+
+        if batch:
+            tot = data[:,ii2[0]]
+            x   = data[:,ii1[1:]]
+            x   = where((tot > 0.0)[:,newaxis],x / where(tot > 0.0,tot,1.0)[:,newaxis],x)
+
+            return StreamBatch(data[:,ii1[0]].astype(int).tolist(),
+                               data[:,ii2[3]] + conv_T,data[:,ii2[4]],data[:,ii2[1]] * conv_mdot,
+                               None,Composition.from_dense(x,headings[ii1[1:]].tolist()),
+                               phase=data[:,ii2[5:8]],
+                               T0=self.T0,p0=self.p0,refs=self.refs,properties=self.properties,eos=self.eos,
+                               backend=self.backend)
+
         ## Loop over each stream and load the data
         streams = OrderedDict()
         for j,row in enumerate(data):
@@ -1479,13 +4955,35 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
             # Store the variables inside a new stream object
             streamidstr = "{}".format(streamid)
             streams[streamidstr] = stream(id=streamid,T=T,p=p,mdot=mdot,
-                                          phase=[vfrac,lfrac,sfrac],composition=comp)
+                                          phase=[vfrac,lfrac,sfrac],composition=comp,
+                                          T0=self.T0,p0=self.p0,refs=self.refs,properties=self.properties,eos=self.eos,
+                                          backend=self.backend)
 
         # Add to simulation object
         #self.streams = streams
 
         return streams
 
+    def make_batch(self,rows):
+        '''
+        Generate a StreamBatch from rows of stream data
+        (id,T,p,mdot,phase,composition), as read by load_excel and load_aspen.
+        '''
+
+        # Only the nonzero fractions are stored (see Composition)
+        x = Composition.from_rows([row[5] for row in rows])
+
+        return StreamBatch([row[0] for row in rows],[row[1] for row in rows],
+                           [row[2] for row in rows],[row[3] for row in rows],
+                           None,x,phase=[row[4] for row in rows],
+                           T0=self.T0,p0=self.p0,refs=self.refs,properties=self.properties,eos=self.eos,
+                           backend=self.backend)
+
+    def batch(self,dedup=False):
+        '''Return the streams of the simulation as a StreamBatch (see StreamBatch, dedup).'''
+
+        return StreamBatch.from_streams(self.streams.values(),dedup=dedup)
+
     def sim_to_gatex(self):
         '''Translate a simulation object into an array readable by GATEX.'''
 
@@ -1500,7 +4998,7 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
 
         # Make the output array and headings we want for each column
         # Note: here the heading 'x' stands for vfrac:vapor fraction; 'SE' stands for entropy
-        header = array(["STREAM","mdot","T","p","x","SE","Ar","CO2","CO","COS","H2O","XX","CH4","H2","H2S","N2","O2","SO2","H"])
+        header = array(GATEX_HEADER)
         ncols = len(header)
         out = zeros((nstreams,ncols))
 
@@ -1512,9 +5010,9 @@ Error:: load_excel:: Desired sheetname {} does not exist in the workbook {}.
 
             try:
                 id = float(key)
-            except:
-                id = 1000+randint(1)
-                print("Stream {}: Warning: generated random number for "\
+            except (TypeError,ValueError):
+                id = 1000.0+j
+                print("Stream {}: Warning: generated number for "\
                       "stream number to send to GATEX: {}".format(key,id))
 
             out[j,0] = id
@@ -1568,128 +5066,50 @@ ERROR:: sim_to_gatex:: Stream numbering error. "
         # Return the array of stream data in ebsilon format
         return out
 
-    def calc_exergy_gatex(self,fldr="./",gatex_exec="../gatex_pc_if97_mj.exe"):
+    def calc_exergy_gatex(self,fldr=None,gatex_exec="../gatex_pc_if97_mj.exe",keep=False):
         '''
         Use this subroutine to calculate exergy from a set of stream data (array)
         using GATEX.
 
         == INPUT ==
         streams : numpy array of dimensions n_streams X n_variables
-        fldr    : folder containing gatex program and
-                  where input and output data are stored
-                  (for now must be the current working directory, since gatex.exe looks there)
+        fldr    : folder for the temporary directory where gatex runs
+                  (default: the system temporary directory), see run_gatex
+        keep    : keep the temporary directory with the input and output data
 
         == OUTPUT ==
         E       : table of exergy calculations obtained from GATEX
 
+        To run many simulations at once, see calc_exergy_gatex (module function).
         '''
 
-        # First generate an array of stream info for GATEX
-        data = self.sim_to_gatex()
-
         print('======================')
-        print("Generating GATEX input files")
-
-        # Define important gatex filenames
-        gatex_f1 = os.path.join(fldr,"gate.inp")
-        gatex_f2 = os.path.join(fldr,"flows.prn")
-        gatex_f3 = os.path.join(fldr,"composition.prn")
-
-        # To help figure things out, create a header
-        # that shows the variable of each column
-        head = array(["STREAM","mdot","T","p","x","SE","Ar","CO2","CO","COS","H2O","XX","CH4","H2","H2S","N2","O2","SO2","H"])
-
-        # print("Temperatures:",data[:,2])
-        # sys.exit()
-
-        # How many streams and variables are we working with?
-        n_streams = len(data)
-        n_var     = len(head)
-
-        ### Create the gate.inp file with the reference values #################
-        text = '''
-
-[system]
-
-t0 = {t0:10.3f} ;
-p0 = {p0:10.3f} ;
-number = {ns:6d}. ;
-ndiff = {nd:6d}. ;
-kelvin = {K:4d}. ;
-
-'''.format(t0=data[0,2],p0=data[0,3],ns=n_streams,nd=n_streams,K=1)
-        # print(text)
-
-        #ref = open(gatex_f1,'w',buffering=0)
-        ref = open(gatex_f1,'w')
-        ref.write(text)
-        ref.close()
-        print(gatex_f1 + " is closed? " + str(ref.closed))
-        print("Wrote file for GATEX: " + gatex_f1)
-
-        #----------------------------------------------------------------------#
-
-        # For gatex to read the file correctly, the
-        # stream number should appear twice. Here we duplicate
-        # the first column (which is the stream number)
-        data2 = insert(data,1,data[:,0],axis=1)
-        head2    = insert(head,1,head[0])
-
-        #---------------------------------------------------------------------##
-
-        ## Create files for saving the different data parts ####################
-
-        # Extract flow data from the stream array (with duplicate stream number!)
-        # Then flatten to one vector and output to the flows.prn file
-        flow_names = array(["STREAM","mdot","T","p","x"])
-        inds = in1d(head2,flow_names)
-        flows = data2[:,inds]
-        flows = flows.flatten()
-        savetxt(gatex_f2,flows,fmt="%10.4f")
-        flows2 = loadtxt(gatex_f2)    # To ensure file is written (Windows hack!)!
-        print("Wrote file for GATEX: " + gatex_f2)
-
-        # Now extract element composition data (with duplicate stream number!)
-        # Then flatten to one vector and output to the composition.prn file
-        element_names = array(["STREAM","Ar","CO2","CO","COS","H2O","CH4","H2","H2S","N2","O2","SO2"])
-        inds = in1d(head2,element_names)
-        elements = data2[:,inds]
-        elements = elements.flatten()
-        savetxt(gatex_f3,elements,fmt="%10.4f")
-        elements2 = loadtxt(gatex_f3)    # To ensure file is written (Windows hack!)!
-        print("Wrote file for GATEX: " + gatex_f3)
+        print("Calling GATEX...")
 
-        #---------------------------------------------------------------------##
+        # Run gatex in a directory of its own and cross fingers !!!
+        E = run_gatex([self.gatex_job()],gatex_exec,workers=1,fldr=fldr,keep=keep)[0]
 
-        # Now call gatex #######################################################
-        print("Calling GATEX...")
+        if E is None:
+            print("Simulation: Warning: GATEX failed, exergies not updated.")
+        else:
+            self.store_gatex(E)
 
-        # Determine whether to use wine or not
-        # (If on linux or mac, use wine)
-        try:
-            uname = os.uname()    # Operating system info
-            call_prefix = ""
-            if ( uname[0] in ["Darwin"] ): call_prefix = "wine "
-        except:
-            call_prefix = ""
+        return self.streams
 
-        ## Now call gatex and cross fingers !!!
-        os.system((call_prefix+gatex_exec))
+    def gatex_job(self):
+        '''The GATEX input files of the simulation (see gatex_files).'''
 
+        # First generate an array of stream info for GATEX
+        data = self.sim_to_gatex()
 
-        # If it worked, load the exergies
-        with open('exergies.m', 'rb') as f:
-            contents = f.readlines()[37:]
+        # The dead state is the first stream
+        return gatex_files(data,t0=data[0,2],p0=data[0,3],kelvin=1)
 
-            new = []
-            for line in contents:
-                a = unicode(line,"utf-8").strip().replace("\n","").replace("\r","").replace("*************","NaN").split()
-                if not a[0] == "];": new.append(a)
-                #print(a)
-            E = asarray(new,dtype=float)
+    def store_gatex(self,E):
+        '''Store the exergy table of GATEX (see read_gatex_exergies) in the streams.'''
 
         # Add a first column that contains the stream number
-        E = insert(E,0,data[:,0],axis=1)
+        E = insert(E,0,self.sim_to_gatex()[:,0],axis=1)
 
         # # Also add an empty first row, so that the indices
         # # match fontina's old code!
@@ -1717,7 +5137,7 @@ kelvin = {K:4d}. ;
 
         # Done
 
-        return streams
+        return
 
     def __str__(self):
         '''Print out the handy simulation.'''
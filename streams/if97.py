@@ -0,0 +1,299 @@
+u"""
+Properties of water and steam from the IAPWS Industrial Formulation 1997
+(IAPWS-IF97, revised release of 2007).
+
+Regions 1 (liquid), 2 (vapor) and 4 (the saturation line) are implemented:
+
+    p = if97.psat(T)            # saturation pressure [bar] at T [K]
+    T = if97.Tsat(p)            # saturation temperature [K] at p [bar]
+    h,s,cp = if97.calc(T,p)     # h [kJ/kg], s and cp [kJ/kg-K] at T [K], p [bar]
+    h,s,cp = if97.calc(T,p,q)   # ... on the saturation line with vapor quality q
+
+All functions accept scalars or arrays. Values outside of the range
+of validity of the equations (eg, region 3 near the critical point) are NaN.
+"""
+
+from numpy import *
+
+# Critical point and triple point of water
+TC = 647.096        # K
+PC = 220.64         # bar
+TT = 273.15         # K (lower limit of IF97)
+
+# Coefficients of the saturation equation (IF97 Eqs. 29-31, Table 34)
+N4 = array([ 0.11670521452767e4, -0.72421316703206e6, -0.17073846940092e2,
+             0.12020824702470e5, -0.32325550322333e7,  0.14915108613530e2,
+            -0.48232657361591e4,  0.40511340542057e6, -0.23855557567849,
+             0.65017534844798e3 ])
+
+def psat(T):
+    '''Saturation pressure [bar] of water at temperature T [K] (IF97 Eq. 30).'''
+
+    T = asarray(T,dtype=float64)
+    n = N4
+
+    with errstate(invalid='ignore'):
+        theta = T + n[8]/(T - n[9])
+        A =        theta**2 + n[0]*theta + n[1]
+        B = n[2] * theta**2 + n[3]*theta + n[4]
+        C = n[5] * theta**2 + n[6]*theta + n[7]
+
+        p = ( 2*C / (-B + sqrt(B**2 - 4*A*C)) )**4 * 10.0     # MPa => bar
+
+    return where(logical_and(T >= TT,T <= TC),p,nan)
+
+def Tsat(p):
+    '''Saturation temperature [K] of water at pressure p [bar] (IF97 Eq. 31).'''
+
+    p = asarray(p,dtype=float64)
+    n = N4
+
+    with errstate(invalid='ignore'):
+        beta = (p/10.0)**0.25                                   # bar => MPa
+        E =        beta**2 + n[2]*beta + n[5]
+        F = n[0] * beta**2 + n[3]*beta + n[6]
+        G = n[1] * beta**2 + n[4]*beta + n[7]
+        D = 2*G / (-F - sqrt(F**2 - 4*E*G))
+
+        T = ( n[9] + D - sqrt((n[9]+D)**2 - 4*(n[8] + n[9]*D)) ) / 2
+
+    return where(logical_and(p >= psat(TT),p <= PC),T,nan)
+
+### REGION 1: COMPRESSED LIQUID ###
+
+# Specific gas constant of water (IF97 Eq. 1)
+R = 0.461526        # kJ/kg-K
+
+# Molar mass of water
+MW = 18.015268      # kg/kmol
+
+# Reducing values
+P1,T1 = 165.3, 1386.0   # bar, K
+
+# Coefficients of the Gibbs free energy of region 1 (IF97 Table 2)
+I1 = array([ 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3,
+             4, 4, 4, 5, 8, 8,21,23,29,30,31,32])
+J1 = array([-2,-1, 0, 1, 2, 3, 4, 5,-9,-7,-1, 0, 1, 3,-3, 0, 1, 3,17,-4, 0, 6,
+            -5,-2,10,-8,-11,-6,-29,-31,-38,-39,-40,-41])
+N1 = array([ 0.14632971213167e0,  -0.84548187169114e0,  -0.37563603672040e1,
+             0.33855169168385e1,  -0.95791963387872e0,   0.15772038513228e0,
+            -0.16616417199501e-1,  0.81214629983568e-3,  0.28319080123804e-3,
+            -0.60706301565874e-3, -0.18990068218419e-1, -0.32529748770505e-1,
+            -0.21841717175414e-1, -0.52838357969930e-4, -0.47184321073267e-3,
+            -0.30001780793026e-3,  0.47661393906987e-4, -0.44141845330846e-5,
+            -0.72694996297594e-15,-0.31679644845054e-4, -0.28270797985312e-5,
+            -0.85205128120103e-9, -0.22425281908000e-5, -0.65171222895601e-6,
+            -0.14341729937924e-12,-0.40516996860117e-6, -0.12734301741641e-8,
+            -0.17424871230634e-9, -0.68762131295531e-18, 0.14478307828521e-19,
+             0.26335781662795e-22,-0.11947622640071e-22, 0.18228094581404e-23,
+            -0.93537087292458e-25 ])
+
+# Factors of the terms of gamma and its derivatives (gamma, gamma_pi, gamma_tau, gamma_tautau)
+W1 = array([ones(len(N1)), I1, J1, J1*(J1-1)],dtype=float64)
+
+def gibbs1(T,p):
+    '''
+    Dimensionless Gibbs free energy of region 1 and its derivatives
+    (gamma, gamma_pi, gamma_tau, gamma_tautau) at T [K] and p [bar].
+    '''
+
+    pi  = asarray(p,dtype=float64) / P1
+    tau = T1 / asarray(T,dtype=float64)
+
+    a = (7.1 - pi)[...,newaxis]
+    b = (tau - 1.222)[...,newaxis]
+    I,J,n = I1,J1,N1
+
+    # Terms of the series, summed at once for gamma and its derivatives
+    # (see W1, the powers of the derivatives are divided out afterwards)
+    G = einsum('...k,jk->...j', n * a**I * b**J, W1)
+    a = a[...,0]
+    b = b[...,0]
+
+    g     = G[...,0]
+    g_pi  = -G[...,1] / a
+    g_t   = G[...,2] / b
+    g_tt  = G[...,3] / b**2
+
+    return pi,tau,g,g_pi,g_t,g_tt
+
+def region1(T,p):
+    '''
+    Specific enthalpy h [kJ/kg], entropy s [kJ/kg-K], isobaric heat
+    capacity cp [kJ/kg-K] and volume v [m3/kg] of liquid water
+    in region 1 at T [K] and p [bar] (no range check, see calc).
+    '''
+
+    T = asarray(T,dtype=float64)
+    pi,tau,g,g_pi,g_t,g_tt = gibbs1(T,p)
+
+    h  = R*T * tau*g_t
+    s  = R * (tau*g_t - g)
+    cp = R * -tau**2*g_tt
+    v  = R*T / (asarray(p,dtype=float64)*1e2) * pi*g_pi       # kJ/kg / kPa = m3/kg
+
+    return h,s,cp,v
+
+### REGION 2: VAPOR ###
+
+# Reducing values
+P2,T2 = 10.0, 540.0     # bar, K
+
+# Coefficients of the ideal-gas part (IF97 Table 10)
+J20 = array([ 0, 1,-5,-4,-3,-2,-1, 2, 3])
+N20 = array([-0.96927686500217e1,  0.10086655968018e2, -0.56087911283020e-2,
+              0.71452738081455e-1,-0.40710498223928e0,  0.14240819171444e1,
+             -0.43839511319450e1, -0.28408632460772e0,  0.21268463753307e-1 ])
+
+# Coefficients of the residual part (IF97 Table 11)
+I2 = array([ 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3, 3, 3, 4, 4, 4, 5, 6, 6, 6,
+             7, 7, 7, 8, 8, 9,10,10,10,16,16,18,20,20,20,21,22,23,24,24,24])
+J2 = array([ 0, 1, 2, 3, 6, 1, 2, 4, 7,36, 0, 1, 3, 6,35, 1, 2, 3, 7, 3,16,35,
+             0,11,25, 8,36,13, 4,10,14,29,50,57,20,35,48,21,53,39,26,40,58])
+N2 = array([-0.17731742473213e-2, -0.17834862292358e-1, -0.45996013696365e-1,
+            -0.57581259083432e-1, -0.50325278727930e-1, -0.33032641670203e-4,
+            -0.18948987516315e-3, -0.39392777243355e-2, -0.43797295650573e-1,
+            -0.26674547914087e-4,  0.20481737692309e-7,  0.43870667284435e-6,
+            -0.32277677238570e-4, -0.15033924542148e-2, -0.40668253562649e-1,
+            -0.78847309559367e-9,  0.12790717852285e-7,  0.48225372718507e-6,
+             0.22922076337661e-5, -0.16714766451061e-10,-0.21171472321355e-2,
+            -0.23895741934104e2,  -0.59059564324270e-17,-0.12621808899101e-5,
+            -0.38946842435739e-1,  0.11256211360459e-10,-0.82311340897998e1,
+             0.19809712802088e-7,  0.10406965210174e-18,-0.10234747095929e-12,
+            -0.10018179379511e-8, -0.80882908646985e-10, 0.10693031879409e0,
+            -0.33662250574171e0,   0.89185845355421e-24, 0.30629316876232e-12,
+            -0.42002467698208e-5, -0.59056029685639e-25, 0.37826947613457e-5,
+            -0.12768608934681e-14, 0.73087610595061e-28, 0.55414715350778e-16,
+            -0.94369707241210e-6 ])
+
+# Factors of the terms of gamma and its derivatives (see W1)
+W20 = array([ones(len(N20)), zeros(len(N20)), J20, J20*(J20-1)],dtype=float64)
+W2  = array([ones(len(N2)), I2, J2, J2*(J2-1)],dtype=float64)
+
+def gibbs2(T,p):
+    '''
+    Dimensionless Gibbs free energy of region 2 and its derivatives
+    (gamma, gamma_pi, gamma_tau, gamma_tautau) at T [K] and p [bar].
+    '''
+
+    pi  = asarray(p,dtype=float64) / P2
+    tau = T2 / asarray(T,dtype=float64)
+
+    # Ideal-gas part
+    G0 = einsum('...k,jk->...j', N20 * tau[...,newaxis]**J20, W20)
+    with errstate(divide='ignore',invalid='ignore'):
+        g0    = log(pi) + G0[...,0]
+    g0_pi = 1.0 / pi
+    g0_t  = G0[...,2] / tau
+    g0_tt = G0[...,3] / tau**2
+
+    # Residual part
+    b  = tau - 0.5
+    Gr = einsum('...k,jk->...j', N2 * pi[...,newaxis]**I2 * b[...,newaxis]**J2, W2)
+
+    gr    = Gr[...,0]
+    gr_pi = Gr[...,1] / pi
+    gr_t  = Gr[...,2] / b
+    gr_tt = Gr[...,3] / b**2
+
+    return pi,tau,g0+gr,g0_pi+gr_pi,g0_t+gr_t,g0_tt+gr_tt
+
+def region2(T,p):
+    '''
+    Specific enthalpy h [kJ/kg], entropy s [kJ/kg-K], isobaric heat
+    capacity cp [kJ/kg-K] and volume v [m3/kg] of steam
+    in region 2 at T [K] and p [bar] (no range check, see calc).
+    '''
+
+    T = asarray(T,dtype=float64)
+    pi,tau,g,g_pi,g_t,g_tt = gibbs2(T,p)
+
+    h  = R*T * tau*g_t
+    s  = R * (tau*g_t - g)
+    cp = R * -tau**2*g_tt
+    v  = R*T / (asarray(p,dtype=float64)*1e2) * pi*g_pi
+
+    return h,s,cp,v
+
+### BOUNDARY BETWEEN REGIONS 2 AND 3 ###
+
+# Coefficients of the B23 equation (IF97 Table 1)
+N23 = array([ 0.34805185628969e3, -0.11671859879975e1, 0.10192970039326e-2,
+              0.57254459862746e3,  0.13918839778870e2 ])
+
+def pB23(T):
+    '''Pressure [bar] on the boundary between regions 2 and 3 at T [K] (IF97 Eq. 5).'''
+    T = asarray(T,dtype=float64)
+    return ( N23[0] + N23[1]*T + N23[2]*T**2 ) * 10.0
+
+def TB23(p):
+    '''Temperature [K] on the boundary between regions 2 and 3 at p [bar] (IF97 Eq. 6).'''
+    p = asarray(p,dtype=float64) / 10.0
+    return N23[3] + sqrt((p - N23[4])/N23[2])
+
+### PROPERTIES AT (T,p) OR ON THE SATURATION LINE ###
+
+def region(T,p):
+    '''
+    Region of IF97 of each state (T [K], p [bar]): 1 (liquid), 2 (vapor),
+    or 0 if outside of regions 1 and 2 (eg, region 3 near the critical point).
+    On the saturation line (p = psat(T)) the liquid is chosen.
+    '''
+
+    T,p = broadcast_arrays(asarray(T,dtype=float64),asarray(p,dtype=float64))
+
+    with errstate(invalid='ignore'):
+        valid = logical_and(logical_and(T >= TT,T <= 1073.15),logical_and(p > 0.0,p <= 1000.0))
+        low   = T <= 623.15
+        liq   = logical_and(low,p >= psat(T))
+        vap   = logical_or(logical_and(low,p < psat(T)),
+                logical_or(logical_and(T > 623.15,logical_and(T <= 863.15,p <= pB23(T))),T > 863.15))
+
+    return where(logical_and(valid,liq),1,where(logical_and(valid,vap),2,0))
+
+def calc(T,p,q=None):
+    '''
+    Specific enthalpy h [kJ/kg], entropy s [kJ/kg-K] and isobaric heat
+    capacity cp [kJ/kg-K] of water and steam (regions 1, 2 and 4).
+
+    T, p and the vapor quality q are broadcast against each other.
+    Where q is NaN (or q=None), the region is determined from T and p
+    (see region). Where 0 <= q <= 1, the state is on the saturation line
+    at p (region 4, T is not used): h and s are those of the mixture of
+    saturated liquid and vapor, cp is only defined for q = 0 or q = 1.
+    States outside of the implemented regions are NaN.
+    '''
+
+    T,p = broadcast_arrays(asarray(T,dtype=float64),asarray(p,dtype=float64))
+    if q is None: q = nan
+    T,p,q = broadcast_arrays(T,p,asarray(q,dtype=float64))
+
+    with errstate(all='ignore'):
+
+        h  = full(T.shape,nan)
+        s  = full(T.shape,nan)
+        cp = full(T.shape,nan)
+
+        ## Single phase states (each region only where needed)
+        sat = logical_and(q >= 0.0,q <= 1.0)
+        reg = where(sat,0,region(T,p))
+
+        for r,func in [(1,region1),(2,region2)]:
+            m = reg == r
+            if any(m): h[m],s[m],cp[m],v = func(T[m],p[m])
+
+        ## Saturated states (only up to the limit of region 1 at 623.15 K)
+        if any(sat):
+            Ts = Tsat(p[sat])
+            Ts = where(Ts <= 623.15,Ts,nan)
+            qs = q[sat]
+            hl,sl,cpl,vl = region1(Ts,p[sat])
+            hv,sv,cpv,vv = region2(Ts,p[sat])
+
+            h[sat]  = (1.0-qs)*hl + qs*hv
+            s[sat]  = (1.0-qs)*sl + qs*sv
+            cp[sat] = where(qs == 0.0,cpl,where(qs == 1.0,cpv,nan))
+
+    if h.ndim == 0: return h[()], s[()], cp[()]
+
+    return h, s, cp
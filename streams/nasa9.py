@@ -0,0 +1,347 @@
+u"""
+NASA-9 polynomial properties of ideal gases and condensed species
+(McBride, Zehe and Gordon, 2002, NASA/TP-2002-211556).
+
+The database is read from a file in the standard NASA Glenn (CEA)
+thermo.inp format. The file packaged with streams (data/thermo.inp)
+contains the substances of ReferenceTables.xlsx, but the complete
+CEA database (about 2000 species) can be used just the same:
+
+    db = nasa9.Database("thermo.inp")
+    h,s,cp = db.calc(db.index(['N2','CO2']),T,p)
+
+Species are only parsed from the file when they are first used.
+"""
+
+import os,sys
+from collections import OrderedDict
+
+import pkg_resources
+from numpy import *
+
+# Gas constant used for the NASA Glenn coefficients
+R = 8.31451         # kJ/kmol-K
+
+# Standard state pressure of the NASA Glenn coefficients
+P_STD = 1.0         # bar
+
+# Maximum number of temperature ranges per species
+NMAX_RANGES = 12
+
+# Names in the reference tables => names in the NASA Glenn database
+ALIASES = OrderedDict([ ('H2O(l)',   'H2O(L)'),
+                        ('C(s)',     'C(gr)'),
+                        ('S(s)',     'S(a)'),
+                        ('C2H2',     'C2H2,acetylene'),
+                        ('C3H6',     'C3H6,propylene'),
+                        ('C4H10',    'C4H10,n-butane'),
+                        ('C5H12',    'C5H12,n-pentane'),
+                        ('C8H18',    'C8H18,n-octane'),
+                        ('C8H18(l)', 'C8H18(L),n-octa'),
+                        ('CH3OH(l)', 'CH3OH(L)'),
+                        ('C2H5OH(l)','C2H5OH(L)') ])
+
+def read_float(text):
+    '''Convert a fixed-width Fortran number (eg, 1.234D+05) to float.'''
+    text = text.strip().replace('D','E').replace('d','E')
+    return float(text) if len(text) > 0 else 0.0
+
+class Database:
+    '''
+    Lazily loaded database of NASA-9 polynomials.
+
+    The file is only scanned for species names on first use,
+    and the coefficients of a species are parsed into the
+    arrays below when the species is first requested:
+
+      Tlo, Thi : [species,range] temperature ranges (K), padded with inf
+      coef     : [species,range,9] coefficients a1..a7,b1,b2
+      nranges  : [species] number of temperature ranges
+      MW, h_f  : [species] molecular weight and formation enthalpy (kJ/kmol)
+    '''
+
+    def __init__(self,filename=None):
+
+        if filename is None:
+            filename = pkg_resources.resource_filename('streams', 'data/thermo.inp')
+
+        self.filename = filename
+
+        # Position of each species in the file (filled on first use)
+        self._lines  = None
+        self._blocks = None
+
+        # Loaded species
+        self.names  = []
+        self._index = OrderedDict()
+
+        self.Tlo     = zeros([0,NMAX_RANGES])
+        self.Thi     = zeros([0,NMAX_RANGES])
+        self.coef    = zeros([0,NMAX_RANGES,9])
+        self.nranges = zeros(0,dtype=intp)
+        self.MW      = zeros(0)
+        self.h_f     = zeros(0)
+        self.phase   = zeros(0,dtype=intp)
+
+        return
+
+    def _scan(self):
+        '''Find the line of each species in the file (without parsing it).'''
+
+        if not os.path.isfile(self.filename):
+            err = '''
+nasa9:: Error: database file not found: {}
+'''.format(self.filename)
+            sys.exit(err)
+
+        with open(self.filename,'r') as f:
+            lines = f.read().splitlines()
+
+        blocks = OrderedDict()
+
+        i = 0
+        while i < len(lines):
+
+            line = lines[i]
+
+            # Skip comments, the header and the end markers
+            if line.strip() == "" or line.startswith("!") or line.startswith("#"):
+                i = i + 1
+                continue
+            if line.strip().lower() == "thermo":
+                i = i + 2       # Skip the line of global temperature ranges
+                continue
+            if line.startswith("END"):
+                i = i + 1
+                continue
+
+            # Now we are at the first record of a species
+            name = line[:24].split()[0]
+            nint = int(lines[i+1][0:2])
+
+            blocks[name] = i
+            i = i + 2 + (3*nint if nint > 0 else 1)
+
+        self._lines  = lines
+        self._blocks = blocks
+
+        return
+
+    def species_names(self):
+        '''Return the names of all species in the database file.'''
+
+        if self._blocks is None: self._scan()
+
+        return list(self._blocks.keys())
+
+    def find(self,name):
+        '''
+        Return the database name of a substance, or None if it is not available.
+        Reference table names are translated (see ALIASES), then names are
+        matched exactly, ignoring case, or up to the comma (C2H2 => C2H2,acetylene).
+        '''
+
+        if self._blocks is None: self._scan()
+
+        name = ALIASES.get(name,name)
+        if name in self._blocks: return name
+
+        for key in self._blocks.keys():
+            if key.lower() == name.lower(): return key
+
+        for key in self._blocks.keys():
+            if key.split(",")[0] == name: return key
+
+        return None
+
+    def __contains__(self,name):
+        return not self.find(name) is None
+
+    def load(self,name):
+        '''Parse a species from the file (if needed) and return its index.'''
+
+        if name in self._index: return self._index[name]
+
+        key = self.find(name)
+        if key is None:
+            err = '''
+nasa9:: Error: species not found in database {}: {}
+'''.format(self.filename,name)
+            sys.exit(err)
+
+        if key in self._index:
+            self._index[name] = self._index[key]
+            return self._index[key]
+
+        lines = self._lines
+        i     = self._blocks[key]
+
+        # Record 2: number of ranges, phase, molecular weight and heat of formation
+        line2 = lines[i+1]
+        nint  = int(line2[0:2])
+        phase = int(line2[51:52]) if line2[51:52].strip() else 0
+        mw    = read_float(line2[52:65])
+        hf    = read_float(line2[65:80])      # J/mol = kJ/kmol
+
+        if nint == 0:
+            # Species only defined at a single temperature, cannot be evaluated
+            err = '''
+nasa9:: Error: species {} has no temperature ranges in database {}
+'''.format(key,self.filename)
+            sys.exit(err)
+
+        if nint > NMAX_RANGES:
+            sys.exit("nasa9:: Error: too many temperature ranges for species {}".format(key))
+
+        Tlo  = full(NMAX_RANGES,inf)
+        Thi  = full(NMAX_RANGES,inf)
+        coef = zeros([NMAX_RANGES,9])
+
+        for r in range(nint):
+            line3 = lines[i+2+3*r]
+            line4 = lines[i+3+3*r]
+            line5 = lines[i+4+3*r]
+
+            Tlo[r] = read_float(line3[0:11])
+            Thi[r] = read_float(line3[11:22])
+
+            coef[r,0:5] = [read_float(line4[16*k:16*(k+1)]) for k in range(5)]
+            coef[r,5:7] = [read_float(line5[16*k:16*(k+1)]) for k in range(2)]
+            coef[r,7:9] = [read_float(line5[48:64]),read_float(line5[64:80])]
+
+        # Append the species to the arrays
+        k = len(self.names)
+        self.names.append(key)
+        self.Tlo     = vstack([self.Tlo,Tlo[newaxis,:]])
+        self.Thi     = vstack([self.Thi,Thi[newaxis,:]])
+        self.coef    = concatenate([self.coef,coef[newaxis,:,:]],axis=0)
+        self.nranges = append(self.nranges,nint)
+        self.MW      = append(self.MW,mw)
+        self.h_f     = append(self.h_f,hf)
+        self.phase   = append(self.phase,phase)
+
+        self._index[key]  = k
+        self._index[name] = k
+
+        return k
+
+    def index(self,names):
+        '''
+        Return the index of a species (int) or an array of indices
+        for a list of names, loading the species as needed.
+        '''
+
+        if isinstance(names,str): return self.load(names)
+
+        return asarray([self.load(nm) for nm in names],dtype=intp)
+
+    def valid(self,ii,T):
+        '''Return the mask of (species,T) within the temperature ranges of the database.'''
+
+        ii,T = broadcast_arrays(asarray(ii),asarray(T,dtype=float64))
+
+        Tmin = self.Tlo[ii,0]
+        Tmax = self.Thi[ii,self.nranges[ii]-1]
+
+        return logical_and(T >= Tmin,T <= Tmax)
+
+    def calc(self,ii,T,p):
+        '''
+        Calculate the enthalpy h [kJ/kmol], entropy s [kJ/kmol/K] and
+        specific heat cp [kJ/kmol/K] of species ii at (T,p).
+
+        ii, T and p are broadcast against each other. The temperature
+        range of each element is chosen separately; temperatures outside
+        of the ranges of a species use its first or last range
+        (see valid for the mask of elements within range).
+        '''
+
+        ii = asarray(ii)
+        if not issubdtype(ii.dtype,integer):
+            ii = self.index(ii.ravel().tolist()).reshape(ii.shape)
+
+        ii,T,p = broadcast_arrays(ii,asarray(T,dtype=float64),asarray(p,dtype=float64))
+
+        # Find the temperature range of each element
+        # (the number of upper bounds below T)
+        r = sum(T[...,newaxis] > self.Thi[ii],axis=-1)
+        r = minimum(r,self.nranges[ii]-1)
+
+        a = self.coef[ii,r]
+        a1,a2,a3,a4,a5,a6,a7,b1,b2 = [a[...,k] for k in range(9)]
+
+        lnT = log(T)
+
+        # Dimensionless cp/R, H/RT and S/R
+        cp_R = a1*T**-2 + a2/T + a3 + a4*T + a5*T**2 + a6*T**3 + a7*T**4
+
+        h_RT = ( -a1*T**-2 + a2*lnT/T + a3 + a4*T/2 + a5*T**2/3
+                 + a6*T**3/4 + a7*T**4/5 + b1/T )
+
+        s_R  = ( -a1*T**-2/2 - a2/T + a3*lnT + a4*T + a5*T**2/2
+                 + a6*T**3/3 + a7*T**4/4 + b2 )
+
+        h  = h_RT * R * T
+        s  = s_R * R - R * log(p/P_STD)
+        cp = cp_R * R
+
+        # Condensed species: entropy does not depend on pressure
+        s = where(self.phase[ii] > 0,s_R * R,s)
+
+        return h, s, cp
+
+    def derivatives(self,ii,T,p):
+        '''
+        Calculate the derivatives dh/dT [kJ/kmol/K], ds/dT [kJ/kmol/K^2] and
+        ds/dp [kJ/kmol/K/bar] of species ii at (T,p), see calc.
+        '''
+
+        h,s,cp = self.calc(ii,T,p)
+
+        ii = asarray(ii)
+        if not issubdtype(ii.dtype,integer):
+            ii = self.index(ii.ravel().tolist()).reshape(ii.shape)
+
+        ii,T,p = broadcast_arrays(ii,asarray(T,dtype=float64),asarray(p,dtype=float64))
+
+        # Condensed species: entropy does not depend on pressure
+        dsdp = where(self.phase[ii] > 0,0.0,-R/p)
+
+        return cp, cp/T, dsdp
+
+### PROCESS-WIDE DATABASE ###
+
+_db = None
+
+def get_database():
+    '''Return the process-wide NASA-9 database (the packaged file by default).'''
+
+    global _db
+
+    if _db is None: _db = Database()
+
+    return _db
+
+def set_database(db):
+    '''
+    Replace the process-wide NASA-9 database,
+    db can be a Database or the filename of a thermo.inp file.
+    '''
+
+    global _db
+
+    if isinstance(db,str): db = Database(db)
+
+    _db = db
+
+    return _db
+
+def calc_nasa9(ii,T,p,db=None):
+    '''
+    Calculate h [kJ/kmol], s [kJ/kmol/K] and cp [kJ/kmol/K] of substances
+    (indices in the database, or names) at (T,p), see Database.calc.
+    '''
+
+    if db is None: db = get_database()
+
+    return db.calc(ii,T,p)
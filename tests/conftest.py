@@ -0,0 +1,4 @@
+import os,sys
+
+# Run the tests against the package of this tree
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
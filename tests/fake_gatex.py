@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+'''
+Stand-in for GATEX in the tests: reads gate.inp, flows.prn and
+composition.prn from the working directory and writes exergies.m there.
+The "exergies" are made from the inputs of each stream, so that results
+that end up in the wrong stream show:
+
+    H = mdot*T/1000, S = mdot*p, EPH = stream + T/1e4, ECH = sum(x), E = EPH+ECH
+
+Stream 99 gets E = '*************' (as GATEX prints values it cannot show).
+Environment: FAKE_GATEX_SLEEP (seconds per run), FAKE_GATEX_LOG (a file
+that gets a line "start end" of each run), FAKE_GATEX_FAIL (write nothing).
+'''
+
+import os,re,time
+
+start = time.time()
+
+inp = open("gate.inp").read()
+n   = int(float(re.search(r"number\s*=\s*([\d.]+)",inp).group(1)))
+
+flows = [float(v) for v in open("flows.prn").read().split()]
+comp  = [float(v) for v in open("composition.prn").read().split()]
+assert len(flows) == 6*n and len(comp) == 13*n
+assert not os.path.exists("exergies.m")
+
+time.sleep(float(os.environ.get("FAKE_GATEX_SLEEP","0")))
+
+if not os.environ.get("FAKE_GATEX_FAIL"):
+    rows = []
+    for i in range(n):
+        id,id2,mdot,T,p,x = flows[6*i:6*i+6]
+        c = comp[13*i:13*i+13]
+        assert id == id2 == c[0] == c[1]
+        EPH = id + T/1e4
+        ECH = sum(c[2:])
+        E   = "*************" if id == 99 else "{:12.6f}".format(EPH+ECH)
+        rows.append("{:12.6f} {:12.6f} {:12.6f} {:12.6f} {:12.6f} {:12.6f} {:12.6f} {}".format(
+                    mdot,T,p,mdot*T/1000,mdot*p,EPH,ECH,E))
+
+    with open("exergies.m","wb") as f:
+        for k in range(37): f.write("% GATEX stand-in, header line {} (\xb0C)\n".format(k).encode("cp1252"))
+        f.write(("\n".join(rows) + "\n];\n").encode("cp1252"))
+
+if os.environ.get("FAKE_GATEX_LOG"):
+    with open(os.environ["FAKE_GATEX_LOG"],"a") as f:
+        f.write("{} {}\n".format(start,time.time()))
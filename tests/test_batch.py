@@ -0,0 +1,85 @@
+'''StreamBatch.from_streams: the batch reproduces the states of the stream objects.'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+def gas(rng,N):
+    '''Random flue gases (with water vapor).'''
+    names = ['N2','O2','CO2','H2O','Ar']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    return names,x,rng.uniform(280.0,1500.0,N),rng.uniform(0.5,50.0,N)
+
+def natural_gas(rng,N):
+    '''Random natural gases (with water vapor) at pipeline conditions.'''
+    names = ['CH4','C2H6','N2','CO2','H2O']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    x[:,0] += 4.0
+    x[:,4] *= 0.02
+    x /= x.sum(axis=1)[:,None]
+    return names,x,rng.uniform(270.0,450.0,N),rng.uniform(1.0,80.0,N)
+
+def water(rng,N):
+    '''Pure water: compressed liquid, superheated steam and near saturation.'''
+    T = np.concatenate([rng.uniform(280.0,450.0,N//2),rng.uniform(500.0,900.0,N-N//2)])
+    p = np.concatenate([rng.uniform(10.0,100.0,N//2),rng.uniform(1.0,20.0,N-N//2)])
+    T[:4] = [372.7,373.3,453.0,485.5]
+    p[:4] = [1.0,1.0,10.0,20.0]
+    return ['H2O'],np.ones((N,1)),T,p
+
+def water_liquid(rng,N):
+    '''
+    Water given as vapor and liquid (H2O and H2O(l)) with some CO2, or in
+    air (water alone fails in stream.calc_exergy: no gas at the dead state).
+    '''
+    names = ['H2O','H2O(l)','CO2','N2','O2']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    x[:N//2,2] *= 0.1
+    x[:N//2,3:] = 0.0
+    x /= x.sum(axis=1)[:,None]
+    return names,x,rng.uniform(290.0,600.0,N),rng.uniform(1.0,30.0,N)
+
+@pytest.mark.parametrize("model",["Ahrends","Szargut"])
+@pytest.mark.parametrize("case",[gas,water,water_liquid])
+def test_from_streams(case,model):
+    '''Every state value of every stream is bitwise identical in the batch.'''
+
+    compare(case,model,None)
+
+@pytest.mark.parametrize("case,backend,rtol",[(gas,"nasa9",0.0),
+                                               (natural_gas,"GERG-2008",1e-12),(natural_gas,"DETAIL",1e-12)])
+def test_from_streams_backend(case,backend,rtol):
+    '''
+    As test_from_streams, with the other backends (the equations of state
+    reduce over the composition with BLAS, whose rounding may depend on the
+    number of states, so they are only compared to rtol).
+    '''
+
+    compare(case,"Ahrends",backend,rtol)
+
+def compare(case,model,backend,rtol=0.0):
+    '''Compare the states of 100 streams of case with those of their batch.'''
+
+    rng = np.random.default_rng(3)
+    names,x,T,p = case(rng,100)
+    mdot = rng.uniform(0.1,100.0,len(T))
+
+    sts = [exergy.stream(i,T[i],p[i],mdot[i],[(nm,xi) for nm,xi in zip(names,x[i]) if xi > 0],
+                         backend=backend) for i in range(len(T))]
+    for st in sts: st.calc_exergy(model)
+    batch = exergy.StreamBatch.from_streams(sts)
+    batch.calc_exergy(model)
+
+    bad = []
+    for i,st in enumerate(sts):
+        row = batch.row(i)
+        for key,val in st.state.items():
+            if key == 'phase':
+                ok = list(val) == row[key]
+            elif rtol == 0.0:
+                ok = np.array_equal(val,row[key],equal_nan=True)
+            else:
+                ok = np.allclose(val,row[key],rtol=rtol,atol=0.0,equal_nan=True)
+            if not ok: bad.append((i,key,val,row[key]))
+    assert bad == []
@@ -0,0 +1,40 @@
+'''Caches of substance properties and stream exergies (see enable_cache).'''
+
+import pytest
+
+from streams import exergy, if97
+
+@pytest.fixture
+def cache():
+    yield exergy.enable_cache()
+    exergy.disable_cache()
+
+def water(id,phase):
+    p = 1.013
+    return exergy.stream(id,float(if97.Tsat(p)),p,1.0,[('H2O',1.0)],phase=phase,exergy_type="Ahrends")
+
+def test_cache_phase(cache):
+    '''Liquid and vapor water at the same T and p do not share a cache entry.'''
+
+    exergy.disable_cache()
+    ref = [water(1,[1,0,0]).state['e_ph'],water(2,[0,1,0]).state['e_ph']]
+    exergy.enable_cache()
+
+    vap = water(3,[1,0,0])
+    liq = water(4,[0,1,0])
+
+    assert vap.state['e_ph'] == pytest.approx(ref[0],rel=1e-12)
+    assert liq.state['e_ph'] == pytest.approx(ref[1],rel=1e-12)
+    assert liq.state['e_ph'] < 0.2*vap.state['e_ph']
+
+def test_cache_hits(cache):
+    '''Equal streams hit the cache and get the same exergies.'''
+
+    comp = [('N2',0.75),('O2',0.15),('CO2',0.05),('H2O',0.05)]
+    a = exergy.stream(1,600.0,1.2,10.0,comp,exergy_type="Ahrends")
+    a.state['e_ph']
+    b = exergy.stream(2,600.0,1.2,20.0,comp,exergy_type="Ahrends")
+
+    assert b.state['e_ph'] == a.state['e_ph']
+    assert b.state['e_ch'] == a.state['e_ch']
+    assert cache['stream'].hits >= 1
@@ -0,0 +1,68 @@
+'''Classification of water/steam states (classify_water, simulation.classify_streams).'''
+
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from streams import exergy, if97
+
+P  = 10.0
+TS = float(if97.Tsat(P))
+
+@pytest.mark.parametrize("T,p,phase,q",[
+    (TS,P,[0.0,1.0,0.0],0.0),               # saturated liquid
+    (TS,P,[1.0,0.0,0.0],1.0),               # saturated vapor
+    (TS,P,[0.3,0.7,0.0],0.3),               # two-phase
+    (TS,P,[-1.0,1.0,0.0],0.0),              # VFRAC missing: from LFRAC
+    (TS,P,[-1.0,0.25,0.0],0.75),
+    (TS,P,[-1.0,0.0,0.0],-1.0),             # no phase at all
+    (TS,P*(1+5e-4),[0.0,1.0,0.0],0.0),      # within tol of the saturation curve
+    (TS,P*(1+5e-3),[0.0,1.0,0.0],-1.0),     # compressed liquid
+    (TS+20.0,P,[1.0,0.0,0.0],-1.0),         # superheated steam
+    (TS-20.0,P,[0.0,1.0,0.0],-1.0)])        # subcooled water
+def test_classify_water(T,p,phase,q):
+    '''The vapor quality of single states.'''
+
+    assert exergy.classify_water(T,p,phase) == pytest.approx(q,abs=1e-12)
+
+def test_classify_water_arrays():
+    '''Arrays of states give the qualities of the single states.'''
+
+    T     = [TS,TS,TS-20.0,TS]
+    p     = [P,P,P,P]
+    phase = [[0.0,1.0,0.0],[1.0,0.0,0.0],[0.0,1.0,0.0],[-1.0,0.4,0.0]]
+    q = exergy.classify_water(np.array(T),np.array(p),np.array(phase))
+    assert np.allclose(q,[0.0,1.0,-1.0,0.6])
+    assert np.allclose(q,[exergy.classify_water(*args) for args in zip(T,p,phase)])
+
+def test_classify_streams(capsys):
+    '''The phase of the streams of a simulation, and the saturated_water/saturated_steam overrides.'''
+
+    water = [('H2O',1.0)]
+    gas   = [('N2',0.79),('O2',0.21)]
+    sts = [exergy.stream('1',TS,P,1.0,water,phase=[0.0,1.0,0.0]),
+           exergy.stream('2',TS,P,1.0,water,phase=[1.0,0.0,0.0]),
+           exergy.stream('3',TS,P,1.0,water,phase=[0.4,0.6,0.0]),
+           exergy.stream('4',TS,P,1.0,water,phase=[-1.0,1.0,0.0]),
+           exergy.stream('5',TS-20.0,P,1.0,water,phase=[0.0,1.0,0.0]),
+           exergy.stream('6',TS+20.0,P,1.0,water,phase=[1.0,0.0,0.0]),
+           exergy.stream('7',TS,P,1.0,gas,phase=[0.0,1.0,0.0]),
+           exergy.stream('8',TS-20.0,P,1.0,water,phase=[0.0,1.0,0.0])]
+
+    sim = exergy.simulation(stream=sts[0])
+    capsys.readouterr()
+    sim.streams = OrderedDict((st.id,st) for st in sts)
+
+    q = sim.classify_streams()
+    assert np.allclose(q,[0.0,1.0,0.4,0.0,-1.0,-1.0,-1.0,-1.0])
+    assert "3 saturated and 1 two-phase" in capsys.readouterr().out
+    assert list(sts[2].state['phase']) == pytest.approx([0.4,0.6,0.0])
+    assert list(sts[4].state['phase']) == [-1.0,0.0,0.0]
+
+    # Overrides: only water/steam streams, whatever their state
+    q = sim.classify_streams(saturated_water=[5],saturated_steam=['6','7'])
+    assert np.allclose(q,[0.0,1.0,0.4,0.0,0.0,1.0,-1.0,-1.0])
+    assert list(sts[4].state['phase']) == [0.0,1.0,0.0]
+    assert list(sts[5].state['phase']) == [1.0,0.0,0.0]
+    assert list(sts[6].state['phase']) == [-1.0,0.0,0.0]
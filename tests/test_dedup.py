@@ -0,0 +1,71 @@
+'''Deduplication of identical stream states (unique_states, StreamBatch(dedup=True)).'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+def identical(a,b):
+    '''True if the states and substance properties of batches a and b are bitwise identical.'''
+
+    keys = [key for key in a.state if not np.array_equal(np.asarray(a.state[key]),np.asarray(b.state[key]),equal_nan=True)]
+    keys += [key for key in a.sub if not np.array_equal(a.sub[key],b.sub[key],equal_nan=True)]
+    assert keys == []
+    return True
+
+@pytest.mark.parametrize("backend,names,Tr,pr",[
+    (None,['N2','O2','CO2','H2O','Ar'],(300,1500),(1,20)),
+    ("water -> IF97; GERG-2008",['CH4','C2H6','N2','CO2','H2O'],(280,400),(20,80))])
+def test_dedup(backend,names,Tr,pr):
+    '''Each of U states in R streams with different mass flows: the same results, ratio R.'''
+
+    rng = np.random.default_rng(11)
+    U,R = 50,4
+    x = rng.random((U,len(names))); x[:,0] += 5; x /= x.sum(axis=1)[:,None]
+    T = rng.uniform(*Tr,U)
+    p = rng.uniform(*pr,U)
+    k = rng.permutation(np.repeat(np.arange(U),R))
+    args = (range(U*R),T[k],p[k],rng.uniform(1,10,U*R),names,x[k])
+
+    a = exergy.StreamBatch(*args,backend=backend)
+    b = exergy.StreamBatch(*args,backend=backend,dedup=True)
+    a.calc_exergy(["Ahrends","Szargut"])
+    b.calc_exergy(["Ahrends","Szargut"])
+
+    assert identical(a,b)
+    assert b.n_unique == U
+    assert b.dedup_ratio == R
+    assert a.dedup_ratio is None
+
+def test_unique_states():
+    '''States differ by T, p, phase or composition.'''
+
+    T = np.array([300.0,300.0,300.0,300.0,300.0,301.0])
+    p = np.array([1.0,1.0,1.0,2.0,1.0,1.0])
+    phase = np.array([[1,0,0]]*6,dtype=float); phase[4] = [0,1,0]
+    x = np.array([[0.8,0.2]]*6); x[2] = [0.7,0.3]
+    x = exergy.Composition.from_dense(x,['N2','O2'])
+
+    first,inverse = exergy.unique_states(T,p,phase,x)[:2]
+    assert len(first) == 5
+    assert inverse[0] == inverse[1]
+    assert len(set(inverse[[0,2,3,4,5]])) == 5
+    assert np.array_equal(T[first][inverse],T)
+
+def test_dedup_concat():
+    '''Repeated cases: the ratio is the number of cases, each case as on its own.'''
+
+    names = ['N2','O2','CO2','H2O']
+    x = [[0.75,0.12,0.05,0.08],[0.70,0.15,0.07,0.08],[0.0,0.0,0.0,1.0]]
+    case = exergy.StreamBatch(range(3),[900.0,600.0,500.0],[1.1,1.5,10.0],[10.0,5.0,2.0],names,x)
+
+    a = exergy.StreamBatch.concat([case,case])
+    b = exergy.StreamBatch.concat([case,case],dedup=True)
+    a.calc_exergy()
+    b.calc_exergy()
+    case.calc_exergy()
+
+    assert identical(a,b)
+    assert b.dedup_ratio == 2.0
+    assert np.array_equal(b.state['E_tot'][:3],case.state['E_tot'])
+    assert np.array_equal(b.state['e_ch'][:3],b.state['e_ch'][3:])
@@ -0,0 +1,128 @@
+'''GATEX runs (run_gatex, calc_exergy_gatex) with a stand-in executable (fake_gatex.py).'''
+
+import glob,os,sys,tempfile
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"fake_gatex.py")
+SIM  = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"exergyCalc01","ExampleSimulation.xlsx")
+
+pytestmark = pytest.mark.skipif(sys.platform in ["darwin","win32"],
+                                reason="the stand-in runs as a script (GATEX would run with wine)")
+
+@pytest.fixture
+def tmp(tmp_path,monkeypatch):
+    '''Run in an empty working directory, with temporary directories in tmp_path/tmp.'''
+
+    work = tmp_path/"work"
+    work.mkdir()
+    (tmp_path/"tmp").mkdir()
+    monkeypatch.chdir(work)
+    monkeypatch.setattr(tempfile,"tempdir",str(tmp_path/"tmp"))
+    yield tmp_path
+    assert os.listdir(str(work)) == []
+
+def gas(id):
+    return exergy.stream(id,300.0+10*id,1.0+id,1.0+0.5*id,[('N2',0.78),('O2',0.21),('Ar',0.01)])
+
+def check(st,id):
+    '''The stand-in exergies of stream id (T in degC, see stream.gatex_job).'''
+
+    T = 300.0+10*id-273.15
+    assert st.state['E_ph'] == pytest.approx(id+T/1e4,abs=1e-5)
+    assert st.state['H']    == pytest.approx((1.0+0.5*id)*T/1000,abs=1e-5)
+    assert st.state['E_ch'] == pytest.approx(1.0,abs=1e-5)
+
+def test_gatex_stream(tmp):
+    st = gas(3)
+    st.calc_exergy_gatex(gatex_exec=FAKE)
+    check(st,3)
+    assert os.listdir(str(tmp/"tmp")) == []
+
+def test_gatex_parallel(tmp,monkeypatch):
+    '''Runs overlap, at most workers at once, each result goes to its own stream.'''
+
+    log = tmp/"runs.log"
+    monkeypatch.setenv("FAKE_GATEX_SLEEP","0.3")
+    monkeypatch.setenv("FAKE_GATEX_LOG",str(log))
+
+    sts = [gas(id) for id in range(1,13)]
+    tables = exergy.calc_exergy_gatex(sts,gatex_exec=FAKE,workers=4)
+
+    assert len(tables) == 12
+    for id,st in enumerate(sts,1): check(st,id)
+
+    # Largest number of runs at once
+    runs = np.loadtxt(str(log))
+    busy = [np.sum((runs[:,0] <= t) & (t < runs[:,1])) for t in runs[:,0]]
+    assert 1 < max(busy) <= 4
+    assert os.listdir(str(tmp/"tmp")) == []
+
+def test_gatex_workers(tmp,monkeypatch):
+    '''The process-wide number of workers limits the runs at once.'''
+
+    log = tmp/"runs.log"
+    monkeypatch.setenv("FAKE_GATEX_SLEEP","0.2")
+    monkeypatch.setenv("FAKE_GATEX_LOG",str(log))
+
+    exergy.set_gatex_workers(2)
+    try:
+        assert exergy.get_gatex_workers() == 2
+        exergy.calc_exergy_gatex([gas(id) for id in range(1,7)],gatex_exec=FAKE)
+    finally:
+        exergy.set_gatex_workers(None)
+
+    runs = np.loadtxt(str(log))
+    busy = [np.sum((runs[:,0] <= t) & (t < runs[:,1])) for t in runs[:,0]]
+    assert max(busy) == 2
+    assert exergy.get_gatex_workers() == (os.cpu_count() or 1)
+
+    with pytest.raises(SystemExit):
+        exergy.set_gatex_workers(0)
+
+def test_gatex_simulations(tmp):
+    '''Simulations and streams at once, results stored in the owning streams.'''
+
+    sims = [exergy.simulation(filename=SIM) for k in range(2)]
+    st   = gas(5)
+    exergy.calc_exergy_gatex(sims+[st],gatex_exec=FAKE,workers=3)
+
+    check(st,5)
+    for sim in sims:
+        for key,s in sim.streams.items():
+            # The simulation writes T in K
+            assert s.state['E_ph'] == pytest.approx(int(key)+round(s.state['T'],4)/1e4,abs=1e-5)
+            assert s.state['H']    == pytest.approx(round(s.state['mdot'],4)*round(s.state['T'],4)/1000,rel=1e-4,abs=1e-4)
+
+def test_gatex_nan(tmp):
+    '''Values that GATEX cannot print are NaN.'''
+
+    E = exergy.run_gatex([gas(99).gatex_job(),gas(2).gatex_job()],FAKE,workers=2)
+    assert np.isnan(E[0][0,7]) and not np.isnan(E[0][0,5])
+    assert np.isfinite(E[1]).all()
+
+def test_gatex_no_output(tmp,monkeypatch):
+    '''A run that writes no exergies.m returns None and leaves the stream alone.'''
+
+    monkeypatch.setenv("FAKE_GATEX_FAIL","1")
+    st = gas(2)
+    assert exergy.run_gatex([st.gatex_job()],FAKE) == [None]
+    assert exergy.calc_exergy_gatex([st],gatex_exec=FAKE) == [None]
+    assert not 'E_ph' in st.state.keys()
+    assert os.listdir(str(tmp/"tmp")) == []
+
+def test_gatex_missing(tmp):
+    with pytest.raises(SystemExit,match="cannot run"):
+        exergy.run_gatex([gas(2).gatex_job()],str(tmp/"missing.exe"))
+    assert os.listdir(str(tmp/"tmp")) == []
+
+def test_gatex_keep(tmp):
+    E = exergy.run_gatex([gas(2).gatex_job()],FAKE,fldr=str(tmp),keep=True)[0]
+
+    kept = glob.glob(str(tmp/"gatex_*"))
+    assert len(kept) == 1
+    assert sorted(os.listdir(kept[0])) == ["composition.prn","exergies.m","flows.prn","gate.inp","gatex.log"]
+    assert np.array_equal(exergy.read_gatex_exergies(os.path.join(kept[0],"exergies.m")),E)
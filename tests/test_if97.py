@@ -0,0 +1,64 @@
+'''IAPWS-IF97 water and steam (if97.py) and two-phase water streams.'''
+
+import numpy as np
+import pytest
+
+from streams import exergy, if97
+
+# Verification values of IAPWS-IF97 (Tables 5 and 15):
+# T [K], p [MPa], v [m3/kg], h [kJ/kg], s [kJ/kg-K], cp [kJ/kg-K]
+REGION1 = [(300.0, 3.0,0.100215168e-2,0.115331273e3,0.392294792e0,0.417301218e1),
+           (300.0,80.0,0.971180894e-3,0.184142828e3,0.368563852e0,0.401008987e1),
+           (500.0, 3.0,0.120241800e-2,0.975542239e3,0.258041912e1,0.465580682e1)]
+REGION2 = [(300.0,0.0035,0.394913866e2,0.254991145e4,0.852238967e1,0.191300162e1),
+           (700.0,0.0035,0.923015898e2,0.333568375e4,0.101749996e2,0.208141274e1),
+           (700.0,30.0,  0.542946619e-2,0.263149474e4,0.517540298e1,0.103505092e2)]
+
+@pytest.mark.parametrize("region,func,points",[(1,if97.region1,REGION1),(2,if97.region2,REGION2)])
+def test_regions(region,func,points):
+    '''Regions 1 and 2 reproduce the verification values (also through calc).'''
+
+    for T,p,v,h,s,cp in points:
+        assert if97.region(T,p*10.0) == region
+        assert np.allclose(func(T,p*10.0),(h,s,cp,v),rtol=1e-8,atol=0.0)
+        assert np.allclose(if97.calc(T,p*10.0),(h,s,cp),rtol=1e-8,atol=0.0)
+
+def test_saturation():
+    '''Region 4: saturation pressure and temperature (Tables 35 and 36).'''
+
+    T = np.array([300.0,500.0,600.0])
+    assert np.allclose(if97.psat(T),np.array([0.353658941e-2,0.263889776e1,0.123443146e2])*10.0,rtol=1e-8)
+
+    p = np.array([0.1,1.0,10.0])*10.0
+    assert np.allclose(if97.Tsat(p),[0.372755919e3,0.453035632e3,0.584149488e3],rtol=1e-8)
+    assert np.allclose(if97.psat(if97.Tsat(p)),p,rtol=1e-12)
+
+def test_two_phase():
+    '''
+    A stream and a batch of two-phase water (phase [q,1-q,0] at Tsat(p)):
+    h and s are linear in the quality q between the saturated liquid and
+    vapor, which differ by the enthalpy and entropy of evaporation of IF97.
+    '''
+
+    p = 10.0
+    T = float(if97.Tsat(p))
+    q = [0.0,0.4,1.0]
+
+    sts = [exergy.stream(i,T,p,1.0,[('H2O',1.0)],phase=[qi,1.0-qi,0.0],exergy_type="Ahrends")
+           for i,qi in enumerate(q)]
+    h = np.array([st.state['h'] for st in sts])
+    s = np.array([st.state['s'] for st in sts])
+
+    hl,sl,cpl = if97.calc(T,p,0.0)
+    hv,sv,cpv = if97.calc(T,p,1.0)
+    assert np.isclose(h[2]-h[0],(hv-hl)*if97.MW,rtol=1e-10)
+    assert np.isclose(s[2]-s[0],(sv-sl)*if97.MW,rtol=1e-10)
+    assert np.isclose(h[1],0.6*h[0]+0.4*h[2],rtol=1e-12)
+    assert np.isclose(s[1],0.6*s[0]+0.4*s[2],rtol=1e-12)
+    assert sts[0].state['e_ph'] < sts[1].state['e_ph'] < sts[2].state['e_ph']
+
+    batch = exergy.StreamBatch(range(3),[T]*3,[p]*3,[1.0]*3,['H2O'],np.ones((3,1)),
+                               phase=[[qi,1.0-qi,0.0] for qi in q])
+    batch.calc_exergy("Ahrends")
+    for key in ['h','s','e_ph']:
+        assert np.array_equal(batch.state[key],[st.state[key] for st in sts]), key
@@ -0,0 +1,89 @@
+'''Analytic exergy derivatives (StreamBatch.jacobian) against central differences.'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+KEYS = ['E_ph','E_ch','E_tot']
+
+def exergies(names,x,T,p,mdot,phase=None,**kw):
+    batch = exergy.StreamBatch(range(len(T)),T,p,mdot,names,x,phase=phase,**kw)
+    batch.calc_exergy("Ahrends")
+    return [batch.state[key] for key in KEYS]
+
+def check(names,x,T,p,mdot,phase=None,fractions=True,rtol=1e-5,**kw):
+    '''Compare the jacobian with central differences along T, p, mdot and each fraction.'''
+
+    N   = len(T)
+    jac = exergy.StreamBatch(range(N),T,p,mdot,names,x,phase=phase,**kw).jacobian("Ahrends")
+
+    args = dict(T=T,p=p,mdot=mdot,x=x)
+    steps = [('T',1e-5*T),('p',1e-5*p),('mdot',1e-4*mdot)]
+    if fractions: steps += [(name,np.full(N,1e-6)) for j,name in enumerate(names) if x[:,j].min() > 1e-5]
+
+    # Errors relative to the derivative, or to a small part of the exergy flow
+    scale = 1e-6*np.abs(jac['E_tot']['mdot']*mdot) + 1e-12
+
+    for var,d in steps:
+        plus,minus = dict(args),dict(args)
+        if var in args:
+            plus[var]  = args[var] + d
+            minus[var] = args[var] - d
+        else:
+            j = names.index(var)
+            plus['x']  = x.copy(); plus['x'][:,j]  += d
+            minus['x'] = x.copy(); minus['x'][:,j] -= d
+
+        Ep = exergies(names,phase=phase,**plus,**kw)
+        Em = exergies(names,phase=phase,**minus,**kw)
+
+        for key,a,b in zip(KEYS,Ep,Em):
+            fd  = (a-b)/(2*d)
+            err = np.abs(fd-jac[key][var])/(np.abs(fd)+scale)
+            assert err.max() < rtol, (var,key,int(err.argmax()),fd[err.argmax()],jac[key][var][err.argmax()])
+
+@pytest.fixture
+def gas():
+    rng   = np.random.default_rng(1)
+    N     = 20
+    names = ['N2','O2','CO2','H2O','CH4','Ar']
+    x = rng.dirichlet(np.ones(len(names)),N)*rng.uniform(0.97,1.0,(N,1))
+    T = rng.uniform(300,1400,N)
+    p = rng.uniform(0.5,60,N)
+    mdot = rng.uniform(1,100,N)
+    return names,x,T,p,mdot
+
+def test_jacobian_ideal(gas):
+    check(*gas,backend=[])
+
+def test_jacobian_shomate(gas):
+    check(*gas)
+
+def test_jacobian_nasa9(gas):
+    check(*gas,properties="nasa9")
+
+def test_jacobian_gerg(gas):
+    check(*gas,backend="water -> IF97; GERG-2008")
+
+def test_jacobian_water():
+    rng   = np.random.default_rng(2)
+    N     = 20
+    names = ['H2O','H2O(l)']
+    x = np.zeros([N,2]); x[:,0] = 1.0
+    T = rng.uniform(300,800,N)
+    p = rng.uniform(0.05,100,N)
+    phase = np.c_[-np.ones(N),-np.ones(N),np.zeros(N)]
+    check(names,x,T,p,rng.uniform(1,100,N),phase=phase,fractions=False)
+
+def test_jacobian_stream():
+    '''stream.jacobian is the jacobian of its one-stream batch.'''
+
+    st  = exergy.stream(1,500.0,5.0,10.0,[('N2',0.7),('O2',0.1),('CO2',0.1),('H2O',0.1)])
+    jac = st.jacobian()
+    ref = exergy.StreamBatch.from_streams([st]).jacobian("Ahrends")
+
+    assert list(jac['E_tot'].keys()) == list(ref['E_tot'].keys())
+    for key in KEYS:
+        for var,val in jac[key].items():
+            assert val == ref[key][var][0]
@@ -0,0 +1,131 @@
+'''Adiabatic mixers and splitters of batches and streams (mix, split).'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+def flows(batch,names):
+    '''Mass flow rates [N], molar flow rates [N] and those of the substances names [N,S].'''
+
+    n = batch.state['mdot']/batch.state['MW']
+    x = np.column_stack([batch.x.column(nm) for nm in names])
+    if 'H2O' in names:
+        x[:,names.index('H2O')] += batch.x.column('H2O(l)')
+
+    return batch.state['mdot'], n, n[:,None]*x
+
+def check_balances(inlets,mixer,out,names):
+    '''Mass, substance and energy balances of each mixer.'''
+
+    M = len(out.ids)
+    mdot,n,nx = flows(inlets,names)
+    mdot_out,n_out,nx_out = flows(out,names)
+
+    assert np.allclose(mdot_out,np.bincount(mixer,weights=mdot,minlength=M),rtol=1e-12)
+    assert np.allclose(n_out,np.bincount(mixer,weights=n,minlength=M),rtol=1e-12)
+    for k in range(len(names)):
+        assert np.allclose(nx_out[:,k],np.bincount(mixer,weights=nx[:,k],minlength=M),rtol=1e-12,atol=1e-12)
+    H = np.bincount(mixer,weights=n*inlets.state['h'],minlength=M)
+    assert np.allclose(n_out*out.state['h'],H,rtol=1e-8,atol=1e-6)
+
+def gases(rng,N):
+    names = ['N2','O2','CO2','H2O','Ar']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    return names,exergy.StreamBatch(range(N),rng.uniform(300.0,1500.0,N),rng.uniform(1.0,20.0,N),
+                                    rng.uniform(1.0,10.0,N),names,x)
+
+def test_mix_gas():
+    '''One mixer of three flue gases at the lowest inlet pressure.'''
+
+    names,inlets = gases(np.random.default_rng(8),3)
+    mixer = np.zeros(3,dtype=int)
+    out = inlets.mix(mixer)
+
+    assert out.state['p'][0] == inlets.state['p'].min()
+    assert inlets.state['T'].min() < out.state['T'][0] < inlets.state['T'].max()
+    check_balances(inlets,mixer,out,names)
+
+def test_mix_water():
+    '''Steam condensed by cold water: a two-phase outlet at the given pressure.'''
+
+    inlets = exergy.StreamBatch(range(2),[573.15,293.15],[10.0,10.0],[1.0,1.0],['H2O'],np.ones((2,1)),
+                                phase=[[1.0,0.0,0.0],[0.0,1.0,0.0]])
+    mixer = np.zeros(2,dtype=int)
+    out = inlets.mix(mixer,p=5.0)
+
+    assert out.state['p'][0] == 5.0
+    assert 0.0 < out.state['phase'][0,0] < 1.0
+    check_balances(inlets,mixer,out,['H2O'])
+
+def test_mix_many():
+    '''Many mixers solved at once give the same outlets as each mixer alone.'''
+
+    rng = np.random.default_rng(9)
+    names,inlets = gases(rng,200)
+    mixer = rng.integers(0,20,200)
+    mixer[:20] = np.arange(20)
+    out = inlets.mix(mixer,ids=["m{}".format(m) for m in range(20)])
+
+    assert list(out.ids) == ["m{}".format(m) for m in range(20)]
+    check_balances(inlets,mixer,out,names)
+
+    for m in [0,7,19]:
+        i = np.flatnonzero(mixer == m)
+        one = exergy.StreamBatch(i,inlets.state['T'][i],inlets.state['p'][i],inlets.state['mdot'][i],
+                                 names,np.column_stack([inlets.x.column(nm) for nm in names])[i]).mix(np.zeros(len(i),dtype=int))
+        assert np.allclose(one.state['T'][0],out.state['T'][m],rtol=1e-8)
+        assert np.allclose(one.state['h'][0],out.state['h'][m],rtol=1e-10)
+
+def test_mix_streams():
+    '''stream.mix gives the outlet of StreamBatch.mix.'''
+
+    st1 = exergy.stream(1,900.0,5.0,3.0,[('N2',0.75),('O2',0.1),('CO2',0.1),('H2O',0.05)],exergy_type="Ahrends")
+    st2 = exergy.stream(2,400.0,4.0,1.0,[('N2',0.79),('O2',0.21)],exergy_type="Ahrends")
+    out = st1.mix([st2])
+    ref = exergy.StreamBatch.from_streams([st1,st2]).mix([0,0])
+
+    assert out.id == 1
+    assert out.state['mdot'] == 4.0 and out.state['p'] == 4.0
+    assert np.isclose(out.state['T'],ref.state['T'][0],rtol=1e-12)
+    n = [st.state['mdot']/st.state['MW'] for st in (st1,st2,out)]
+    assert np.isclose(n[2],n[0]+n[1],rtol=1e-12)
+    assert np.isclose(n[2]*out.state['h'],n[0]*st1.state['h']+n[1]*st2.state['h'],rtol=1e-8)
+    assert out.state['e_ph'] > 0.0
+
+def test_split():
+    '''Splitters keep the state and composition, the mass flow rates add up.'''
+
+    names,inlets = gases(np.random.default_rng(10),50)
+    outs = inlets.split([0.2,0.3,0.5])
+
+    assert np.allclose(sum(out.state['mdot'] for out in outs),inlets.state['mdot'],rtol=1e-12)
+    for out,f in zip(outs,[0.2,0.3,0.5]):
+        assert np.array_equal(out.state['mdot'],inlets.state['mdot']*f)
+        for key in ['T','p','h','s','MW']:
+            assert np.array_equal(out.state[key],inlets.state[key]), key
+
+    fractions = np.random.default_rng(11).dirichlet(np.ones(2),50)
+    a,b = inlets.split(fractions,ids=[range(50),range(50,100)])
+    assert list(b.ids) == list(range(50,100))
+    assert np.allclose(a.state['mdot']+b.state['mdot'],inlets.state['mdot'],rtol=1e-12)
+
+    st = exergy.stream(1,900.0,5.0,3.0,[('N2',0.8),('CO2',0.2)])
+    parts = st.split([0.25,0.75],ids=['a','b'])
+    assert [part.id for part in parts] == ['a','b']
+    assert [part.state['mdot'] for part in parts] == [0.75,2.25]
+    assert parts[1].state['h'] == st.state['h']
+
+def test_errors():
+    '''A mixer without inlets and split fractions that do not sum to 1 are refused.'''
+
+    names,inlets = gases(np.random.default_rng(12),3)
+    with pytest.raises(SystemExit):
+        inlets.mix([0,2,2])
+    for fractions in [[0.5,0.6],[0.5,0.4],[1.2,-0.2]]:
+        with pytest.raises(SystemExit):
+            inlets.split(fractions)
+
+    st = exergy.stream(1,900.0,5.0,3.0,[('N2',0.8),('CO2',0.2)])
+    with pytest.raises(SystemExit):
+        st.split([0.5,0.6])
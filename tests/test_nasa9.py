@@ -0,0 +1,18 @@
+'''Streams with NASA-9 properties.'''
+
+from streams import exergy
+
+def test_nasa9_range_warning(capsys):
+    '''Only substances in the stream warn about the NASA-9 temperature ranges.'''
+
+    comp = [('N2',0.75),('O2',0.12),('CO2',0.05),('H2O',0.08)]
+    st = exergy.stream(1,600.06,1.1,10.0,comp,properties="nasa9",exergy_type="Ahrends")
+    st.state['e_ph']
+    assert st.comp['H2O(l)'].state['x'] == 0.0
+    assert not "outside of NASA-9" in capsys.readouterr().out
+
+    # Liquid water above its range
+    st = exergy.stream(2,700.0,300.0,10.0,[('H2O(l)',1.0)],phase=[0,1,0],properties="nasa9",backend=[])
+    st.state['h']
+    out = capsys.readouterr().out
+    assert "H2O(l)" in out and "700.00 K outside of NASA-9" in out
@@ -0,0 +1,92 @@
+'''Backend rules (backend_rules, select_backends, get/set_backend_rules).'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+B = exergy.BACKENDS
+
+@pytest.fixture
+def restore_rules(monkeypatch):
+    '''Restore the process-wide rules after the test.'''
+    monkeypatch.setattr(exergy,'_backend_rules',exergy._backend_rules)
+
+def test_parser():
+    '''Rules from strings, backends, names and lists.'''
+
+    rules = exergy.backend_rules("water -> IF97; p > 50 bar -> GERG-2008;  T > 1000 and p > 20 -> DETAIL; nasa9")
+    assert rules == [("water",B["IF97"]),("p > 50 bar",B["GERG-2008"]),
+                     ("T > 1000 and p > 20",B["DETAIL"]),(None,B["nasa9"])]
+
+    assert exergy.backend_rules("GERG") == [(None,B["GERG-2008"])]
+    assert exergy.backend_rules(B["DETAIL"]) == [(None,B["DETAIL"])]
+    assert exergy.backend_rules([("gas","nasa9"),(None,"shomate")]) == [("gas",B["nasa9"]),(None,B["shomate"])]
+
+@pytest.mark.parametrize("rules",["water -> IF97 -> GERG-2008","water -> REFPROP"])
+def test_parser_errors(rules):
+    '''Malformed rules and unknown backends are refused.'''
+
+    with pytest.raises(SystemExit):
+        exergy.backend_rules(rules)
+
+@pytest.mark.parametrize("cond",["h > 5","p > 5 K","T >> 300","T > 300 or p < 2"])
+def test_condition_errors(cond):
+    '''Conditions that are not recognized are refused when the rules are applied.'''
+
+    rules = exergy.backend_rules([(cond,"nasa9")])
+    with pytest.raises(SystemExit):
+        exergy.select_backends(rules,B["shomate"],[300.0],[1.0],[1.0],[False])
+
+def test_default():
+    '''By default, water streams use IF97, all other streams the properties and eos of the stream.'''
+
+    assert exergy.get_backend_rules() == [("water",B["IF97"])]
+
+    fallback = B["shomate"]
+    backends,ib = exergy.select_backends(exergy.get_backend_rules(),fallback,
+                                         [300.0,300.0],[1.0,1.0],[1.0,1.0],[True,False])
+    assert [backends[b] for b in ib] == [B["IF97"],fallback]
+
+def test_first_rule():
+    '''The first rule that holds selects the backend, rules whose backend does not apply are skipped.'''
+
+    rules = exergy.backend_rules("water -> IF97; p > 50 bar -> GERG-2008; T > 1000 and p > 20 -> DETAIL; "
+                                 "mdot < 1 -> IF97; gas -> nasa9")
+    T     = [400.0,400.0, 1200.0,1200.0,1200.0,400.0,400.0]
+    p     = [ 80.0, 80.0,   30.0,  60.0,  10.0, 10.0, 10.0]
+    mdot  = [  5.0,  5.0,    5.0,   5.0,   5.0,  0.5,  0.5]
+    isH2O = [ True,False,  False, False, False,False, True]
+
+    backends,ib = exergy.select_backends(rules,B["shomate"],T,p,mdot,isH2O)
+    assert [backends[b].name for b in ib] == ["IF97","GERG-2008","DETAIL","GERG-2008","nasa9","nasa9","IF97"]
+
+    # Without a rule for them, the gas streams get the fallback
+    backends,ib = exergy.select_backends(rules[:4],B["shomate"],T,p,mdot,isH2O)
+    assert [backends[b].name for b in ib] == ["IF97","GERG-2008","DETAIL","GERG-2008","shomate","shomate","IF97"]
+
+    # A function of the state arrays as condition
+    rules = [(lambda st: st['T'] > 1000.0,B["DETAIL"])]
+    backends,ib = exergy.select_backends(rules,B["shomate"],T,p,mdot,isH2O)
+    assert [backends[b].name for b in ib] == ["shomate","shomate","DETAIL","DETAIL","DETAIL","shomate","shomate"]
+
+def test_set_rules(restore_rules):
+    '''set_backend_rules replaces the default rules of all streams and batches.'''
+
+    T = [373.0,800.0]
+    p = [5.0,5.0]
+    x = np.array([[1.0,0.0],[0.1,0.9]])
+    names = ['H2O','N2']
+    default = exergy.StreamBatch(range(2),T,p,[1.0,1.0],names,x)
+
+    rules = exergy.set_backend_rules("nasa9")
+    assert rules == [(None,B["nasa9"])]
+    assert exergy.get_backend_rules() == rules
+
+    batch = exergy.StreamBatch(range(2),T,p,[1.0,1.0],names,x)
+    nasa9 = exergy.StreamBatch(range(2),T,p,[1.0,1.0],names,x,backend="nasa9")
+    assert np.array_equal(batch.state['h'],nasa9.state['h'])
+    assert not batch.state['h'][0] == default.state['h'][0]
+
+    st = exergy.stream(1,T[1],p[1],1.0,[('H2O',0.1),('N2',0.9)])
+    assert st.state['h'] == nasa9.state['h'][1]
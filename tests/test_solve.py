@@ -0,0 +1,94 @@
+'''Temperatures from h or s (StreamBatch.solve_T) and isentropic changes of pressure.'''
+
+import numpy as np
+import pytest
+
+from streams import exergy, if97
+
+def gas(rng,N):
+    names = ['N2','O2','CO2','H2O','Ar']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    return exergy.StreamBatch(range(N),rng.uniform(300.0,1500.0,N),rng.uniform(1.0,30.0,N),
+                              np.ones(N),names,x)
+
+def natural_gas(rng,N):
+    names = ['CH4','C2H6','N2','CO2']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    x[:,0] += 4.0
+    x /= x.sum(axis=1)[:,None]
+    return exergy.StreamBatch(range(N),rng.uniform(280.0,450.0,N),rng.uniform(1.0,80.0,N),
+                              np.ones(N),names,x,backend="GERG-2008")
+
+def water(rng,N):
+    '''Compressed liquid and superheated steam.'''
+    T = np.concatenate([rng.uniform(290.0,440.0,N//2),rng.uniform(550.0,900.0,N-N//2)])
+    p = np.concatenate([rng.uniform(10.0,100.0,N//2),rng.uniform(1.0,30.0,N-N//2)])
+    phase = np.where((np.arange(N) < N//2)[:,None],[0.0,1.0,0.0],[1.0,0.0,0.0])
+    return exergy.StreamBatch(range(N),T,p,np.ones(N),['H2O'],np.ones((N,1)),phase=phase)
+
+@pytest.mark.parametrize("case",[gas,natural_gas,water])
+@pytest.mark.parametrize("key",['h','s'])
+def test_round_trip(case,key):
+    '''T -> h -> T and T -> s -> T from other starting temperatures (within the range of IF97).'''
+
+    rng   = np.random.default_rng(4)
+    batch = case(rng,200)
+    T0    = batch.state['T']
+
+    T,phase,ok = batch.solve_T(T=T0*rng.uniform(0.95,1.05,len(T0)),**{key: batch.state[key]})
+    assert ok.all()
+    assert np.allclose(T,T0,rtol=1e-7,atol=0.0)
+    assert np.array_equal(phase,batch.state['phase'])
+
+@pytest.mark.parametrize("case",[gas,natural_gas,water])
+def test_isentropic(case):
+    '''eta = 1 conserves s, eta < 1 produces entropy (expansion and compression).'''
+
+    rng   = np.random.default_rng(5)
+    batch = case(rng,100)
+    p     = batch.state['p']*np.where(np.arange(100) % 2 == 0,0.5,1.5)
+
+    out = batch.isentropic(p)
+    assert np.array_equal(out.state['p'],p)
+    assert np.allclose(out.state['s'],batch.state['s'],rtol=0.0,atol=1e-6)
+    assert np.array_equal(out.state['mdot'],batch.state['mdot'])
+
+    real = batch.isentropic(p,eta=0.8)
+    assert (real.state['s'] > out.state['s']).all()
+    assert (real.state['h'] > out.state['h']).all()
+
+def test_expansion_two_phase():
+    '''Steam expanded into the two-phase region: Tsat, the quality of the mixture and s.'''
+
+    batch = exergy.StreamBatch(range(3),[673.15,723.15,773.15],[40.0,60.0,80.0],[1.0]*3,
+                               ['H2O'],np.ones((3,1)))
+    p   = np.array([0.5,0.2,0.1])
+    out = batch.isentropic(p)
+
+    assert np.allclose(out.state['T'],if97.Tsat(p),rtol=1e-12)
+    q = out.state['phase'][:,0]
+    assert ((q > 0.0) & (q < 1.0)).all()
+    assert np.array_equal(out.state['phase'][:,1],1.0-q)
+    assert np.allclose(out.state['s'],batch.state['s'],rtol=0.0,atol=1e-6)
+
+    # The quality from the entropies of saturated liquid and vapor at p
+    sat = [exergy.StreamBatch(range(3),if97.Tsat(p),p,[1.0]*3,['H2O'],np.ones((3,1)),
+                              phase=np.tile(phase,(3,1))).state['s'] for phase in [[0,1,0],[1,0,0]]]
+    assert np.allclose(q,(batch.state['s']-sat[0])/(sat[1]-sat[0]),rtol=1e-8)
+
+def test_convergence_mask(capsys):
+    '''Streams that do not converge (too few iterations, no solution) are masked.'''
+
+    rng   = np.random.default_rng(6)
+    batch = gas(rng,50)
+    h     = batch.state['h'].copy()
+    h[:5] = np.nan
+
+    T,phase,ok = batch.solve_T(h=h,T=batch.state['T']+200.0)
+    assert not ok[:5].any()
+    assert ok[5:].all()
+    assert "did not converge in 5 streams" in capsys.readouterr().out
+
+    T,phase,ok = batch.solve_T(h=batch.state['h'],T=batch.state['T']+200.0,maxiter=1)
+    assert not ok.any()
+    assert "did not converge in 50 streams" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+'''Exergy types of stream objects (stream.__init__ and calc_exergy).'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+COMP = [('N2',0.72),('O2',0.08),('CO2',0.1),('H2O',0.1)]
+
+def calculated(exergy_type,**kw):
+    '''Exergies of a stream with the exergy type given to the constructor, and with calc_exergy.'''
+
+    a = exergy.stream('a',800.0,5.0,10.0,COMP,exergy_type=exergy_type,**kw)
+    b = exergy.stream('b',800.0,5.0,10.0,COMP,**kw)
+    b.calc_exergy(exergy_type)
+
+    return a,b
+
+@pytest.mark.parametrize("exergy_type",["Ahrends","Szargut","szargut",["Ahrends","Szargut"]])
+def test_models(exergy_type):
+    '''Each model is accepted in single and list form.'''
+
+    a,b = calculated(exergy_type)
+    assert a.state['e_ch'] == b.state['e_ch']
+    assert a.state['E_tot'] == b.state['E_tot']
+    if isinstance(exergy_type,list):
+        assert a.state['e_ch[Szargut]'] == b.state['e_ch[Szargut]']
+
+def test_column():
+    '''A column of chemical exergies added to the reference table.'''
+
+    base = exergy.get_reference()
+    refs = exergy.ReferenceTable(base.names,base.data.copy(),keys=list(base._keys.keys()))
+    env  = exergy.REF_ENVIRONMENT.copy()
+    env['CO2'] = 2*env['CO2']
+    exergy.calc_chemical_exergy(env,refs=refs,key='site')
+
+    a,b = calculated('site',refs=refs)
+    assert a.state['e_ch'] == b.state['e_ch']
+    assert not a.state['e_ch'] == calculated('Szargut',refs=refs)[0].state['e_ch']
+
+@pytest.mark.parametrize("exergy_type",["Sahrgut",["Ahrends","Sahrgut"],"e_ch_0c",[],3])
+def test_not_recognized(exergy_type,capsys):
+    '''Unknown models are reported when the stream is generated, no exergies are calculated.'''
+
+    st = exergy.stream('a',800.0,5.0,10.0,COMP,exergy_type=exergy_type)
+    assert "exergy_type not recognized" in capsys.readouterr().out
+    assert np.isfinite(st.state['h'])
+    with pytest.raises(KeyError):
+        st.state['e_ph']
@@ -0,0 +1,67 @@
+'''Tabulated substance properties (PropertyTables, backend "nasa9-tables").'''
+
+import numpy as np
+import pytest
+
+from streams import exergy
+
+@pytest.mark.parametrize("properties",["shomate","nasa9"])
+def test_error_bound(properties):
+    '''The tables meet tol, checked against the exact values at random temperatures.'''
+
+    refs = exergy.get_reference()
+    tab  = exergy.PropertyTables(refs,properties=properties,Tmin=200.0,Tmax=3400.0)
+    assert tab.max_err <= tab.tol
+
+    rng = np.random.default_rng(6)
+    T   = rng.uniform(tab.Tmin,tab.Tmax,2000)
+    jj  = np.flatnonzero(~tab.exact)
+    approx = np.array(tab.calc(jj[:,None],T[None,:],refs.column('p0')[jj][:,None],clamp=False))
+    exact  = tab.values(T)[:,jj,:]
+    with np.errstate(invalid='ignore'):
+        dev = np.abs(approx-exact) / np.maximum(np.abs(exact),1.0)
+    assert np.nanmax(dev) <= tab.tol
+
+def test_exact_substances():
+    '''H2O(l) is discontinuous at 373.15 K: flagged exact and calculated exactly.'''
+
+    refs = exergy.get_reference()
+    tab  = exergy.PropertyTables(refs,properties="nasa9",Tmin=200.0,Tmax=3400.0)
+    j    = refs.index('H2O(l)')
+    assert tab.exact[j]
+
+    T = np.linspace(280.0,500.0,50)
+    h,s,cp = tab.calc(np.full(T.shape,j),T,np.full(T.shape,5.0))
+    db = exergy.nasa9.get_database()
+    assert np.array_equal(np.array([h,s,cp]),np.array(db.calc(db.index('H2O(l)'),T,5.0)))
+
+def test_outside_range():
+    '''Temperatures outside of [Tmin,Tmax] are refused.'''
+
+    tab = exergy.PropertyTables(Tmin=250.0,Tmax=3000.0)
+    j   = tab.refs.index('N2')
+    tab.calc([j],[2999.0],[1.0])
+    for T in [249.0,3001.0]:
+        with pytest.raises(SystemExit):
+            tab.calc([j],[T],[1.0])
+
+def test_backend():
+    '''Batches of "nasa9-tables" match "nasa9", also outside of the range of the tables.'''
+
+    rng = np.random.default_rng(7)
+    N   = 500
+    names = ['N2','O2','CO2','H2O','Ar','CH4']
+    x = rng.dirichlet(np.ones(len(names)),N)
+    T = rng.uniform(300.0,2500.0,N)
+    T[:10] = rng.uniform(3500.0,5000.0,10)
+    p = rng.uniform(1.0,50.0,N)
+
+    a = exergy.StreamBatch(range(N),T,p,np.ones(N),names,x,backend="nasa9")
+    b = exergy.StreamBatch(range(N),T,p,np.ones(N),names,x,backend="nasa9-tables")
+    a.calc_exergy(["Ahrends","Szargut"])
+    b.calc_exergy(["Ahrends","Szargut"])
+
+    for key in ['h','s','h_0','s_0','e_ph','e_ch[Ahrends]','e_ch[Szargut]']:
+        assert np.allclose(b.state[key],a.state[key],rtol=1e-8,atol=1e-6), key
+    for key in ['h','s']:
+        assert np.array_equal(b.state[key][:10],a.state[key][:10]), key